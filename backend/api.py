@@ -3,12 +3,20 @@ API REST Flask para integração com o frontend React Native
 Substitui as funcionalidades do Streamlit por endpoints HTTP
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
+from flask_sock import Sock
+from simple_websocket import ConnectionClosed
 import tempfile
 import os
+import json
+import math
+import time
+import uuid
+import hashlib
+from functools import wraps
 from werkzeug.utils import secure_filename
-from modulos import chord_detector, comparador, extract_music_chords
+from modulos import comparador, pratica, referencias, timeline, escalonador, resultados, prazo, catalogo, perfilamento, pool_analise, saude, webhook, slugs
 import traceback
 import requests
 from dotenv import load_dotenv
@@ -18,6 +26,10 @@ load_dotenv()
 
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})  # Permite requisições do frontend de qualquer origem
+sock = Sock(app)
+
+# Perfilamento sob demanda (Server-Timing e amostragem de pilhas); exige PROFILING_TOKEN
+perfilamento.instalar(app, '/api/admin/profiling')
 
 # Middleware para logar todas as requisições
 @app.before_request
@@ -33,6 +45,49 @@ def log_request_info():
             print(f"Form['audio'] type: {type(audio_val)}, length: {len(str(audio_val)) if audio_val else 0}")
         print("=" * 50)
 
+# Prazo de cada requisição: nasce aqui e acompanha as chamadas ao music.ai e à cifraclub-api
+# X-Request-Timeout (segundos) ajusta o prazo; X-Request-Id permite cancelar pelo endpoint
+# O id vale só para o cliente que o enviou: o mesmo id vindo de outro cliente é outra requisição
+def cancellation_key(request_id):
+    """Chave de cancelamento: X-Request-Id + identificação do cliente"""
+    return hashlib.sha256(f"{client_id()}\0{request_id}".encode('utf-8')).hexdigest()[:32]
+
+@app.before_request
+def start_deadline():
+    if not request.path.startswith('/api/') or request.headers.get('Upgrade', '').lower() == 'websocket':
+        return
+    client_socket = request.environ.get('werkzeug.socket') or request.environ.get('gunicorn.socket')
+    # Sem X-Request-Id o cliente só conhece o id no fim da resposta: nada a cancelar
+    pedido_id = request.headers.get('X-Request-Id')
+    g.request_id = pedido_id or uuid.uuid4().hex
+    g.deadline_token = prazo.iniciar(prazo.Prazo(
+        prazo.segundos_do_header(request.headers.get('X-Request-Timeout')),
+        requisicao_id=cancellation_key(pedido_id) if pedido_id else None,
+        desconectado=(lambda: prazo.socket_fechado(client_socket)) if client_socket is not None else None
+    ))
+
+@app.after_request
+def add_request_id(response):
+    if 'request_id' in g:
+        response.headers['X-Request-Id'] = g.request_id
+    return response
+
+@app.teardown_request
+def end_deadline(exc=None):
+    token = g.pop('deadline_token', None)
+    if token is not None:
+        prazo.encerrar(token)
+
+@app.errorhandler(prazo.PrazoExcedido)
+def deadline_exceeded(e):
+    """504 quando o prazo acaba; 499 quando o cliente desistiu (ninguém deve ler, mas fica no log)"""
+    print(f"⏹️ Trabalho interrompido: {e}")
+    return jsonify({
+        'success': False,
+        'error': str(e),
+        'reason': e.motivo
+    }), 504 if e.motivo == 'prazo' else 499
+
 # Configurações
 UPLOAD_FOLDER = 'temp_uploads'
 ALLOWED_EXTENSIONS = {'mp3', 'wav', 'm4a', 'ogg'}
@@ -47,6 +102,79 @@ OPENAI_API_URL = 'https://api.openai.com/v1/chat/completions'
 if not OPENAI_API_KEY:
     print("[AVISO] OPENAI_API_KEY não encontrada no arquivo .env. O endpoint /api/chatbot não funcionará.")
 
+CIFRACLUB_API_URL = os.getenv('CIFRACLUB_API_URL', 'http://localhost:3000')
+SELENIUM_URL = os.getenv('SELENIUM_URL', '')
+MUSICAI_API_KEY = os.getenv('api_key')
+MUSICAI_API_URL = os.getenv('MUSICAI_API_URL', 'https://api.music.ai').rstrip('/')
+
+# Monitor de saúde: sonda as dependências em segundo plano; /api/ready e /api/cifra/health
+# servem o último resumo e os endpoints falham na hora (503) se a dependência está fora
+monitor_saude = saude.Monitor([
+    saude.Sonda('cifraclub', saude.http(f"{CIFRACLUB_API_URL}/", aceitar=(200,)), descricao=CIFRACLUB_API_URL),
+    saude.Sonda('selenium', saude.selenium(SELENIUM_URL), ativa=bool(SELENIUM_URL), descricao=SELENIUM_URL or None),
+    saude.Sonda('musicai', saude.http(f"{MUSICAI_API_URL}/v1/application", headers={'Authorization': MUSICAI_API_KEY or ''}),
+                intervalo=max(saude.INTERVALO, 60), ativa=bool(MUSICAI_API_KEY)),
+    saude.Sonda('openai', saude.http('https://api.openai.com/v1/models/gpt-4o-mini',
+                                     headers={'Authorization': 'Bearer {}'.format(OPENAI_API_KEY)}),
+                intervalo=max(saude.INTERVALO, 60), ativa=bool(OPENAI_API_KEY)),
+])
+
+@app.before_request
+def start_health_monitor():
+    monitor_saude.iniciar()
+
+# Escalonador dos jobs do music.ai: interativo (detect/compare) passa na frente de lote (músicas inteiras)
+# Cada worker do servidor tem o seu: os limites do host são divididos entre os WEB_CONCURRENCY workers
+WSGI_WORKERS = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+
+def per_worker(total):
+    """Parte de um limite do host que cabe a cada worker (pelo menos 1)"""
+    return max(1, int(total) // WSGI_WORKERS)
+
+musicai_scheduler = escalonador.Escalonador(
+    max_execucoes=per_worker(os.getenv('MUSICAI_MAX_CONCURRENT', 4)),
+    max_lote=per_worker(os.getenv('MUSICAI_MAX_BATCH', 3)),
+    limites_fila={
+        escalonador.INTERATIVO: per_worker(os.getenv('MUSICAI_QUEUE_INTERACTIVE', 20)),
+        escalonador.LOTE: per_worker(os.getenv('MUSICAI_QUEUE_BATCH', 10)),
+    },
+    cota_por_cliente=per_worker(os.getenv('MUSICAI_CLIENT_QUOTA', 3)),
+    espera_maxima=float(os.getenv('MUSICAI_MAX_WAIT', 60)),
+)
+
+def client_id():
+    """Identificação do cliente para cotas e cancelamento: endereço de quem conectou (não vem de header)"""
+    return request.remote_addr or 'anonimo'
+
+def queue_full_response(e):
+    """Resposta 429 com Retry-After quando o escalonador recusa o trabalho"""
+    response = jsonify({
+        'success': False,
+        'error': str(e),
+        'reason': e.motivo,
+        'message': 'Servidor ocupado, tente novamente em alguns segundos'
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+@app.errorhandler(escalonador.FilaCheia)
+def queue_full(e):
+    return queue_full_response(e)
+
+def scheduled(prioridade):
+    """
+    Decorator: as chamadas ao music.ai feitas pelo endpoint pedem vaga ao escalonador
+    com essa prioridade (resultados em cache respondem sem ocupar vaga)
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with escalonador.pedido(musicai_scheduler, prioridade, client_id()):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -55,8 +183,6 @@ def save_uploaded_file(file):
     if not file:
         return None
     
-    import time
-    
     # Se não houver filename ou estiver vazio, usar um nome padrão
     if not file.filename or file.filename.strip() == '':
         filename = f"audio_{int(time.time())}.wav"
@@ -76,6 +202,22 @@ def save_uploaded_file(file):
     file.save(filepath)
     return filepath
 
+def wants_binary_timeline():
+    """Negociação via Accept: binário compacto só quando o cliente pede"""
+    best = request.accept_mimetypes.best_match(['application/json', timeline.TIPO_BINARIO])
+    return best == timeline.TIPO_BINARIO
+
+def timeline_response(tl, timeline_id, **extra):
+    """Responde a timeline em binário (Accept) ou JSON com lista de acordes"""
+    if wants_binary_timeline():
+        return Response(tl.para_bytes(), mimetype=timeline.TIPO_BINARIO,
+                        headers={'X-Timeline-Id': timeline_id, 'Vary': 'Accept'})
+    body = {'success': True, 'timeline_id': timeline_id, 'chords': tl.para_segmentos(), 'count': len(tl)}
+    body.update(extra)
+    response = jsonify(body)
+    response.headers['Vary'] = 'Accept'
+    return response
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Endpoint de health check"""
@@ -84,7 +226,14 @@ def health_check():
         'message': 'API está funcionando'
     }), 200
 
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """Prontidão agregada das dependências (resumo em cache do monitor; 503 se uma crítica está fora)"""
+    return monitor_saude.resposta_ready()
+
 @app.route('/api/detect-chord', methods=['POST'])
+@monitor_saude.exige('musicai')
+@scheduled(escalonador.INTERATIVO)
 def detect_chord():
     """
     Detecta acorde de um áudio enviado
@@ -125,7 +274,8 @@ def detect_chord():
         try:
             # Detectar acordes
             workflow_id = request.form.get('workflow_id', 'untitled-workflow-18c7355')
-            chords = chord_detector.get_chords_from_audio(filepath, workflow_id)
+            # Áudio gravado pelo aluno: avaliado por si só, sem reaproveitar áudios parecidos
+            chords = resultados.acordes(filepath, workflow_id, reaproveitar=False)
             
             # Retornar o primeiro acorde detectado (ou None se vazio)
             detected_chord = chords[0] if chords else None
@@ -142,6 +292,8 @@ def detect_chord():
             if os.path.exists(filepath):
                 os.remove(filepath)
                 
+    except (prazo.PrazoExcedido, escalonador.FilaCheia):
+        raise
     except Exception as e:
         print(f"DEBUG: Exceção capturada: {str(e)}")
         print(f"DEBUG: Traceback: {traceback.format_exc()}")
@@ -153,28 +305,35 @@ def detect_chord():
         }), 500
 
 @app.route('/api/compare-chords', methods=['POST'])
+@monitor_saude.exige('musicai')
+@scheduled(escalonador.INTERATIVO)
 def compare_chords():
     """
     Compara dois áudios: gabarito (referência) e tocado (usuário)
+    O gabarito pode ser substituído por reference_id (ver /api/references)
     Retorna se o acorde tocado está correto
     """
     try:
-        if 'gabarito' not in request.files or 'tocado' not in request.files:
-            return jsonify({'error': 'É necessário enviar dois arquivos: gabarito e tocado'}), 400
+        # Gabarito pode vir como arquivo ou como id de uma referência já registrada
+        reference_id = request.form.get('reference_id')
+        if reference_id and not referencias.obter(reference_id):
+            return jsonify({'error': f"Referência '{reference_id}' não registrada"}), 404
+        
+        if 'tocado' not in request.files or (not reference_id and 'gabarito' not in request.files):
+            return jsonify({'error': 'É necessário enviar dois arquivos (gabarito e tocado) ou reference_id e tocado'}), 400
         
-        gabarito_file = request.files['gabarito']
         tocado_file = request.files['tocado']
         
         # Salvar arquivos temporários
-        gabarito_path = save_uploaded_file(gabarito_file)
+        gabarito_path = None if reference_id else save_uploaded_file(request.files['gabarito'])
         tocado_path = save_uploaded_file(tocado_file)
         
-        if not gabarito_path or not tocado_path:
+        if (not reference_id and not gabarito_path) or not tocado_path:
             return jsonify({'error': 'Erro ao salvar arquivos'}), 400
         
         try:
             # Comparar acordes
-            resultado = comparador.comparar_com_moises(gabarito_path, tocado_path)
+            resultado = comparador.comparar_com_moises(gabarito_path, tocado_path, referencia_id=reference_id)
             
             # Extrair informações do resultado
             is_correct = '✅' in resultado or 'Correto' in resultado
@@ -206,6 +365,8 @@ def compare_chords():
             if tocado_path and os.path.exists(tocado_path):
                 os.remove(tocado_path)
                 
+    except (prazo.PrazoExcedido, escalonador.FilaCheia):
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -213,11 +374,131 @@ def compare_chords():
             'message': 'Erro ao comparar áudios'
         }), 500
 
+@app.route('/api/compare-song', methods=['POST'])
+@monitor_saude.exige('musicai')
+@scheduled(escalonador.LOTE)
+def compare_song():
+    """
+    Compara a música inteira: alinha a timeline de acordes tocada com a do gabarito
+    Retorna acerto e deslocamento (segundos) por segmento do gabarito
+    """
+    try:
+        if 'gabarito' not in request.files or 'tocado' not in request.files:
+            return jsonify({'error': 'É necessário enviar dois arquivos: gabarito e tocado'}), 400
+        
+        try:
+            peso_tempo = float(request.form.get('time_weight', 0.0))
+        except ValueError:
+            return jsonify({'error': 'Parâmetro time_weight deve ser um número'}), 400
+        if not 0.0 <= peso_tempo < float('inf'):
+            return jsonify({'error': 'Parâmetro time_weight deve ser maior ou igual a zero'}), 400
+        
+        gabarito_path = save_uploaded_file(request.files['gabarito'])
+        tocado_path = save_uploaded_file(request.files['tocado'])
+        
+        if not gabarito_path or not tocado_path:
+            return jsonify({'error': 'Erro ao salvar arquivos'}), 400
+        
+        try:
+            workflow_id = request.form.get('workflow_id', 'untitled-workflow-18c7355')
+            resultado = comparador.comparar_musica(gabarito_path, tocado_path, workflow_id, peso_tempo)
+            
+            return jsonify({
+                'success': True,
+                'segments': resultado['segmentos'],
+                'accuracy': resultado['precisao'],
+                'weighted_accuracy': resultado['precisao_ponderada'],
+                'mean_offset': resultado['offset_medio'],
+                'message': f"{round(resultado['precisao'] * 100)}% dos acordes corretos"
+            }), 200
+            
+        finally:
+            for path in (gabarito_path, tocado_path):
+                if path and os.path.exists(path):
+                    os.remove(path)
+                
+    except (prazo.PrazoExcedido, escalonador.FilaCheia):
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Erro ao comparar músicas'
+        }), 500
+
+# ===== BIBLIOTECA DE REFERÊNCIAS (GABARITOS) =====
+
+@app.route('/api/references', methods=['POST'])
+@monitor_saude.exige('musicai')
+@scheduled(escalonador.LOTE)
+def register_reference():
+    """
+    Registra um áudio de referência uma única vez
+    Form: audio + reference_id (ou lesson_id + chord), workflow_id opcional
+    """
+    try:
+        reference_id = request.form.get('reference_id')
+        if not reference_id and request.form.get('lesson_id'):
+            reference_id = referencias.id_referencia(request.form['lesson_id'], request.form.get('chord'))
+        if not reference_id:
+            return jsonify({'error': 'Informe reference_id ou lesson_id (e chord)'}), 400
+        
+        if 'audio' not in request.files:
+            return jsonify({'error': 'Nenhum arquivo de áudio enviado'}), 400
+        
+        filepath = save_uploaded_file(request.files['audio'])
+        if not filepath:
+            return jsonify({'error': 'Erro ao salvar arquivo ou tipo de arquivo não permitido'}), 400
+        
+        try:
+            workflow_id = request.form.get('workflow_id', 'untitled-workflow-18c7355')
+            registro = referencias.registrar(reference_id, filepath, workflow_id)
+            return jsonify({
+                'success': True,
+                'reference_id': registro['id'],
+                'chords': registro['acordes'],
+                'message': f"Referência '{registro['id']}' registrada"
+            }), 201
+        finally:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+                
+    except (prazo.PrazoExcedido, escalonador.FilaCheia):
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Erro ao registrar referência'
+        }), 500
+
+@app.route('/api/references', methods=['GET'])
+def list_references():
+    """Lista as referências registradas"""
+    itens = referencias.listar()
+    return jsonify({'success': True, 'references': itens, 'count': len(itens)}), 200
+
+@app.route('/api/references/<path:reference_id>', methods=['GET', 'DELETE'])
+def reference_detail(reference_id):
+    """Consulta ou remove uma referência registrada"""
+    if request.method == 'DELETE':
+        if not referencias.remover(reference_id):
+            return jsonify({'error': f"Referência '{reference_id}' não registrada"}), 404
+        return jsonify({'success': True, 'message': f"Referência '{reference_id}' removida"}), 200
+    
+    registro = referencias.obter(reference_id)
+    if not registro:
+        return jsonify({'error': f"Referência '{reference_id}' não registrada"}), 404
+    return jsonify({'success': True, 'reference': registro}), 200
+
 @app.route('/api/extract-chords', methods=['POST'])
+@monitor_saude.exige('musicai')
+@scheduled(escalonador.LOTE)
 def extract_chords():
     """
     Extrai todos os acordes de uma música com timestamps
-    Retorna lista de acordes com start, end e chord_majmin
+    Retorna lista de acordes com start, end e chord_majmin e o timeline_id
+    (Accept: application/x-umi-timeline retorna o formato binário compacto)
     """
     try:
         if 'audio' not in request.files:
@@ -233,20 +514,22 @@ def extract_chords():
         try:
             # Extrair acordes com timestamps
             workflow_id = request.form.get('workflow_id', 'untitled-workflow-18c7355')
-            chords = extract_music_chords.main(filepath, workflow_id)
+            chords = resultados.timeline(filepath, workflow_id)
             
-            return jsonify({
-                'success': True,
-                'chords': chords,
-                'count': len(chords),
-                'message': f'{len(chords)} acordes detectados'
-            }), 200
+            # Guardar a timeline compacta para consultas por janela de tempo
+            timeline_id = timeline.gerar_id(resultados.hash_arquivo(filepath), workflow_id)
+            tl = timeline.TimelineAcordes.de_segmentos(chords)
+            timeline.salvar(timeline_id, tl)
+            
+            return timeline_response(tl, timeline_id, message=f'{len(chords)} acordes detectados'), 200
             
         finally:
             # Limpar arquivo temporário
             if os.path.exists(filepath):
                 os.remove(filepath)
                 
+    except (prazo.PrazoExcedido, escalonador.FilaCheia):
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -254,7 +537,83 @@ def extract_chords():
             'message': 'Erro ao extrair acordes'
         }), 500
 
+# ===== TIMELINE DE ACORDES (CONSULTA POR TEMPO) =====
+
+@app.route('/api/chords/<timeline_id>', methods=['GET'])
+def get_timeline(timeline_id):
+    """Timeline completa de acordes (JSON ou binário via Accept)"""
+    tl = timeline.carregar(timeline_id)
+    if tl is None:
+        return jsonify({'error': 'Timeline não encontrada'}), 404
+    return timeline_response(tl, timeline_id), 200
+
+@app.route('/api/chords/<timeline_id>/window', methods=['GET'])
+def get_timeline_window(timeline_id):
+    """
+    Segmentos que cruzam o intervalo [from, to) em segundos
+    Usado na sincronia da reprodução para buscar só pequenos trechos
+    """
+    tl = timeline.carregar(timeline_id)
+    if tl is None:
+        return jsonify({'error': 'Timeline não encontrada'}), 404
+    try:
+        inicio = float(request.args.get('from', 0))
+        fim = float(request.args.get('to', inicio + 10))
+    except ValueError:
+        return jsonify({'error': 'Parâmetros from/to devem ser números (segundos)'}), 400
+    if not (math.isfinite(inicio) and math.isfinite(fim)) or inicio < 0 or fim < inicio:
+        return jsonify({'error': 'Parâmetros from/to devem ser finitos, com 0 <= from <= to'}), 400
+    return timeline_response(tl.janela(inicio, fim), timeline_id, **{'from': inicio, 'to': fim}), 200
+
+@app.route('/api/chords/<timeline_id>/at', methods=['GET'])
+def get_chord_at(timeline_id):
+    """Acorde no instante t e os próximos (parâmetro next, padrão 3)"""
+    tl = timeline.carregar(timeline_id)
+    if tl is None:
+        return jsonify({'error': 'Timeline não encontrada'}), 404
+    try:
+        t = float(request.args.get('t', 0))
+        proximos = max(0, min(int(request.args.get('next', 3)), 50))
+    except ValueError:
+        return jsonify({'error': 'Parâmetros t/next inválidos'}), 400
+    if not math.isfinite(t) or t < 0:
+        return jsonify({'error': 'Parâmetro t deve ser um número finito maior ou igual a zero'}), 400
+    atual, seguintes = tl.acorde_em(t, proximos)
+    return jsonify({'success': True, 't': t, 'chord': atual, 'next': seguintes}), 200
+
+# ===== CATÁLOGO (TIMELINES PRÉ-CALCULADAS) =====
+
+@app.route('/api/catalog', methods=['GET'])
+def list_catalog():
+    """Músicas do catálogo já analisadas (pré-cálculo: python -m modulos.catalogo <pasta>)"""
+    itens = [
+        {
+            'name': entrada['nome'],
+            'timeline_id': entrada['timeline_id'],
+            'version': entrada['versao'],
+            'count': entrada['segmentos'],
+            'updated_at': entrada['atualizado_em']
+        }
+        for entrada in catalogo.listar()
+    ]
+    return jsonify({'success': True, 'songs': itens, 'count': len(itens)}), 200
+
+@app.route('/api/catalog/<path:name>', methods=['GET'])
+def get_catalog_song(name):
+    """
+    Timeline pré-calculada de uma música do catálogo (JSON ou binário via Accept)
+    O timeline_id retornado também serve para /api/chords/<id>/window e /at
+    """
+    entrada, tl = catalogo.carregar_timeline(name)
+    if tl is None:
+        return jsonify({'error': f"Música '{name}' não está no catálogo"}), 404
+    response = timeline_response(tl, entrada['timeline_id'], name=entrada['nome'], version=entrada['versao'])
+    response.headers['ETag'] = f'"{entrada["timeline_id"]}"'
+    return response.make_conditional(request)
+
 @app.route('/api/detect-chord-first', methods=['POST'])
+@monitor_saude.exige('musicai')
+@scheduled(escalonador.INTERATIVO)
 def detect_chord_first():
     """
     Detecta o primeiro acorde de um áudio (wrapper para usar extract_music_chords)
@@ -272,7 +631,7 @@ def detect_chord_first():
         
         try:
             workflow_id = request.form.get('workflow_id', 'untitled-workflow-18c7355')
-            chords = extract_music_chords.main(filepath, workflow_id)
+            chords = resultados.timeline(filepath, workflow_id)
             
             if chords and len(chords) > 0:
                 first_chord = chords[0]
@@ -294,16 +653,180 @@ def detect_chord_first():
             if os.path.exists(filepath):
                 os.remove(filepath)
                 
+    except (prazo.PrazoExcedido, escalonador.FilaCheia):
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+# ===== PRÁTICA EM TEMPO REAL (WEBSOCKET) =====
+
+@sock.route('/api/practice/ws')
+def practice_ws(ws):
+    """
+    Modo prática em tempo real.
+
+    Protocolo:
+        1. (opcional) texto JSON {"type": "config", "sample_rate": 16000,
+           "format": "s16le" | "f32le", "expected_chord": "C"}
+        2. mensagens binárias com quadros PCM mono curtos
+        3. texto JSON {"type": "end"} encerra e dispara a análise final
+           com o music.ai ("final": false pula essa etapa)
+
+    Envia:
+        {"type": "estimate", "chord", "confidence", "t", ...} a cada salto
+        {"type": "final", "chord", "all_chords"} com o mesmo resultado de /api/detect-chord
+    """
+    sessao = pratica.SessaoPratica()
+    try:
+        while True:
+            mensagem = ws.receive()
+            if mensagem is None:
+                continue
+
+            if isinstance(mensagem, bytes):
+                try:
+                    estimativa = sessao.adicionar(mensagem)
+                except ValueError as e:
+                    # Quadro quebrado: avisa e segue com a sessão
+                    ws.send(json.dumps({'type': 'error', 'error': str(e)}))
+                    continue
+                if estimativa:
+                    ws.send(json.dumps(estimativa))
+                continue
+
+            try:
+                comando = json.loads(mensagem)
+            except ValueError:
+                comando = None
+            if not isinstance(comando, dict):
+                ws.send(json.dumps({'type': 'error', 'error': 'Mensagem de texto deve ser um objeto JSON'}))
+                continue
+
+            if comando.get('type') == 'config':
+                try:
+                    nova = pratica.SessaoPratica(
+                        taxa=comando.get('sample_rate', 16000),
+                        formato=comando.get('format', 's16le'),
+                        janela=comando.get('window', 1.5),
+                        salto=comando.get('hop', 0.25),
+                        acorde_esperado=comando.get('expected_chord')
+                    )
+                except (TypeError, ValueError) as e:
+                    ws.send(json.dumps({'type': 'error', 'error': f'Configuração inválida: {e}'}))
+                    continue
+                sessao = nova
+                ws.send(json.dumps({'type': 'ready', 'sample_rate': sessao.taxa}))
+
+            elif comando.get('type') == 'end':
+                if comando.get('final', True) and sessao.amostras_gravadas:
+                    ws.send(json.dumps(analise_final_pratica(sessao, comando, client_id(), lambda: not ws.connected)))
+                ws.close()
+                break
+
+    except ConnectionClosed:
+        print("🔌 Cliente da prática desconectou")
+    except Exception as e:
+        print(f"❌ Erro na prática em tempo real: {e}")
+        traceback.print_exc()
+
+
+def analise_final_pratica(sessao, comando, cliente, desconectado=None):
+    """
+    Roda a gravação da sessão pelo mesmo fluxo de /api/detect-chord
+    O prazo começa aqui (a sessão em si pode durar mais) e para se o WebSocket fechar
+    """
+    filepath = os.path.join(UPLOAD_FOLDER, f"{int(time.time())}_pratica.wav")
+    sessao.salvar_gravacao(filepath)
+    token = prazo.iniciar(prazo.Prazo(prazo.segundos_do_header(comando.get('timeout')), desconectado=desconectado))
+    try:
+        workflow_id = comando.get('workflow_id', 'untitled-workflow-18c7355')
+        with escalonador.pedido(musicai_scheduler, escalonador.INTERATIVO, cliente):
+            chords = resultados.acordes(filepath, workflow_id, reaproveitar=False)
+        return {
+            'type': 'final',
+            'chord': chords[0] if chords else None,
+            'all_chords': chords
+        }
+    except escalonador.FilaCheia as e:
+        return {'type': 'error', 'error': str(e), 'retry_after': e.retry_after}
+    except prazo.PrazoExcedido as e:
+        return {'type': 'error', 'error': str(e), 'reason': e.motivo}
+    except Exception as e:
+        return {'type': 'error', 'error': str(e)}
+    finally:
+        prazo.encerrar(token)
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+@app.route('/api/requests/<request_id>/cancel', methods=['POST'])
+def cancel_request(request_id):
+    """Cancela uma requisição em andamento do mesmo cliente (id do header X-Request-Id)"""
+    situacao = prazo.cancelar(cancellation_key(request_id))
+    if situacao is None:
+        return jsonify({
+            'success': False,
+            'request_id': request_id,
+            'error': 'Nenhuma requisição em andamento com esse id para este cliente'
+        }), 404
+    return jsonify({
+        'success': True,
+        'request_id': request_id,
+        'message': 'Requisição cancelada' if situacao == 'cancelada' else 'Pedido de cancelamento registrado'
+    }), 202
+
+@app.route('/api/webhooks/musicai', methods=['POST'])
+def musicai_webhook():
+    """
+    Callback de conclusão de job do music.ai (callbackUrl assinado em create_job).
+    Acorda a requisição que espera o job; o status é confirmado por ela no music.ai.
+    """
+    if not webhook.assinatura_valida(request.args):
+        return jsonify({'error': 'Assinatura do callback inválida ou expirada'}), 403
+    dados = request.get_json(silent=True) or {}
+    job_id = dados.get('id') or (dados.get('job') or {}).get('id')
+    if not job_id:
+        return jsonify({'error': 'Callback sem id do job'}), 400
+    if not webhook.aceitar(request.args['ref'], str(job_id), dados):
+        return jsonify({'error': 'Callback não corresponde ao job desta URL ou já foi recebido'}), 403
+    print(f"📬 Callback do job {job_id}: {dados.get('status')}")
+    return jsonify({'received': True}), 200
+
+@app.route('/api/metrics/scheduler', methods=['GET'])
+def scheduler_metrics():
+    """Profundidade das filas, tempos de espera e rejeições do escalonador"""
+    return jsonify(musicai_scheduler.metricas()), 200
+
 # ===== CIFRA CLUB API PROXY =====
-CIFRACLUB_API_URL = os.getenv('CIFRACLUB_API_URL', 'http://localhost:3000')
+
+def deadline_headers():
+    """Repassa o prazo restante para a cifraclub-api (X-Deadline-Ms)"""
+    restante = prazo.atual().cabecalho_ms()
+    return {'X-Deadline-Ms': restante} if restante is not None else {}
+
+@app.route('/api/cifra/search', methods=['GET'])
+@monitor_saude.exige('cifraclub')
+def search_cifras():
+    """
+    Busca nas cifras já armazenadas pela cifraclub-api (índice local, sem Selenium)
+    Parâmetros: q (texto, com prefixo), chords (ex: G,C,D), only, simplify, limit, offset
+    """
+    try:
+        response = requests.get(f"{CIFRACLUB_API_URL}/search", params=request.args,
+                                timeout=prazo.atual().timeout(10), headers=deadline_headers())
+        return jsonify(response.json()), response.status_code
+    except requests.exceptions.ConnectionError:
+        return jsonify({
+            'error': 'CifraClub API não está disponível',
+            'message': 'Certifique-se de que a cifraclub-api está rodando na porta 3000'
+        }), 503
+    except requests.exceptions.Timeout:
+        return jsonify({'error': 'Timeout ao buscar no índice de cifras'}), 504
 
 @app.route('/api/cifra/<artist>/<song>', methods=['GET'])
+@monitor_saude.exige('cifraclub')
 def get_cifra(artist, song):
     print("=" * 50)
     print(f"🎯 REQUISIÇÃO RECEBIDA: /api/cifra/{artist}/{song}")
@@ -312,16 +835,29 @@ def get_cifra(artist, song):
     print("=" * 50)
     
     try:
-        # Normalizar artista e música para URL (já vem normalizado do frontend)
-        artist_normalized = artist.lower().replace(' ', '-')
-        song_normalized = song.lower().replace(' ', '-')
+        # Slugs do Cifra Club: sem acentos/pontuação e corrigidos pelos pares já conhecidos
+        artist_normalized, song_normalized, known = slugs.resolver(artist, song)
+        if (artist_normalized, song_normalized) != (artist, song):
+            print(f"🔤 Slug resolvido: {artist}/{song} → {artist_normalized}/{song_normalized}")
+        
+        # Miss já confirmado pela cifraclub-api: responde sem abrir o Selenium
+        if not known and slugs.ausente(artist_normalized, song_normalized):
+            print(f"🚫 Cifra inexistente em cache: {artist_normalized}/{song_normalized}")
+            return jsonify({
+                'error': 'Cifra não encontrada',
+                'message': 'Não foi possível encontrar a cifra',
+                'cifra': [],
+                'cifraclub_url': f"https://www.cifraclub.com.br/{artist_normalized}/{song_normalized}"
+            }), 404
         
         # Fazer requisição para cifraclub-api
         url = f"{CIFRACLUB_API_URL}/artists/{artist_normalized}/songs/{song_normalized}"
         print(f"🔍 Buscando cifra: {url}")
-        print(f"⏱️ Timeout configurado: 180 segundos (3 minutos)")
+        print(f"⏱️ Prazo restante: {prazo.atual().restante():.0f} segundos")
         
-        response = requests.get(url, timeout=180)  # Aumentado para 180 segundos (3 minutos) - API do CifraClub pode ser lenta
+        # API do CifraClub pode ser lenta: usa o que resta do prazo da requisição (padrão 3 minutos)
+        # e repassa o prazo para a cifraclub-api limitar as esperas do Selenium
+        response = requests.get(url, timeout=prazo.atual().timeout(), headers=deadline_headers())
         print(f"📥 Resposta recebida: status={response.status_code}")
         
         if response.status_code == 200:
@@ -347,10 +883,16 @@ def get_cifra(artist, song):
                     print(f"   - ⚠️ 'cifra' não é uma lista! Tipo: {type(cifra_value)}")
             if 'error' in data:
                 print(f"⚠️ Resposta contém erro: {data.get('error')}")
+            elif data.get('cifra'):
+                slugs.registrar(artist_normalized, song_normalized, data.get('name'), data.get('artist'))
             
             return jsonify(data), 200
         else:
             print(f"❌ Erro na resposta: {response.status_code}")
+            # Só guarda o miss confirmado pelo site (404 com not_found); timeouts e páginas
+            # quebradas (5xx) não dizem nada. Um par já conhecido nunca vira ausente.
+            if response.status_code == 404 and not known and confirmed_not_found(response):
+                slugs.marcar_ausente(artist_normalized, song_normalized)
             return jsonify({
                 'error': f'Erro ao buscar cifra: {response.status_code}',
                 'message': 'Não foi possível encontrar a cifra'
@@ -358,6 +900,7 @@ def get_cifra(artist, song):
             
     except requests.exceptions.ConnectionError as e:
         print(f"❌ Erro de conexão: {e}")
+        monitor_saude.registrar('cifraclub', False, 0.0, f"ConnectionError: {e}")
         print(f"💡 Verifique se a cifraclub-api está rodando em {CIFRACLUB_API_URL}")
         return jsonify({
             'error': 'CifraClub API não está disponível',
@@ -367,7 +910,7 @@ def get_cifra(artist, song):
         print(f"⏱️ Timeout: {e}")
         return jsonify({
             'error': 'Timeout ao buscar cifra',
-            'message': 'A requisição demorou muito para responder (mais de 3 minutos). A API do CifraClub pode estar lenta ou sobrecarregada. Tente novamente em alguns instantes.'
+            'message': 'A requisição demorou mais que o prazo para responder. A API do CifraClub pode estar lenta ou sobrecarregada. Tente novamente em alguns instantes.'
         }), 504
     except Exception as e:
         print(f"❌ Erro ao buscar cifra: {str(e)}")
@@ -377,22 +920,29 @@ def get_cifra(artist, song):
             'message': 'Erro inesperado ao buscar cifra'
         }), 500
 
+def confirmed_not_found(response):
+    """404 da cifraclub-api que veio da página de "não encontrado" do site (e não de uma rota errada)"""
+    try:
+        dados = response.json()
+    except ValueError:
+        return False
+    return isinstance(dados, dict) and bool(dados.get('not_found'))
+
 @app.route('/api/cifra/health', methods=['GET'])
 def cifra_health():
-    """Verifica se a cifraclub-api está disponível"""
-    try:
-        response = requests.get(f"{CIFRACLUB_API_URL}/", timeout=10)  # Aumentado de 5 para 10
-        return jsonify({
-            'cifraclub_api_available': response.status_code == 200,
-            'cifraclub_api_url': CIFRACLUB_API_URL
-        }), 200
-    except:
-        return jsonify({
-            'cifraclub_api_available': False,
-            'cifraclub_api_url': CIFRACLUB_API_URL
-        }), 200
+    """Disponibilidade da cifraclub-api segundo o monitor de saúde (sem chamada ao vivo)"""
+    cifraclub = monitor_saude.resumo()['dependencies']['cifraclub']
+    return jsonify({
+        'cifraclub_api_available': cifraclub['status'] in (saude.OK, saude.DEGRADADO),
+        'cifraclub_api_url': CIFRACLUB_API_URL,
+        'status': cifraclub['status'],
+        'availability': cifraclub['availability'],
+        'latency_ms': cifraclub['latency_ms'],
+        'last_check': cifraclub['last_check']
+    }), 200
 
 @app.route('/api/chatbot', methods=['POST'])
+@monitor_saude.exige('openai')
 def chatbot():
     """
     Endpoint proxy para o chatbot OpenAI.
@@ -523,13 +1073,30 @@ if __name__ == '__main__':
     print(f"📡 API disponível em http://localhost:{port}")
     print(f"🔍 Endpoints disponíveis:")
     print(f"   - GET  /api/health")
+    print(f"   - GET  /api/ready")
     print(f"   - POST /api/detect-chord")
     print(f"   - POST /api/compare-chords")
+    print(f"   - POST /api/compare-song")
+    print(f"   - POST /api/references")
+    print(f"   - GET  /api/references[/<id>]")
     print(f"   - POST /api/extract-chords")
     print(f"   - POST /api/detect-chord-first")
+    print(f"   - GET  /api/catalog[/<name>]")
+    print(f"   - GET  /api/chords/<id>[/window?from=&to=|/at?t=]")
+    print(f"   - WS   /api/practice/ws")
     print(f"   - POST /api/chatbot")
+    print(f"   - GET  /api/metrics/scheduler")
+    print(f"   - POST /api/admin/profiling/start|stop, GET /api/admin/profiling/status|dump")
+    print(f"   - POST /api/requests/<id>/cancel")
+    print(f"   - POST /api/webhooks/musicai")
     print(f"   - GET  /api/cifra/<artist>/<song>")
+    print(f"   - GET  /api/cifra/search?q=&chords=")
     print(f"   - GET  /api/cifra/health")
+
+    # Sobe o pool de análise antes das threads de requisição (no modo debug, só no
+    # processo que atende, não no que vigia os arquivos)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        pool_analise.padrao().aquecer()
     
     app.run(host='0.0.0.0', port=port, debug=debug)
 
@@ -0,0 +1,19 @@
+# ARQUIVO DE CONFIGURAÇÃO DO GUNICORN (lido automaticamente ao rodar na pasta backend)
+# gunicorn -k gthread --threads 8 api:app
+# O número de workers vem de WEB_CONCURRENCY, que também divide o pool de análise
+# (UMI_POOL_PROCESSOS é o total do host)
+
+import os
+
+bind = "0.0.0.0:" + os.getenv("PORT", "5000")
+workers = int(os.getenv("WEB_CONCURRENCY", 1))
+worker_class = "gthread"
+threads = int(os.getenv("UMI_THREADS", 8))
+timeout = int(float(os.getenv("UMI_REQUEST_TIMEOUT_MAX", 600))) + 30
+
+
+def post_worker_init(worker):
+    # Logo depois do fork do worker, antes das threads de requisição: o pool de
+    # análise sobe com fork, sem herdar locks de outras threads
+    from modulos import pool_analise
+    pool_analise.padrao().aquecer()
@@ -0,0 +1,169 @@
+# ARQUIVO QUE ALINHA DUAS LINHAS DO TEMPO DE ACORDES (GABARITO x TOCADO)
+# Entrada no formato de extract_music_chords: [{'start', 'end', 'chord_majmin'}]
+# Acordes viram inteiros e o alinhamento é um DTW vetorizado em NumPy
+
+from functools import lru_cache
+
+import numpy as np
+
+from modulos import analise_local, perfilamento
+
+# Código 0 = sem acorde ('N'); 1..12 = maiores (C..B); 13..24 = menores (C..B)
+N_CODIGOS = 25
+
+
+def codigo(rotulo):
+    """Converte um rótulo ('C:maj', 'Am', 'N'...) no código inteiro 0..24."""
+    parsed = analise_local.parse_rotulo(rotulo)
+    if parsed is None:
+        return 0
+    raiz, menor = parsed
+    return 1 + raiz + (12 if menor else 0)
+
+
+def rotulo(cod):
+    """Inverso de codigo()."""
+    cod = int(cod)
+    if cod == 0:
+        return "N"
+    return analise_local.rotulo((cod - 1) % 12, cod > 12)
+
+
+@lru_cache(maxsize=1)
+def matriz_distancias():
+    """
+    Distância harmônica (25 x 25) entre códigos: 1 - notas em comum / 3.
+    Mesmo acorde = 0; relativo ou homônimo (2 notas em comum) = 1/3;
+    relação de quinta (1 nota) = 2/3; sem notas em comum ou 'N' x acorde = 1.
+    """
+    notas = np.zeros((N_CODIGOS, 12), dtype=np.float64)
+    for raiz in range(12):
+        notas[1 + raiz, [raiz, (raiz + 4) % 12, (raiz + 7) % 12]] = 1
+        notas[13 + raiz, [raiz, (raiz + 3) % 12, (raiz + 7) % 12]] = 1
+    distancias = 1.0 - (notas @ notas.T) / 3.0
+    distancias[0, :] = 1.0
+    distancias[:, 0] = 1.0
+    distancias[0, 0] = 0.0
+    return distancias
+
+
+def codificar(segmentos):
+    """Timeline em lista de dicts → (inícios, fins, códigos) como arrays NumPy."""
+    vistos = {}
+    codigos = np.empty(len(segmentos), dtype=np.int8)
+    inicios = np.empty(len(segmentos), dtype=np.float64)
+    fins = np.empty(len(segmentos), dtype=np.float64)
+    for i, seg in enumerate(segmentos):
+        nome = seg["chord_majmin"]
+        if nome not in vistos:
+            vistos[nome] = codigo(nome)
+        codigos[i] = vistos[nome]
+        inicios[i] = float(seg["start"])
+        fins[i] = float(seg["end"])
+    return inicios, fins, codigos
+
+
+@perfilamento.medir()
+def dtw(custo, banda=None):
+    """
+    DTW sobre a matriz de custo (n x m), percorrendo anti-diagonais para
+    que cada passo seja uma operação vetorizada. 'banda' (em segmentos)
+    restringe o caminho a uma faixa em torno da diagonal (Sakoe-Chiba).
+    Retorna (custo total, índices i do caminho, índices j do caminho).
+    """
+    n, m = custo.shape
+    if banda is not None:
+        i_idx = np.arange(n)[:, None] * (m / max(n, 1))
+        fora = np.abs(i_idx - np.arange(m)[None, :]) > banda + m / max(n, 1)
+        custo = np.where(fora, np.inf, custo)
+
+    acumulado = np.full((n + 1, m + 1), np.inf)
+    acumulado[0, 0] = 0.0
+    passos = np.zeros((n + 1, m + 1), dtype=np.int8)  # 0 diagonal, 1 cima, 2 esquerda
+
+    for k in range(2, n + m + 1):
+        i = np.arange(max(1, k - m), min(n, k - 1) + 1)
+        j = k - i
+        candidatos = np.stack((acumulado[i - 1, j - 1], acumulado[i - 1, j], acumulado[i, j - 1]))
+        escolha = np.argmin(candidatos, axis=0)
+        acumulado[i, j] = custo[i - 1, j - 1] + candidatos[escolha, np.arange(len(i))]
+        passos[i, j] = escolha
+
+    caminho_i, caminho_j = [], []
+    i, j = n, m
+    while i > 0 and j > 0:
+        caminho_i.append(i - 1)
+        caminho_j.append(j - 1)
+        passo = passos[i, j]
+        if passo == 0:
+            i, j = i - 1, j - 1
+        elif passo == 1:
+            i -= 1
+        else:
+            j -= 1
+    return float(acumulado[n, m]), np.array(caminho_i[::-1]), np.array(caminho_j[::-1])
+
+
+@perfilamento.medir()
+def alinhar(gabarito, tocado, peso_tempo=0.0, banda=None):
+    """
+    Alinha a timeline tocada à do gabarito.
+
+    peso_tempo: custo extra por segundo de diferença entre os centros dos
+    segmentos (0 = só harmonia, tolera andamento diferente).
+
+    Retorna dict com 'segmentos' (um por segmento do gabarito, com acorde
+    tocado correspondente, se está correto e o deslocamento de início em
+    segundos) e as métricas agregadas.
+    """
+    if not gabarito or not tocado:
+        return {
+            "segmentos": [],
+            "precisao": 0.0,
+            "precisao_ponderada": 0.0,
+            "offset_medio": None,
+            "custo": None
+        }
+
+    ini_a, fim_a, cod_a = codificar(gabarito)
+    ini_b, fim_b, cod_b = codificar(tocado)
+    distancias = matriz_distancias()
+
+    custo = distancias[cod_a[:, None], cod_b[None, :]]
+    if peso_tempo:
+        centros_a = (ini_a + fim_a) / 2
+        centros_b = (ini_b + fim_b) / 2
+        custo = custo + peso_tempo * np.abs(centros_a[:, None] - centros_b[None, :])
+
+    total, caminho_i, caminho_j = dtw(custo, banda)
+
+    # Para cada segmento do gabarito, o par mais próximo harmonicamente
+    # (empate: o primeiro no tempo)
+    dist_par = distancias[cod_a[caminho_i], cod_b[caminho_j]]
+    ordem = np.lexsort((caminho_j, dist_par, caminho_i))
+    _, primeiros = np.unique(caminho_i[ordem], return_index=True)
+    melhor_j = caminho_j[ordem][primeiros]
+
+    correto = cod_a == cod_b[melhor_j]
+    offsets = ini_b[melhor_j] - ini_a
+    duracoes = np.maximum(fim_a - ini_a, 0.0)
+
+    segmentos = [
+        {
+            "start": gabarito[i]["start"],
+            "end": gabarito[i]["end"],
+            "chord_majmin": gabarito[i]["chord_majmin"],
+            "chord_tocado": tocado[int(melhor_j[i])]["chord_majmin"],
+            "correto": bool(correto[i]),
+            "offset": round(float(offsets[i]), 3)
+        }
+        for i in range(len(gabarito))
+    ]
+
+    return {
+        "segmentos": segmentos,
+        "precisao": round(float(correto.mean()), 4),
+        "precisao_ponderada": round(float((duracoes * correto).sum() / max(duracoes.sum(), 1e-9)), 4),
+        "offset_medio": round(float(np.abs(offsets[correto]).mean()), 3) if correto.any() else None,
+        "custo": round(total, 4)
+    }
@@ -0,0 +1,284 @@
+# ARQUIVO DE ANÁLISE LOCAL DE ACORDES (SEM MUSIC.AI)
+# Cromagrama + casamento com modelos de tríades maiores/menores (vocabulário majmin)
+
+import os
+import wave
+import shutil
+import subprocess
+from functools import lru_cache
+
+import numpy as np
+
+from modulos import perfilamento
+
+NOTAS = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+BEMOIS = {"Db": "C#", "Eb": "D#", "Gb": "F#", "Ab": "G#", "Bb": "A#", "Cb": "B", "Fb": "E"}
+
+TAXA_PADRAO = 16000
+TAMANHO_JANELA = 4096
+SALTO = 2048
+FREQ_MIN = 55.0
+FREQ_MAX = 2000.0
+ENERGIA_MINIMA = 1e-4  # RMS abaixo disso é tratado como silêncio ("N")
+
+
+# ===============================
+# Rótulos de acordes
+# ===============================
+
+def rotulo(raiz, menor):
+    """Monta o rótulo no formato chord_majmin (ex: 'C:maj', 'A:min')."""
+    return f"{NOTAS[raiz]}:{'min' if menor else 'maj'}"
+
+
+def parse_rotulo(texto):
+    """
+    Converte um rótulo ('C:maj', 'Am', 'A:min7', 'Bb', 'N') em (raiz, menor).
+    Retorna None para 'N'/'X' ou rótulos não reconhecidos.
+    """
+    if not texto:
+        return None
+    texto = str(texto).strip()
+    if texto in ("N", "X"):
+        return None
+
+    letra = texto[0].upper()
+    if len(texto) > 1 and texto[1] in "#b":
+        nota, resto = letra + texto[1], texto[2:]
+    else:
+        nota, resto = letra, texto[1:]
+    nota = BEMOIS.get(nota, nota)
+    if nota not in NOTAS:
+        return None
+
+    resto = resto.split("/")[0].lstrip(":").lower()
+    menor = resto.startswith("min") or (resto.startswith("m") and not resto.startswith("maj"))
+    return NOTAS.index(nota), menor
+
+
+def normalizar_rotulo(texto):
+    """Normaliza qualquer rótulo para o formato majmin ('C:maj', 'A:min' ou 'N')."""
+    parsed = parse_rotulo(texto)
+    if parsed is None:
+        return "N"
+    return rotulo(*parsed)
+
+
+def mesmo_acorde(a, b):
+    """Compara dois rótulos ignorando a grafia ('Am' == 'A:min')."""
+    return normalizar_rotulo(a) == normalizar_rotulo(b)
+
+
+# ===============================
+# Áudio → PCM
+# ===============================
+
+FORMATOS_PCM = {"s16le": "<i2", "f32le": "<f4"}
+
+
+def pcm_para_float(dados, formato="s16le"):
+    """
+    Converte bytes PCM mono (s16le ou f32le) em array float32 entre -1 e 1.
+    ValueError se o formato é desconhecido ou o quadro não tem um número inteiro de amostras.
+    """
+    if formato not in FORMATOS_PCM:
+        raise ValueError(f"Formato PCM desconhecido: {formato}")
+    tipo = np.dtype(FORMATOS_PCM[formato])
+    if len(dados) % tipo.itemsize:
+        raise ValueError(f"Quadro {formato} com {len(dados)} bytes (não é múltiplo de {tipo.itemsize})")
+    amostras = np.frombuffer(dados, dtype=tipo).astype(np.float32)
+    if formato == "f32le":
+        return np.nan_to_num(amostras, nan=0.0, posinf=1.0, neginf=-1.0)
+    return amostras / 32768.0
+
+
+@perfilamento.medir()
+def carregar_pcm(caminho, taxa=TAXA_PADRAO):
+    """
+    Decodifica um arquivo de áudio em PCM mono float32 na taxa pedida.
+    WAV é lido direto; outros formatos (mp3, m4a, ogg) passam pelo ffmpeg.
+    """
+    if caminho.lower().endswith(".wav"):
+        try:
+            return _ler_wav(caminho, taxa)
+        except (wave.Error, EOFError):
+            pass  # WAV com codec não-PCM: tenta pelo ffmpeg
+
+    if not shutil.which("ffmpeg"):
+        raise RuntimeError("ffmpeg não encontrado para decodificar " + os.path.basename(caminho))
+
+    proc = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", caminho, "-f", "s16le", "-ac", "1", "-ar", str(taxa), "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+    )
+    if proc.returncode != 0:
+        raise RuntimeError("Falha ao decodificar áudio: " + proc.stderr.decode(errors="ignore"))
+    return pcm_para_float(proc.stdout)
+
+
+def _ler_wav(caminho, taxa):
+    with wave.open(caminho, "rb") as w:
+        canais = w.getnchannels()
+        largura = w.getsampwidth()
+        taxa_original = w.getframerate()
+        dados = w.readframes(w.getnframes())
+
+    if largura == 1:
+        sinal = (np.frombuffer(dados, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif largura == 2:
+        sinal = np.frombuffer(dados, dtype="<i2").astype(np.float32) / 32768.0
+    elif largura == 4:
+        sinal = np.frombuffer(dados, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise wave.Error(f"Largura de amostra não suportada: {largura}")
+
+    if canais > 1:
+        sinal = sinal.reshape(-1, canais).mean(axis=1)
+    return reamostrar(sinal, taxa_original, taxa)
+
+
+def reamostrar(sinal, taxa_original, taxa):
+    """Reamostragem linear simples (suficiente para cromagrama)."""
+    if taxa_original == taxa or len(sinal) == 0:
+        return sinal.astype(np.float32)
+    n = int(round(len(sinal) * taxa / taxa_original))
+    x = np.linspace(0, len(sinal) - 1, n)
+    return np.interp(x, np.arange(len(sinal)), sinal).astype(np.float32)
+
+
+def salvar_wav(caminho, sinal, taxa=TAXA_PADRAO):
+    """Grava PCM float32 mono como WAV 16 bits."""
+    pcm = (np.clip(sinal, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(caminho, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(taxa)
+        w.writeframes(pcm.tobytes())
+    return caminho
+
+
+# ===============================
+# Cromagrama e classificação
+# ===============================
+
+@lru_cache(maxsize=8)
+def _matriz_croma(taxa, n_fft):
+    """Matriz (12 x bins) que soma a magnitude de cada bin na sua classe de altura."""
+    freqs = np.fft.rfftfreq(n_fft, 1.0 / taxa)
+    matriz = np.zeros((12, len(freqs)), dtype=np.float32)
+    validos = (freqs >= FREQ_MIN) & (freqs <= FREQ_MAX)
+    midi = 69 + 12 * np.log2(freqs[validos] / 440.0)
+    classes = np.mod(np.round(midi).astype(int), 12)
+    matriz[classes, np.nonzero(validos)[0]] = 1.0
+    return matriz
+
+
+@lru_cache(maxsize=1)
+def _modelos():
+    """24 modelos normalizados: 12 tríades maiores seguidas de 12 menores."""
+    modelos = np.zeros((24, 12), dtype=np.float32)
+    for raiz in range(12):
+        modelos[raiz, [raiz, (raiz + 4) % 12, (raiz + 7) % 12]] = 1.0
+        modelos[12 + raiz, [raiz, (raiz + 3) % 12, (raiz + 7) % 12]] = 1.0
+    return modelos / np.linalg.norm(modelos, axis=1, keepdims=True)
+
+
+@perfilamento.medir()
+def cromagrama(sinal, taxa=TAXA_PADRAO, n_fft=TAMANHO_JANELA, salto=SALTO):
+    """
+    Retorna (croma, energia): croma é (quadros x 12) normalizado por quadro
+    e energia é o RMS de cada quadro.
+    """
+    sinal = np.asarray(sinal, dtype=np.float32)
+    if len(sinal) < n_fft:
+        sinal = np.pad(sinal, (0, n_fft - len(sinal)))
+    n_quadros = 1 + (len(sinal) - n_fft) // salto
+    indices = np.arange(n_fft)[None, :] + salto * np.arange(n_quadros)[:, None]
+    quadros = sinal[indices]
+
+    energia = np.sqrt(np.mean(quadros ** 2, axis=1))
+    espectro = np.abs(np.fft.rfft(quadros * np.hanning(n_fft).astype(np.float32), axis=1))
+    croma = espectro @ _matriz_croma(taxa, n_fft).T
+    normas = np.linalg.norm(croma, axis=1, keepdims=True)
+    croma = croma / np.maximum(normas, 1e-9)
+    return croma.astype(np.float32), energia.astype(np.float32)
+
+
+@perfilamento.medir()
+def classificar(croma, temperatura=0.05):
+    """
+    Classifica vetores de croma (N x 12) contra os 24 modelos.
+    Retorna (índices 0..23, confiança 0..1 via softmax das similaridades).
+    """
+    sims = croma @ _modelos().T
+    melhores = np.argmax(sims, axis=1)
+    exp = np.exp((sims - sims.max(axis=1, keepdims=True)) / temperatura)
+    confianca = exp[np.arange(len(melhores)), melhores] / exp.sum(axis=1)
+    return melhores, confianca
+
+
+def _rotulo_indice(indice):
+    return rotulo(int(indice) % 12, int(indice) >= 12)
+
+
+def estimar_acorde(sinal, taxa=TAXA_PADRAO):
+    """
+    Estima um único acorde para o trecho (ex: janela recente do microfone).
+    Retorna (rótulo, confiança); silêncio retorna ('N', 0.0).
+    """
+    croma, energia = cromagrama(sinal, taxa)
+    ativos = energia >= ENERGIA_MINIMA
+    if not ativos.any():
+        return "N", 0.0
+    media = (croma[ativos] * energia[ativos, None]).sum(axis=0)
+    media = media / max(np.linalg.norm(media), 1e-9)
+    indices, confianca = classificar(media[None, :])
+    return _rotulo_indice(indices[0]), float(confianca[0])
+
+
+@perfilamento.medir()
+def segmentar_acordes(sinal, taxa=TAXA_PADRAO, suavizacao=5, salto=SALTO):
+    """
+    Segmenta o áudio inteiro em acordes no mesmo formato de
+    extract_music_chords: [{'start', 'end', 'chord_majmin'}], sem 'N'.
+    """
+    croma, energia = cromagrama(sinal, taxa, salto=salto)
+    return segmentar_croma(croma, energia, taxa, suavizacao, salto)
+
+
+def segmentar_croma(croma, energia, taxa=TAXA_PADRAO, suavizacao=5, salto=SALTO):
+    """
+    Mesma segmentação de segmentar_acordes a partir de um cromagrama já calculado
+    ('salto' tem que ser o usado no cromagrama: define o tempo de cada quadro).
+    """
+    indices, _ = classificar(croma)
+    indices = np.where(energia >= ENERGIA_MINIMA, indices, -1)
+
+    # Filtro de moda: cada quadro assume o rótulo mais frequente na vizinhança
+    if suavizacao > 1 and len(indices) > suavizacao:
+        meio = suavizacao // 2
+        preenchido = np.pad(indices, meio, mode="edge")
+        janelas = np.lib.stride_tricks.sliding_window_view(preenchido, suavizacao)
+        contagens = (janelas[:, :, None] == np.arange(-1, 24)[None, None, :]).sum(axis=1)
+        indices = np.argmax(contagens, axis=1) - 1
+
+    segundos_por_quadro = salto / float(taxa)
+    mudancas = np.flatnonzero(np.diff(indices)) + 1
+    inicios = np.concatenate(([0], mudancas))
+    fins = np.concatenate((mudancas, [len(indices)]))
+
+    segmentos = []
+    for ini, fim in zip(inicios, fins):
+        if indices[ini] < 0:
+            continue
+        segmentos.append({
+            "start": round(float(ini * segundos_por_quadro), 3),
+            "end": round(float(fim * segundos_por_quadro), 3),
+            "chord_majmin": _rotulo_indice(indices[ini])
+        })
+    return segmentos
+
+
+def acordes_locais(sinal, taxa=TAXA_PADRAO):
+    """Lista de acordes no formato de get_chords_from_audio (ex: ['C:maj', 'G:maj'])."""
+    return [s["chord_majmin"] for s in segmentar_acordes(sinal, taxa)]
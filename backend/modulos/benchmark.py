@@ -0,0 +1,311 @@
+# ARQUIVO QUE MEDE VELOCIDADE E PRECISÃO DOS DETECTORES DE ACORDES
+# Um corpus é uma pasta com corpus.json: cada item tem o áudio e o gabarito no
+# formato de extract_music_chords ([{'start', 'end', 'chord_majmin'}]).
+# O corpus é semeado com progressões sintéticas (gabarito exato) e com os áudios do
+# catálogo que tiverem gabarito ao lado (<audio>.acordes.json) ou rotulados por um backend.
+#
+# Backends: 'local[:suavizacao]' (analise_local) e 'musicai[:workflow]'.
+# O relatório traz latência (p50/p95), vazão, precisão por tempo de segmento
+# (fração da duração do gabarito com o acorde certo) e acerto do primeiro acorde.
+#
+# Uso:
+#   python -m modulos.benchmark corpus bench/ --sinteticos 20 [--catalogo audios] [--rotular-com musicai]
+#   python -m modulos.benchmark rodar bench/ --backend local --backend musicai:<workflow> [--paralelo 2] [--saida r.json]
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from modulos import alinhamento, analise_local, extract_music_chords, pool_analise, catalogo
+
+ARQUIVO_CORPUS = "corpus.json"
+SUFIXO_GABARITO = ".acordes.json"
+WORKFLOW_PADRAO = "untitled-workflow-18c7355"
+
+# Progressões comuns (graus da escala maior: 0 = I); transpostas para um tom sorteado
+PROGRESSOES = [
+    [(0, False), (7, False), (9, True), (5, False)],   # I V vi IV
+    [(9, True), (5, False), (0, False), (7, False)],   # vi IV I V
+    [(0, False), (5, False), (7, False), (0, False)],  # I IV V I
+    [(2, True), (7, False), (0, False), (0, False)],   # ii V I
+    [(0, False), (9, True), (2, True), (7, False)],    # I vi ii V
+]
+
+
+# ===============================
+# Corpus
+# ===============================
+
+def _nota(frequencia, duracao, taxa, harmonicos=4):
+    t = np.arange(int(duracao * taxa)) / float(taxa)
+    onda = sum(np.sin(2 * np.pi * frequencia * h * t) / h for h in range(1, harmonicos + 1))
+    envelope = np.minimum(1.0, t / 0.02) * np.exp(-t * 1.5)
+    return (onda * envelope).astype(np.float32)
+
+
+def renderizar_acorde(raiz, menor, duracao, taxa=analise_local.TAXA_PADRAO):
+    """Tríade em posição fechada (oitava 4) com o baixo uma oitava abaixo."""
+    base = 261.63 * 2 ** (raiz / 12.0)
+    intervalos = [0, 3 if menor else 4, 7]
+    sinal = sum(_nota(base * 2 ** (i / 12.0), duracao, taxa) for i in intervalos)
+    sinal = sinal + 0.8 * _nota(base / 2, duracao, taxa)
+    return sinal / 4.0
+
+
+def sintetizar(gerador, n_acordes=8, taxa=analise_local.TAXA_PADRAO, ruido=0.01):
+    """(sinal, gabarito) de uma progressão sorteada, com silêncio inicial e ruído."""
+    tom = int(gerador.integers(12))
+    if gerador.random() < 0.6:
+        graus = PROGRESSOES[int(gerador.integers(len(PROGRESSOES)))]
+        graus = (graus * (n_acordes // len(graus) + 1))[:n_acordes]
+    else:
+        graus = [(int(gerador.integers(12)), bool(gerador.integers(2))) for _ in range(n_acordes)]
+
+    partes = [np.zeros(int(gerador.uniform(0, 1.0) * taxa), dtype=np.float32)]
+    gabarito = []
+    tempo = len(partes[0]) / float(taxa)
+    for grau, menor in graus:
+        duracao = round(float(gerador.uniform(1.0, 3.0)), 2)
+        partes.append(renderizar_acorde((tom + grau) % 12, menor, duracao, taxa))
+        gabarito.append({
+            "start": round(tempo, 3),
+            "end": round(tempo + duracao, 3),
+            "chord_majmin": analise_local.rotulo((tom + grau) % 12, menor)
+        })
+        tempo += duracao
+    sinal = np.concatenate(partes)
+    sinal = sinal + gerador.normal(0, ruido, len(sinal)).astype(np.float32)
+    return sinal.astype(np.float32), gabarito
+
+
+def _duracao(caminho, gabarito):
+    try:
+        return round(len(analise_local.carregar_pcm(caminho)) / float(analise_local.TAXA_PADRAO), 3)
+    except Exception:
+        return max((float(s["end"]) for s in gabarito), default=0.0)
+
+
+def criar_corpus(pasta, sinteticos=20, semente=0, pasta_catalogo=None, rotular_com=None):
+    """Gera a pasta do corpus e o corpus.json. Retorna o manifesto."""
+    os.makedirs(os.path.join(pasta, "sintetico"), exist_ok=True)
+    gerador = np.random.default_rng(semente)
+    itens = []
+
+    for i in range(sinteticos):
+        sinal, gabarito = sintetizar(gerador)
+        relativo = f"sintetico/{i:03d}.wav"
+        analise_local.salvar_wav(os.path.join(pasta, relativo), sinal)
+        itens.append({
+            "nome": relativo[:-4],
+            "audio": relativo,
+            "duracao": round(len(sinal) / float(analise_local.TAXA_PADRAO), 3),
+            "origem": "sintetico",
+            "gabarito": gabarito
+        })
+
+    if pasta_catalogo:
+        rotulador = backend(rotular_com) if rotular_com else None
+        for caminho in catalogo.arquivos(pasta_catalogo):
+            lateral = os.path.splitext(caminho)[0] + SUFIXO_GABARITO
+            if os.path.exists(lateral):
+                with open(lateral, encoding="utf-8") as f:
+                    gabarito, origem = json.load(f), "gabarito"
+            elif rotulador:
+                # Pseudo-gabarito: mede concordância com este backend, não precisão absoluta
+                print(f"🏷️ Rotulando {caminho} com {rotular_com}...")
+                gabarito, origem = rotulador(caminho), rotular_com
+            else:
+                print(f"⏭️ {caminho}: sem {SUFIXO_GABARITO} (use --rotular-com)")
+                continue
+            itens.append({
+                "nome": "catalogo/" + catalogo.nome_musica(caminho, pasta_catalogo),
+                "audio": os.path.relpath(os.path.abspath(caminho), os.path.abspath(pasta)),
+                "duracao": _duracao(caminho, gabarito),
+                "origem": origem,
+                "gabarito": gabarito
+            })
+
+    manifesto = {"versao": 1, "semente": semente, "itens": itens}
+    with open(os.path.join(pasta, ARQUIVO_CORPUS), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    return manifesto
+
+
+def carregar_corpus(pasta):
+    with open(os.path.join(pasta, ARQUIVO_CORPUS), encoding="utf-8") as f:
+        manifesto = json.load(f)
+    for item in manifesto["itens"]:
+        item["caminho"] = os.path.normpath(os.path.join(pasta, item["audio"]))
+    return manifesto
+
+
+# ===============================
+# Backends
+# ===============================
+
+def backend(spec):
+    """Função caminho → segmentos para 'local[:suavizacao]' ou 'musicai[:workflow]'."""
+    nome, _, parametro = spec.partition(":")
+    if nome == "local":
+        suavizacao = int(parametro or 5)
+
+        def local(caminho):
+            sinal = analise_local.carregar_pcm(caminho)
+            croma, energia = pool_analise.padrao().cromagrama(sinal)
+            return analise_local.segmentar_croma(croma, energia, suavizacao=suavizacao)
+        return local
+    if nome == "musicai":
+        workflow = parametro or WORKFLOW_PADRAO
+        # Chamada direta (sem o cache de resultados) para medir a latência real
+        return lambda caminho: extract_music_chords.main(caminho, workflow)
+    raise ValueError(f"Backend desconhecido: {spec} (use local[:suavizacao] ou musicai[:workflow])")
+
+
+# ===============================
+# Métricas
+# ===============================
+
+def precisao_segmentos(gabarito, detectado):
+    """(segundos com o acorde certo, segundos do gabarito), comparando por sobreposição no tempo."""
+    ini_g, fim_g, cod_g = alinhamento.codificar(gabarito)
+    ini_d, fim_d, cod_d = alinhamento.codificar(detectado)
+    total = float(np.maximum(fim_g - ini_g, 0).sum())
+    if not len(detectado):
+        return 0.0, total
+    sobreposicao = np.minimum(fim_g[:, None], fim_d[None, :]) - np.maximum(ini_g[:, None], ini_d[None, :])
+    certos = (cod_g[:, None] == cod_d[None, :]) & (cod_g[:, None] != 0)
+    return float((np.maximum(sobreposicao, 0) * certos).sum()), total
+
+
+def primeiro_acorde(gabarito, detectado):
+    """True se o primeiro acorde detectado (ignorando 'N') é o primeiro do gabarito."""
+    detectados = [s for s in sorted(detectado, key=lambda s: float(s["start"])) if alinhamento.codigo(s["chord_majmin"])]
+    if not gabarito or not detectados:
+        return False
+    return analise_local.mesmo_acorde(min(gabarito, key=lambda s: float(s["start"]))["chord_majmin"],
+                                      detectados[0]["chord_majmin"])
+
+
+def _percentil(valores, p):
+    return round(float(np.percentile(valores, p)), 4) if valores else None
+
+
+# ===============================
+# Execução
+# ===============================
+
+def _medir(funcao, item):
+    inicio = time.perf_counter()
+    try:
+        detectado = funcao(item["caminho"])
+        erro = None
+    except Exception as e:
+        detectado, erro = [], str(e)
+    latencia = time.perf_counter() - inicio
+    certos, total = precisao_segmentos(item["gabarito"], detectado)
+    return {
+        "nome": item["nome"],
+        "origem": item["origem"],
+        "latencia": round(latencia, 4),
+        "erro": erro,
+        "segmentos": len(detectado),
+        "precisao_segmentos": round(certos / total, 4) if total else None,
+        "primeiro_acorde": primeiro_acorde(item["gabarito"], detectado),
+        "_certos": certos,
+        "_total": total
+    }
+
+
+def rodar(manifesto, spec, paralelo=1, repeticoes=1):
+    """Roda um backend sobre o corpus inteiro e resume as métricas."""
+    funcao = backend(spec)
+    itens = manifesto["itens"] * max(1, repeticoes)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, paralelo)) as executor:
+        medidas = list(executor.map(lambda item: _medir(funcao, item), itens))
+    parede = time.perf_counter() - inicio
+
+    ok = [m for m in medidas if m["erro"] is None]
+    latencias = [m["latencia"] for m in ok]
+    certos = sum(m.pop("_certos") for m in medidas)
+    total = sum(m.pop("_total") for m in medidas)
+    precisoes = [m["precisao_segmentos"] for m in medidas if m["precisao_segmentos"] is not None]
+    segundos_audio = sum(item["duracao"] for item, m in zip(itens, medidas) if m["erro"] is None)
+    return {
+        "backend": spec,
+        "paralelo": paralelo,
+        "itens": len(itens),
+        "falhas": len(itens) - len(ok),
+        "latencia_s": {
+            "p50": _percentil(latencias, 50),
+            "p95": _percentil(latencias, 95),
+            "media": round(float(np.mean(latencias)), 4) if latencias else None,
+            "max": round(max(latencias), 4) if latencias else None
+        },
+        "vazao": {
+            "itens_por_s": round(len(ok) / parede, 4),
+            "audio_s_por_s": round(segundos_audio / parede, 2)
+        },
+        # Falhas contam como erro: ponderada pela duração (corpus inteiro) e média por item
+        "precisao_segmentos": round(certos / total, 4) if total else None,
+        "precisao_segmentos_media": round(float(np.mean(precisoes)), 4) if precisoes else None,
+        "primeiro_acorde": round(sum(m["primeiro_acorde"] for m in medidas) / len(medidas), 4) if medidas else None,
+        "por_item": medidas
+    }
+
+
+def _linha(r):
+    lat = r["latencia_s"]
+    return (f"{r['backend']:<32} p50={lat['p50']}s p95={lat['p95']}s  {r['vazao']['itens_por_s']} itens/s "
+            f"({r['vazao']['audio_s_por_s']}x tempo real)  segmentos={r['precisao_segmentos']}  "
+            f"primeiro={r['primeiro_acorde']}  falhas={r['falhas']}/{r['itens']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de velocidade x precisão da detecção de acordes")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_corpus = comandos.add_parser("corpus", help="Gera o corpus (sintéticos + catálogo)")
+    p_corpus.add_argument("pasta")
+    p_corpus.add_argument("--sinteticos", type=int, default=20)
+    p_corpus.add_argument("--semente", type=int, default=0)
+    p_corpus.add_argument("--catalogo", default=None, help=f"Pasta de áudios (ex: {catalogo.PASTA_CATALOGO})")
+    p_corpus.add_argument("--rotular-com", default=None,
+                          help="Backend que rotula os áudios do catálogo sem gabarito (pseudo-gabarito)")
+
+    p_rodar = comandos.add_parser("rodar", help="Roda os backends sobre o corpus")
+    p_rodar.add_argument("pasta")
+    p_rodar.add_argument("--backend", action="append", required=True, help="local[:suavizacao] ou musicai[:workflow]")
+    p_rodar.add_argument("--paralelo", type=int, default=1, help="Itens analisados ao mesmo tempo")
+    p_rodar.add_argument("--repeticoes", type=int, default=1)
+    p_rodar.add_argument("--saida", default=None, help="Arquivo JSON do relatório (padrão: stdout)")
+    args = parser.parse_args()
+
+    if args.comando == "corpus":
+        manifesto = criar_corpus(args.pasta, args.sinteticos, args.semente, args.catalogo, args.rotular_com)
+        print(f"✅ Corpus com {len(manifesto['itens'])} itens em {os.path.join(args.pasta, ARQUIVO_CORPUS)}")
+        sys.exit(0)
+
+    manifesto = carregar_corpus(args.pasta)
+    relatorio = {
+        "corpus": os.path.abspath(args.pasta),
+        "itens_corpus": len(manifesto["itens"]),
+        "gerado_em": int(time.time()),
+        "resultados": []
+    }
+    for spec in args.backend:
+        resultado = rodar(manifesto, spec, args.paralelo, args.repeticoes)
+        print(_linha(resultado), file=sys.stderr)
+        relatorio["resultados"].append(resultado)
+
+    texto = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
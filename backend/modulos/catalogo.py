@@ -0,0 +1,158 @@
+# ARQUIVO QUE PRÉ-CALCULA AS TIMELINES DE ACORDES DAS MÚSICAS DO CATÁLOGO
+# Cada arquivo da pasta (ex: audios/Sparks.mp3) é analisado uma vez; a timeline
+# fica no estado compartilhado e a API serve direto dela, sem chamar o music.ai.
+# Só reprocessa arquivos novos ou alterados (hash do conteúdo), workflow diferente
+# ou mudança de timeline.VERSAO_ANALISE.
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from modulos import estado, extract_music_chords, resultados, timeline
+
+PASTA_CATALOGO = os.getenv("UMI_CATALOG_DIR", "audios")
+WORKFLOW_PADRAO = "untitled-workflow-18c7355"
+EXTENSOES_AUDIO = (".mp3", ".wav", ".m4a", ".ogg")
+PREFIXO = "catalogo:"
+
+
+def nome_musica(caminho, pasta):
+    """Nome da música no catálogo: caminho relativo sem extensão ('rock/Sparks.mp3' → 'rock/Sparks')."""
+    relativo = os.path.splitext(os.path.relpath(caminho, pasta))[0]
+    return relativo.replace(os.sep, "/")
+
+
+def arquivos(pasta):
+    """Arquivos de áudio da pasta (recursivo), em ordem."""
+    encontrados = []
+    for raiz, _, nomes in os.walk(pasta):
+        for nome in sorted(nomes):
+            if nome.lower().endswith(EXTENSOES_AUDIO):
+                encontrados.append(os.path.join(raiz, nome))
+    return sorted(encontrados)
+
+
+def obter(nome):
+    """Entrada do catálogo (manifesto) ou None."""
+    return estado.padrao().obter_json(PREFIXO + nome)
+
+
+def listar():
+    """Todas as entradas do catálogo, ordenadas pelo nome."""
+    entradas = []
+    for chave in sorted(estado.padrao().listar_chaves(PREFIXO)):
+        entrada = estado.padrao().obter_json(chave)
+        if entrada:
+            entradas.append(entrada)
+    return entradas
+
+
+def carregar_timeline(nome):
+    """(entrada, TimelineAcordes) da música ou (None, None)."""
+    entrada = obter(nome)
+    if entrada is None:
+        return None, None
+    return entrada, timeline.carregar(entrada["timeline_id"])
+
+
+def _atualizada(entrada, sha256, workflow):
+    return (
+        entrada is not None
+        and entrada.get("sha256") == sha256
+        and entrada.get("workflow") == workflow
+        and entrada.get("versao_analise") == timeline.VERSAO_ANALISE
+        and timeline.carregar(entrada["timeline_id"]) is not None
+    )
+
+
+def processar(caminho, pasta, workflow=WORKFLOW_PADRAO, forcar=False):
+    """
+    Garante a timeline de um arquivo do catálogo.
+    Retorna (status, entrada) com status 'atual' (nada a fazer) ou 'analisada'.
+    """
+    nome = nome_musica(caminho, pasta)
+    sha256 = resultados.hash_arquivo(caminho)
+    entrada = obter(nome)
+    if not forcar and _atualizada(entrada, sha256, workflow):
+        return "atual", entrada
+
+    inicio = time.monotonic()
+    # forcar ignora também o cache de resultados do music.ai
+    segmentos = extract_music_chords.main(caminho, workflow) if forcar else resultados.timeline(caminho, workflow)
+    tl = timeline.TimelineAcordes.de_segmentos(segmentos)
+    versao = (entrada or {}).get("versao", 0) + 1
+    # Sem forcar o resultado é o mesmo do cache, então o id é o mesmo de /api/extract-chords
+    timeline_id = timeline.gerar_id(sha256, workflow, revisao=versao if forcar else None)
+    timeline.salvar(timeline_id, tl)
+
+    nova = {
+        "nome": nome,
+        "arquivo": os.path.relpath(caminho, pasta),
+        "sha256": sha256,
+        "workflow": workflow,
+        "versao_analise": timeline.VERSAO_ANALISE,
+        "versao": versao,
+        "timeline_id": timeline_id,
+        "segmentos": len(tl),
+        "duracao_analise": round(time.monotonic() - inicio, 2),
+        "atualizado_em": int(time.time())
+    }
+    estado.padrao().definir_json(PREFIXO + nome, nova)
+    return "analisada", nova
+
+
+def pre_calcular(pasta=PASTA_CATALOGO, workflow=WORKFLOW_PADRAO, workers=2, forcar=False, remover_ausentes=False):
+    """
+    Analisa a pasta do catálogo com no máximo 'workers' análises simultâneas.
+    Retorna um resumo com as listas de analisadas, atuais, falhas e removidas.
+    """
+    resumo = {"analisadas": [], "atuais": [], "falhas": [], "removidas": []}
+    caminhos = arquivos(pasta)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futuros = {executor.submit(processar, c, pasta, workflow, forcar): c for c in caminhos}
+        for futuro in as_completed(futuros):
+            nome = nome_musica(futuros[futuro], pasta)
+            try:
+                status, entrada = futuro.result()
+            except Exception as e:
+                print(f"❌ {nome}: {e}")
+                resumo["falhas"].append({"nome": nome, "erro": str(e)})
+                continue
+            if status == "analisada":
+                print(f"🎼 {nome}: {entrada['segmentos']} acordes (v{entrada['versao']}, {entrada['duracao_analise']}s)")
+                resumo["analisadas"].append(nome)
+            else:
+                print(f"♻️ {nome}: já atualizada (v{entrada['versao']})")
+                resumo["atuais"].append(nome)
+
+    if remover_ausentes:
+        presentes = {nome_musica(c, pasta) for c in caminhos}
+        for entrada in listar():
+            if entrada["nome"] not in presentes:
+                estado.padrao().remover(PREFIXO + entrada["nome"])
+                print(f"🗑️ {entrada['nome']}: arquivo não existe mais, removida do catálogo")
+                resumo["removidas"].append(entrada["nome"])
+    return resumo
+
+
+# Uso: python -m modulos.catalogo [pasta] [--workers 2] [--workflow ...] [--forcar] [--remover-ausentes]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-calcula as timelines de acordes do catálogo")
+    parser.add_argument("pasta", nargs="?", default=PASTA_CATALOGO)
+    parser.add_argument("--workers", type=int, default=2, help="Análises simultâneas no music.ai")
+    parser.add_argument("--workflow", default=WORKFLOW_PADRAO)
+    parser.add_argument("--forcar", action="store_true", help="Reanalisa mesmo sem mudanças")
+    parser.add_argument("--remover-ausentes", action="store_true",
+                        help="Remove do catálogo as músicas cujo arquivo sumiu da pasta")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.pasta):
+        print(f"Pasta não encontrada: {args.pasta}")
+        sys.exit(1)
+    resumo = pre_calcular(args.pasta, args.workflow, args.workers, args.forcar, args.remover_ausentes)
+    print(f"✅ {len(resumo['analisadas'])} analisadas, {len(resumo['atuais'])} já atualizadas, "
+          f"{len(resumo['falhas'])} falhas, {len(resumo['removidas'])} removidas")
+    sys.exit(1 if resumo["falhas"] else 0)
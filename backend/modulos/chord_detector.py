@@ -3,12 +3,17 @@ import time
 import requests
 from dotenv import load_dotenv
 
+from modulos import prazo, perfilamento, jobs_duraveis, webhook
+
 load_dotenv()
 API_KEY = os.getenv("api_key")
 
 if not API_KEY:
     raise RuntimeError("Coloque sua chave no .env como api_key")
 
+# MUSICAI_API_URL permite apontar para outro endereço (ex: modulos.fake_musicai em testes)
+API_URL = os.getenv("MUSICAI_API_URL", "https://api.music.ai").rstrip("/")
+
 HEADERS_JSON = {
     "Authorization": API_KEY,
     "Content-Type": "application/json"
@@ -18,13 +23,14 @@ HEADERS_JSON = {
 # Funções principais
 # ===============================
 
+@perfilamento.medir()
 def upload_audio(file_path):
     """Envia o áudio e retorna a URL pública para usar no job."""
     print(f"📤 Enviando arquivo: {file_path}")
 
     # 1️⃣ Pede a URL assinada pra upload
-    upload_url = "https://api.music.ai/v1/upload"
-    resp = requests.get(upload_url, headers=HEADERS_JSON)
+    upload_url = f"{API_URL}/v1/upload"
+    resp = requests.get(upload_url, headers=HEADERS_JSON, timeout=prazo.atual().timeout())
     if resp.status_code != 200:
         raise RuntimeError(f"Erro ao obter URL de upload: {resp.text}")
 
@@ -35,7 +41,7 @@ def upload_audio(file_path):
 
     # 2️⃣ Faz o upload do arquivo
     with open(file_path, "rb") as f:
-        put_resp = requests.put(data["uploadUrl"], data=f)
+        put_resp = requests.put(data["uploadUrl"], data=f, timeout=prazo.atual().timeout())
         if put_resp.status_code not in (200, 201):
             raise RuntimeError(f"Falha no upload: {put_resp.text}")
 
@@ -44,8 +50,9 @@ def upload_audio(file_path):
     return data["downloadUrl"]
 
 
+@perfilamento.medir()
 def create_job(audio_url, workflow_id):
-    job_url = "https://api.music.ai/v1/job"
+    job_url = f"{API_URL}/v1/job"
     payload = {
         "name": "Chord Detection Job",
         "workflow": workflow_id,
@@ -53,10 +60,13 @@ def create_job(audio_url, workflow_id):
             "inputUrl": audio_url  # nome do campo deve ser inputUrl, exatamente assim!
         }
     }
+    callback, ref = webhook.novo_callback()
+    if callback:
+        payload["callbackUrl"] = callback
 
     print(f"🚀 Criando job com payload:\n{payload}")
 
-    resp = requests.post(job_url, headers=HEADERS_JSON, json=payload)
+    resp = requests.post(job_url, headers=HEADERS_JSON, json=payload, timeout=prazo.atual().timeout())
 
     try:
         data = resp.json()
@@ -71,15 +81,26 @@ def create_job(audio_url, workflow_id):
     if "id" not in data:
         raise RuntimeError(f"⚠️ Resposta inesperada da API (sem 'id'): {data}")
 
+    if ref:
+        webhook.vincular(ref, str(data["id"]))
     return data
 
 
+@perfilamento.medir()
 def get_job_status(job_id, max_wait=180, interval=3):
-    """Verifica o status do job até estar pronto (timeout de 3 minutos)"""
-    status_url = f"https://api.music.ai/v1/job/{job_id}"
+    """
+    Verifica o status do job até estar pronto (timeout de 3 minutos).
+    Com callbacks ativos, espera o webhook por até webhook.ESPERA_MAXIMA segundos; passada
+    essa janela (callback perdido) volta a consultar a cada 'interval', ainda acordando se
+    o callback chegar. Para antes se o prazo da requisição acabar ou ela for cancelada.
+    """
+    status_url = f"{API_URL}/v1/job/{job_id}"
     waited = 0
+    fim_janela = time.monotonic() + webhook.ESPERA_MAXIMA
     while True:
-        resp = requests.get(status_url, headers=HEADERS_JSON).json()
+        resp = requests.get(status_url, headers=HEADERS_JSON, timeout=prazo.atual().timeout())
+        resp.raise_for_status()
+        resp = resp.json()
         print("DEBUG resposta status:", resp)
         status = resp.get("status")
         if status is None:
@@ -87,20 +108,37 @@ def get_job_status(job_id, max_wait=180, interval=3):
         if status == "SUCCEEDED" or status == "succeeded":
             return resp
         elif status == "FAILED" or status == "failed":
-            raise RuntimeError("❌ O job falhou.")
-        time.sleep(interval)
-        waited += interval
+            raise jobs_duraveis.JobFalhou("❌ O job falhou.")
+        if webhook.ativo():
+            # Dorme até o callback (ou o polling de segurança) e confirma o status
+            inicio = time.monotonic()
+            janela = fim_janela - inicio
+            webhook.esperar(job_id, min(janela if janela > 0 else interval, max(0, max_wait - waited)))
+            waited += time.monotonic() - inicio
+        else:
+            prazo.atual().dormir(interval)
+            waited += interval
         if waited >= max_wait:
             raise RuntimeError(f"Timeout: job não completou após {max_wait} segundos (status atual: {status})")
 
 
+def delete_job(job_id):
+    """Remove o job no music.ai (usado quando ninguém mais espera o resultado)."""
+    try:
+        requests.delete(f"{API_URL}/v1/job/{job_id}", headers=HEADERS_JSON, timeout=5)
+        print(f"🗑️ Job {job_id} abandonado e removido")
+    except requests.RequestException as e:
+        print(f"⚠️ Não foi possível remover o job {job_id}: {e}")
+
+
+@perfilamento.medir()
 def extract_chords(job_data):
     """Extrai os acordes do resultado do job."""
     if "result" not in job_data or "chords" not in job_data["result"]:
         return []
 
     chords_url = job_data["result"]["chords"]
-    resp = requests.get(chords_url)
+    resp = requests.get(chords_url, timeout=prazo.atual().timeout())
     resp.raise_for_status()
     chords_json = resp.json()
     chords = []
@@ -114,15 +152,20 @@ def extract_chords(job_data):
 # Função simplificada p/ uso direto
 # ===============================
 
+@perfilamento.medir()
 def get_chords_from_audio(audio_path, workflow_id="untitled-workflow-18c7355"):
-    """Processa o áudio e retorna lista de acordes (ex: ['C', 'F', 'G'])."""
-    audio_url = upload_audio(audio_path)
-    job = create_job(audio_url, workflow_id)
-    job_id = job["id"]
-
-    print("⏳ Processando job...")
-    result = get_job_status(job_id)
-    chords_data = extract_chords(result)
+    """
+    Processa o áudio e retorna lista de acordes (ex: ['C', 'F', 'G']).
+    Cada etapa fica registrada (jobs_duraveis): uma nova tentativa retoma o job.
+    """
+    chords_data = jobs_duraveis.executar(
+        "acordes", audio_path, workflow_id,
+        enviar=upload_audio,
+        criar=lambda audio_url, workflow: create_job(audio_url, workflow)["id"],
+        aguardar=get_job_status,
+        baixar=extract_chords,
+        remover=delete_job
+    )
 
     acordes = [c["chord_majmin"] for c in chords_data]
     print(f"🎶 Acordes detectados: {acordes}")
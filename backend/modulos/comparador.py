@@ -1,15 +1,28 @@
 # ARQUIVO CRIADO PARA COMPARAR O ACORDE TOCADO PELO USUÁRIO E O DA MÚSICA
 
-from modulos import chord_detector
-
-def comparar_com_moises(gabarito, tocado):
+from modulos import referencias, resultados, alinhamento, perfilamento
+
+@perfilamento.medir()
+def comparar_com_moises(gabarito, tocado, referencia_id=None):
+    """
+    Compara o primeiro acorde do gabarito com o do áudio tocado.
+    Com referencia_id, usa os acordes já registrados em vez de analisar o gabarito.
+    """
     workflow = "untitled-workflow-18c7355"
 
-    print("🎵 Processando gabarito...") 
-    acordes_gabarito = chord_detector.get_chords_from_audio(gabarito, workflow)
+    if referencia_id:
+        referencia = referencias.obter(referencia_id)
+        if referencia is None:
+            return f"⚠️ Referência '{referencia_id}' não registrada."
+        print(f"📘 Usando referência registrada '{referencia_id}'")
+        acordes_gabarito = referencia["acordes"]
+    else:
+        print("🎵 Processando gabarito...") 
+        acordes_gabarito = resultados.acordes(gabarito, workflow)
 
     print("🎵 Processando áudio tocado...")
-    acordes_tocado = chord_detector.get_chords_from_audio(tocado, workflow)
+    # O tocado é a tentativa avaliada: nunca herda o resultado de um áudio parecido (ex: o próprio gabarito)
+    acordes_tocado = resultados.acordes(tocado, workflow, reaproveitar=False)
 
     # Comparação simples
     if not acordes_gabarito or not acordes_tocado:
@@ -21,6 +34,21 @@ def comparar_com_moises(gabarito, tocado):
         return f"❌ Errado! O gabarito era {acordes_gabarito[0]}, mas você tocou {acordes_tocado[0]}."
 
 
+@perfilamento.medir()
+def comparar_musica(gabarito, tocado, workflow="untitled-workflow-18c7355", peso_tempo=0.0):
+    """
+    Compara a música/progressão inteira: extrai as duas timelines
+    ({start, end, chord_majmin}) e alinha com DTW segmento a segmento.
+    """
+    print("🎵 Extraindo timeline do gabarito...")
+    timeline_gabarito = resultados.timeline(gabarito, workflow)
+
+    print("🎵 Extraindo timeline do áudio tocado...")
+    timeline_tocado = resultados.timeline(tocado, workflow, reaproveitar=False)
+
+    return alinhamento.alinhar(timeline_gabarito, timeline_tocado, peso_tempo=peso_tempo)
+
+
 # Teste rápido
 if __name__ == "__main__":
     gabarito = "acordes/A (Lá).wav"
@@ -0,0 +1,195 @@
+# ARQUIVO QUE CONTROLA QUANTOS JOBS DO MUSIC.AI RODAM AO MESMO TEMPO
+# Filas limitadas por prioridade, cota por cliente e rejeição rápida (429) quando cheio
+
+import math
+import time
+import threading
+import contextvars
+from collections import deque, Counter
+from contextlib import contextmanager
+
+INTERATIVO = "interativo"
+LOTE = "lote"
+PRIORIDADES = (INTERATIVO, LOTE)  # ordem = prioridade (primeiro é atendido antes)
+
+# Pedido corrente (escalonador, prioridade, cliente): definido pelo endpoint e usado
+# por vaga() só em volta da chamada ao provedor, então resultados em cache não ocupam vaga
+_pedido = contextvars.ContextVar("escalonamento", default=None)
+
+
+class FilaCheia(Exception):
+    """Trabalho recusado; retry_after é a sugestão de espera em segundos."""
+
+    def __init__(self, mensagem, retry_after, motivo="fila"):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+        self.motivo = motivo
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, int(math.ceil(p / 100.0 * len(ordenados))) - 1)
+    return round(ordenados[max(k, 0)], 3)
+
+
+class Escalonador:
+    """
+    Admissão e escalonamento de trabalho pesado (jobs do music.ai).
+
+    - max_execucoes: trabalhos rodando ao mesmo tempo
+    - max_lote: teto para a classe 'lote' (o resto fica reservado ao interativo)
+    - limites_fila: tamanho máximo de cada fila de espera
+    - cota_por_cliente: trabalhos (na fila + rodando) por cliente
+    - espera_maxima: segundos na fila antes de desistir com 429
+    """
+
+    def __init__(self, max_execucoes=4, max_lote=None, limites_fila=None,
+                 cota_por_cliente=3, espera_maxima=60.0):
+        self.max_execucoes = max_execucoes
+        self.max_lote = max_lote if max_lote is not None else max(1, max_execucoes - 1)
+        self.limites_fila = limites_fila or {INTERATIVO: 20, LOTE: 10}
+        self.cota_por_cliente = cota_por_cliente
+        self.espera_maxima = espera_maxima
+
+        self._cond = threading.Condition()
+        self._filas = {p: deque() for p in PRIORIDADES}
+        self._rodando = Counter()
+        self._por_cliente = Counter()
+
+        # Métricas
+        self._esperas = {p: deque(maxlen=500) for p in PRIORIDADES}
+        self._duracoes = deque(maxlen=200)
+        self._admitidos = Counter()
+        self._rejeitados = Counter()
+
+    # ---------- admissão ----------
+
+    def _pode_rodar(self, prioridade):
+        total = sum(self._rodando.values())
+        if total >= self.max_execucoes:
+            return False
+        if prioridade == LOTE and self._rodando[LOTE] >= self.max_lote:
+            return False
+        return True
+
+    def _vez_de(self, ticket, prioridade):
+        """O ticket roda se for o primeiro da fila de maior prioridade que pode rodar."""
+        for p in PRIORIDADES:
+            if self._filas[p] and self._pode_rodar(p):
+                return p == prioridade and self._filas[p][0] is ticket
+        return False
+
+    def retry_after(self, prioridade):
+        """Estimativa (segundos) de quando a fila deve ter espaço."""
+        media = sum(self._duracoes) / len(self._duracoes) if self._duracoes else 10.0
+        a_frente = len(self._filas[INTERATIVO]) + (len(self._filas[LOTE]) if prioridade == LOTE else 0)
+        return max(1, int(math.ceil(media * (a_frente + 1) / self.max_execucoes)))
+
+    @contextmanager
+    def slot(self, prioridade=INTERATIVO, cliente="anonimo", espera=None):
+        """
+        Bloqueia até haver vaga para o trabalho e libera ao sair do bloco.
+        Levanta FilaCheia quando a fila ou a cota do cliente estão esgotadas.
+        espera limita o tempo na fila abaixo de espera_maxima (ex: prazo da requisição).
+        """
+        ticket = object()
+        with self._cond:
+            if self._por_cliente[cliente] >= self.cota_por_cliente:
+                self._rejeitados[prioridade] += 1
+                raise FilaCheia("Limite de trabalhos simultâneos do cliente atingido",
+                                self.retry_after(prioridade), motivo="cota")
+            if len(self._filas[prioridade]) >= self.limites_fila[prioridade]:
+                self._rejeitados[prioridade] += 1
+                raise FilaCheia("Fila de processamento cheia", self.retry_after(prioridade))
+
+            self._filas[prioridade].append(ticket)
+            self._por_cliente[cliente] += 1
+            chegada = time.monotonic()
+            limite = chegada + (self.espera_maxima if espera is None else min(espera, self.espera_maxima))
+
+            while not self._vez_de(ticket, prioridade):
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._filas[prioridade].remove(ticket)
+                    self._liberar_cliente(cliente)
+                    self._rejeitados[prioridade] += 1
+                    self._cond.notify_all()
+                    raise FilaCheia("Tempo máximo de espera na fila esgotado",
+                                    self.retry_after(prioridade), motivo="espera")
+                self._cond.wait(restante)
+
+            self._filas[prioridade].popleft()
+            self._rodando[prioridade] += 1
+            self._admitidos[prioridade] += 1
+            self._esperas[prioridade].append(time.monotonic() - chegada)
+            self._cond.notify_all()
+
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._rodando[prioridade] -= 1
+                self._liberar_cliente(cliente)
+                self._duracoes.append(time.monotonic() - inicio)
+                self._cond.notify_all()
+
+    def _liberar_cliente(self, cliente):
+        self._por_cliente[cliente] -= 1
+        if self._por_cliente[cliente] <= 0:
+            del self._por_cliente[cliente]
+
+    # ---------- métricas ----------
+
+    def metricas(self):
+        with self._cond:
+            filas = {}
+            for p in PRIORIDADES:
+                esperas = list(self._esperas[p])
+                filas[p] = {
+                    "profundidade": len(self._filas[p]),
+                    "limite": self.limites_fila[p],
+                    "rodando": self._rodando[p],
+                    "admitidos": self._admitidos[p],
+                    "rejeitados": self._rejeitados[p],
+                    "espera_p50": _percentil(esperas, 50),
+                    "espera_p95": _percentil(esperas, 95),
+                    "espera_max": round(max(esperas), 3) if esperas else None
+                }
+            duracoes = list(self._duracoes)
+            return {
+                "capacidade": self.max_execucoes,
+                "capacidade_lote": self.max_lote,
+                "rodando": sum(self._rodando.values()),
+                "clientes_ativos": len(self._por_cliente),
+                "duracao_p50": _percentil(duracoes, 50),
+                "duracao_p95": _percentil(duracoes, 95),
+                "filas": filas
+            }
+
+
+@contextmanager
+def pedido(escalonador, prioridade=INTERATIVO, cliente="anonimo"):
+    """Marca o trabalho corrente: as chamadas ao provedor dentro do bloco pedem vaga em 'escalonador'."""
+    token = _pedido.set((escalonador, prioridade, cliente))
+    try:
+        yield
+    finally:
+        _pedido.reset(token)
+
+
+@contextmanager
+def vaga(espera=None):
+    """
+    Vaga para uma chamada ao provedor no pedido corrente (ver pedido()).
+    Fora de um pedido (ex: pré-cálculo pela linha de comando) roda direto.
+    """
+    atual = _pedido.get()
+    if atual is None:
+        yield
+        return
+    escalonador, prioridade, cliente = atual
+    with escalonador.slot(prioridade, cliente, espera=espera):
+        yield
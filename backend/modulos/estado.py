@@ -0,0 +1,496 @@
+# ARQUIVO COM O ESTADO COMPARTILHADO ENTRE PROCESSOS/HOSTS DO BACKEND
+# Registros de jobs, cache de resultados, dados de referência e locks de execução única (single-flight)
+#
+# UMI_STATE_URL escolhe a implementação:
+#   sqlite:///data/estado.db   → vários processos no mesmo host (padrão)
+#   redis://host:6379/0        → vários hosts (qualquer servidor que fale o protocolo do Redis)
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import socketserver
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+PASTA_DADOS = os.getenv("UMI_DATA_DIR", "data")
+URL_PADRAO = "sqlite:///" + os.path.join(PASTA_DADOS, "estado.db")
+# Validade do lock de execução única; o dono renova enquanto vive, então um worker
+# que caiu libera a chave em até TTL_LOCK segundos e a próxima tentativa retoma o trabalho
+TTL_LOCK = float(os.getenv("UMI_LOCK_TTL", 30))
+
+
+class LockOcupado(Exception):
+    """Não foi possível obter o lock dentro do tempo de espera."""
+
+
+class Estado(ABC):
+    """
+    Interface do estado compartilhado. As implementações só precisam de
+    obter/definir/definir_se_ausente/remover/remover_se_igual/renovar_se_igual/listar_chaves;
+    JSON, jobs, locks e execução única são construídos em cima disso.
+    """
+
+    @abstractmethod
+    def obter(self, chave):
+        """Valor (bytes) da chave ou None se não existir ou tiver expirado."""
+
+    @abstractmethod
+    def definir(self, chave, valor, ttl=None):
+        """Grava o valor (bytes); ttl em segundos, None = sem expiração."""
+
+    @abstractmethod
+    def definir_se_ausente(self, chave, valor, ttl=None):
+        """Grava só se a chave não existir. Retorna True se gravou."""
+
+    @abstractmethod
+    def remover(self, chave):
+        """Remove a chave (sem erro se não existir)."""
+
+    @abstractmethod
+    def remover_se_igual(self, chave, valor):
+        """Remove só se o valor atual for 'valor' (liberação segura de lock)."""
+
+    @abstractmethod
+    def renovar_se_igual(self, chave, valor, ttl):
+        """Estende a validade para ttl segundos só se o valor atual for 'valor'. Retorna True se renovou."""
+
+    @abstractmethod
+    def listar_chaves(self, prefixo):
+        """Chaves vivas que começam com 'prefixo'."""
+
+    # ---------- JSON ----------
+
+    def obter_json(self, chave):
+        valor = self.obter(chave)
+        return json.loads(valor) if valor is not None else None
+
+    def definir_json(self, chave, dados, ttl=None):
+        self.definir(chave, json.dumps(dados, ensure_ascii=False).encode("utf-8"), ttl)
+
+    # ---------- registros de jobs ----------
+
+    def salvar_job(self, job_id, dados, ttl=None):
+        dados = dict(dados, atualizado_em=time.time())
+        self.definir_json("job:" + job_id, dados, ttl)
+        return dados
+
+    def obter_job(self, job_id):
+        return self.obter_json("job:" + job_id)
+
+    def remover_job(self, job_id):
+        self.remover("job:" + job_id)
+
+    # ---------- locks e execução única ----------
+
+    @contextmanager
+    def lock(self, nome, ttl=300, espera=None, intervalo=0.2, renovar=False):
+        """
+        Lock distribuído com expiração (ttl) para não travar se o dono morrer.
+        espera=None aguarda até conseguir; espera=0 falha na hora.
+        renovar=True estende o ttl a cada ttl/3 enquanto o bloco roda: o lock
+        dura o quanto o trabalho precisar, mas expira logo se o processo morrer.
+        """
+        chave = "lock:" + nome
+        token = uuid.uuid4().hex.encode()
+        limite = None if espera is None else time.monotonic() + espera
+        while not self.definir_se_ausente(chave, token, ttl):
+            if limite is not None and time.monotonic() >= limite:
+                raise LockOcupado(nome)
+            time.sleep(intervalo)
+        parar = threading.Event()
+        if renovar:
+            threading.Thread(target=self._renovar, args=(chave, token, ttl, parar), daemon=True).start()
+        try:
+            yield
+        finally:
+            parar.set()
+            self.remover_se_igual(chave, token)
+
+    def _renovar(self, chave, token, ttl, parar):
+        while not parar.wait(ttl / 3.0):
+            try:
+                if not self.renovar_se_igual(chave, token, ttl):
+                    print(f"⚠️ Lock {chave} expirou antes de ser renovado")
+                    return
+            except Exception as e:
+                print(f"⚠️ Falha ao renovar o lock {chave}: {e}")
+
+    def unico(self, chave, funcao, ttl=None, ttl_lock=None, espera=None):
+        """
+        Cache com execução única: se vários workers pedirem a mesma chave ao
+        mesmo tempo, só um executa 'funcao'; os outros esperam (até 'espera'
+        segundos, LockOcupado depois disso) e leem o resultado.
+        O lock é renovado enquanto 'funcao' roda (validade ttl_lock, padrão TTL_LOCK).
+        """
+        resultado = self.obter_json(chave)
+        if resultado is not None:
+            return resultado["valor"]
+        with self.lock(chave, ttl=ttl_lock or TTL_LOCK, espera=espera, renovar=True):
+            resultado = self.obter_json(chave)
+            if resultado is not None:
+                return resultado["valor"]
+            valor = funcao()
+            self.definir_json(chave, {"valor": valor, "criado_em": time.time()}, ttl)
+            return valor
+
+
+# ===============================
+# SQLite (vários processos, um host)
+# ===============================
+
+class EstadoSQLite(Estado):
+    """Tabela chave/valor com expiração; o lock de arquivo do SQLite serializa as escritas."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv (chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL)"
+            )
+
+    def _conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transacao(self):
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _expira(ttl):
+        return time.time() + ttl if ttl else None
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            "SELECT valor FROM kv WHERE chave = ? AND (expira IS NULL OR expira > ?)", (chave, time.time())
+        ).fetchone()
+        return bytes(linha[0]) if linha else None
+
+    def definir(self, chave, valor, ttl=None):
+        with self._transacao() as conn:
+            conn.execute("INSERT OR REPLACE INTO kv (chave, valor, expira) VALUES (?, ?, ?)",
+                         (chave, valor, self._expira(ttl)))
+
+    def definir_se_ausente(self, chave, valor, ttl=None):
+        with self._transacao() as conn:
+            conn.execute("DELETE FROM kv WHERE chave = ? AND expira IS NOT NULL AND expira <= ?", (chave, time.time()))
+            cursor = conn.execute("INSERT OR IGNORE INTO kv (chave, valor, expira) VALUES (?, ?, ?)",
+                                  (chave, valor, self._expira(ttl)))
+            return cursor.rowcount == 1
+
+    def remover(self, chave):
+        with self._transacao() as conn:
+            conn.execute("DELETE FROM kv WHERE chave = ?", (chave,))
+
+    def remover_se_igual(self, chave, valor):
+        with self._transacao() as conn:
+            return conn.execute("DELETE FROM kv WHERE chave = ? AND valor = ?", (chave, valor)).rowcount == 1
+
+    def renovar_se_igual(self, chave, valor, ttl):
+        with self._transacao() as conn:
+            agora = time.time()
+            return conn.execute(
+                "UPDATE kv SET expira = ? WHERE chave = ? AND valor = ? AND (expira IS NULL OR expira > ?)",
+                (agora + ttl, chave, valor, agora)
+            ).rowcount == 1
+
+    def listar_chaves(self, prefixo):
+        linhas = self._conexao().execute(
+            "SELECT chave FROM kv WHERE chave >= ? AND chave < ? AND (expira IS NULL OR expira > ?)",
+            (prefixo, prefixo + "\uffff", time.time())
+        ).fetchall()
+        return [linha[0] for linha in linhas]
+
+
+# ===============================
+# Protocolo do Redis (vários hosts)
+# ===============================
+
+class ErroResp(Exception):
+    pass
+
+
+def _ler_resp(arquivo):
+    """Lê um valor RESP2 do arquivo (socket)."""
+    linha = arquivo.readline()
+    if not linha:
+        raise ConnectionError("Conexão RESP fechada")
+    tipo, resto = linha[:1], linha[1:-2]
+    if tipo == b"+":
+        return resto.decode()
+    if tipo == b"-":
+        raise ErroResp(resto.decode())
+    if tipo == b":":
+        return int(resto)
+    if tipo == b"$":
+        tamanho = int(resto)
+        if tamanho < 0:
+            return None
+        return arquivo.read(tamanho + 2)[:-2]
+    if tipo == b"*":
+        tamanho = int(resto)
+        return None if tamanho < 0 else [_ler_resp(arquivo) for _ in range(tamanho)]
+    raise ErroResp("Resposta RESP inválida: %r" % linha)
+
+
+class ConexaoResp:
+    """Cliente RESP2 mínimo (sem dependências) sobre um socket TCP."""
+
+    def __init__(self, host, porta, db=0, timeout=10):
+        self.sock = socket.create_connection((host, porta), timeout=timeout)
+        self.arquivo = self.sock.makefile("rb")
+        if db:
+            self.comando("SELECT", db)
+
+    def comando(self, *partes):
+        dados = [b"*%d\r\n" % len(partes)]
+        for parte in partes:
+            if not isinstance(parte, bytes):
+                parte = str(parte).encode("utf-8")
+            dados.append(b"$%d\r\n%s\r\n" % (len(parte), parte))
+        self.sock.sendall(b"".join(dados))
+        return self._ler()
+
+    def _ler(self):
+        return _ler_resp(self.arquivo)
+
+    def fechar(self):
+        self.sock.close()
+
+
+class EstadoRedis(Estado):
+    """Estado em um servidor compatível com Redis (uma conexão por thread)."""
+
+    def __init__(self, host="localhost", porta=6379, db=0):
+        self.host, self.porta, self.db = host, porta, db
+        self._local = threading.local()
+
+    def _cmd(self, *partes):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = ConexaoResp(self.host, self.porta, self.db)
+        try:
+            return conn.comando(*partes)
+        except (ConnectionError, OSError):
+            conn.fechar()
+            self._local.conn = None
+            raise
+
+    def obter(self, chave):
+        return self._cmd("GET", chave)
+
+    def definir(self, chave, valor, ttl=None):
+        if ttl:
+            self._cmd("SET", chave, valor, "PX", int(ttl * 1000))
+        else:
+            self._cmd("SET", chave, valor)
+
+    def definir_se_ausente(self, chave, valor, ttl=None):
+        partes = ["SET", chave, valor, "NX"]
+        if ttl:
+            partes += ["PX", int(ttl * 1000)]
+        return self._cmd(*partes) == "OK"
+
+    def remover(self, chave):
+        self._cmd("DEL", chave)
+
+    def remover_se_igual(self, chave, valor):
+        # Transação otimista: se a chave mudar entre o GET e o EXEC, nada é removido
+        self._cmd("WATCH", chave)
+        if self._cmd("GET", chave) != valor:
+            self._cmd("UNWATCH")
+            return False
+        self._cmd("MULTI")
+        self._cmd("DEL", chave)
+        return bool(self._cmd("EXEC"))
+
+    def renovar_se_igual(self, chave, valor, ttl):
+        self._cmd("WATCH", chave)
+        if self._cmd("GET", chave) != valor:
+            self._cmd("UNWATCH")
+            return False
+        self._cmd("MULTI")
+        self._cmd("PEXPIRE", chave, int(ttl * 1000))
+        resposta = self._cmd("EXEC")
+        return bool(resposta and resposta[0])
+
+    def listar_chaves(self, prefixo):
+        chaves, cursor = [], b"0"
+        while True:
+            cursor, lote = self._cmd("SCAN", cursor, "MATCH", prefixo + "*", "COUNT", 500)
+            chaves.extend(c.decode("utf-8") for c in lote)
+            if cursor in (b"0", "0"):
+                return chaves
+
+
+def criar(url=None):
+    """Cria o estado a partir da URL (UMI_STATE_URL)."""
+    url = url or os.getenv("UMI_STATE_URL") or URL_PADRAO
+    partes = urlparse(url)
+    if partes.scheme == "sqlite":
+        return EstadoSQLite(url[len("sqlite:///"):])
+    if partes.scheme == "redis":
+        db = int(partes.path.strip("/") or 0)
+        return EstadoRedis(partes.hostname or "localhost", partes.port or 6379, db)
+    raise ValueError(f"UMI_STATE_URL não suportada: {url}")
+
+
+_padrao = None
+_padrao_lock = threading.Lock()
+
+
+def padrao():
+    """Instância do processo, criada na primeira utilização."""
+    global _padrao
+    with _padrao_lock:
+        if _padrao is None:
+            _padrao = criar()
+        return _padrao
+
+
+# ===============================
+# Servidor RESP local (substituto do Redis para desenvolvimento e testes)
+# ===============================
+
+class _ServidorResp(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, endereco):
+        super().__init__(endereco, _ManipuladorResp)
+        self.dados = {}      # chave → (valor, expira)
+        self.versoes = {}    # chave → contador de escritas (para WATCH)
+        self.trava = threading.Lock()
+
+    def vivo(self, chave):
+        item = self.dados.get(chave)
+        if item and item[1] is not None and item[1] <= time.time():
+            del self.dados[chave]
+            self.versoes[chave] = self.versoes.get(chave, 0) + 1
+            return None
+        return item
+
+    def escrever(self, chave, valor, expira):
+        if valor is None:
+            self.dados.pop(chave, None)
+        else:
+            self.dados[chave] = (valor, expira)
+        self.versoes[chave] = self.versoes.get(chave, 0) + 1
+
+
+class _ManipuladorResp(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        self.observadas, self.fila = {}, None
+        while True:
+            try:
+                partes = _ler_resp(self.rfile)
+            except (ConnectionError, ValueError, ErroResp):
+                return
+            self.wfile.write(self.executar(partes))
+
+    def executar(self, partes):
+        nome = partes[0].decode().upper()
+        if self.fila is not None and nome not in ("EXEC", "DISCARD"):
+            self.fila.append(partes)
+            return b"+QUEUED\r\n"
+        servidor = self.server
+        with servidor.trava:
+            if nome == "MULTI":
+                self.fila = []
+                return b"+OK\r\n"
+            if nome == "EXEC":
+                fila, self.fila = self.fila or [], None
+                mudou = any(servidor.versoes.get(c, 0) != v for c, v in self.observadas.items())
+                self.observadas = {}
+                if mudou:
+                    return b"*-1\r\n"
+                respostas = [self._aplicar(p) for p in fila]
+                return b"*%d\r\n" % len(respostas) + b"".join(respostas)
+            if nome == "WATCH":
+                for chave in partes[1:]:
+                    servidor.vivo(chave)
+                    self.observadas[chave] = servidor.versoes.get(chave, 0)
+                return b"+OK\r\n"
+            if nome == "UNWATCH":
+                self.observadas = {}
+                return b"+OK\r\n"
+            return self._aplicar(partes)
+
+    def _aplicar(self, partes):
+        servidor = self.server
+        nome = partes[0].decode().upper()
+        if nome == "PING":
+            return b"+PONG\r\n"
+        if nome == "SELECT":
+            return b"+OK\r\n"
+        if nome == "GET":
+            item = servidor.vivo(partes[1])
+            return b"$-1\r\n" if item is None else b"$%d\r\n%s\r\n" % (len(item[0]), item[0])
+        if nome == "SET":
+            chave, valor, opcoes = partes[1], partes[2], [p.decode().upper() for p in partes[3:]]
+            expira = None
+            if "PX" in opcoes:
+                expira = time.time() + int(opcoes[opcoes.index("PX") + 1]) / 1000.0
+            if "NX" in opcoes and servidor.vivo(chave) is not None:
+                return b"$-1\r\n"
+            servidor.escrever(chave, valor, expira)
+            return b"+OK\r\n"
+        if nome == "PEXPIRE":
+            item = servidor.vivo(partes[1])
+            if item is None:
+                return b":0\r\n"
+            servidor.escrever(partes[1], item[0], time.time() + int(partes[2]) / 1000.0)
+            return b":1\r\n"
+        if nome == "DEL":
+            removidas = 0
+            for chave in partes[1:]:
+                if servidor.vivo(chave) is not None:
+                    servidor.escrever(chave, None, None)
+                    removidas += 1
+            return b":%d\r\n" % removidas
+        if nome == "SCAN":
+            padrao_chave = partes[partes.index(b"MATCH") + 1].rstrip(b"*") if b"MATCH" in partes else b""
+            chaves = [c for c in list(servidor.dados) if c.startswith(padrao_chave) and servidor.vivo(c)]
+            corpo = b"".join(b"$%d\r\n%s\r\n" % (len(c), c) for c in chaves)
+            return b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(chaves) + corpo
+        return b"-ERR comando nao suportado '%s'\r\n" % nome.encode()
+
+
+def servidor_resp_local(host="127.0.0.1", porta=6399):
+    """Sobe o substituto do Redis em uma thread e retorna o servidor."""
+    servidor = _ServidorResp((host, porta))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+# Uso: python -m modulos.estado servidor [porta]
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "servidor":
+        porta = int(sys.argv[2]) if len(sys.argv) > 2 else 6399
+        print(f"🧪 Servidor RESP local em redis://127.0.0.1:{porta}/0")
+        _ServidorResp(("127.0.0.1", porta)).serve_forever()
+    else:
+        print("Uso: python -m modulos.estado servidor [porta]")
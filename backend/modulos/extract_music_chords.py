@@ -6,20 +6,26 @@ import json
 import requests
 from dotenv import load_dotenv
 
+from modulos import prazo, perfilamento, jobs_duraveis, webhook
+
 
 load_dotenv()
 API_KEY = os.getenv("api_key")
 if not API_KEY:
     raise RuntimeError("Coloque sua chave no .env: api_key")
 
+# MUSICAI_API_URL permite apontar para outro endereço (ex: modulos.fake_musicai em testes)
+API_URL = os.getenv("MUSICAI_API_URL", "https://api.music.ai").rstrip("/")
+
 HEADERS_JSON = {
     "Authorization": API_KEY,
     "Content-Type": "application/json"
 }
 
+@perfilamento.medir()
 def get_signed_urls():
-    url = "https://api.music.ai/v1/upload"
-    resp = requests.get(url, headers={"Authorization": API_KEY})
+    url = f"{API_URL}/v1/upload"
+    resp = requests.get(url, headers={"Authorization": API_KEY}, timeout=prazo.atual().timeout())
     print("GET /upload →", resp.status_code)
     resp.raise_for_status()
     obj = resp.json()
@@ -29,6 +35,7 @@ def get_signed_urls():
         raise RuntimeError("uploadUrl ou downloadUrl ausentes no GET /upload: " + str(obj))
     return upload_url, download_url
 
+@perfilamento.medir()
 def upload_file_to_url(upload_url, file_path):
     if file_path.lower().endswith(".mp3"):
         ct = "audio/mpeg"
@@ -40,30 +47,44 @@ def upload_file_to_url(upload_url, file_path):
 
     headers = {"Content-Type": ct}
     with open(file_path, "rb") as f:
-        resp = requests.put(upload_url, headers=headers, data=f)
+        resp = requests.put(upload_url, headers=headers, data=f, timeout=prazo.atual().timeout())
     print("PUT upload →", resp.status_code)
     resp.raise_for_status()
 
+@perfilamento.medir()
 def create_job(download_url, workflow_slug):
-    url = "https://api.music.ai/v1/job"
+    url = f"{API_URL}/v1/job"
     payload = {
         "name": "Detect chords job",
         "workflow": workflow_slug,
         "params": {"inputUrl": download_url}
     }
+    callback, ref = webhook.novo_callback()
+    if callback:
+        payload["callbackUrl"] = callback
 
-    resp = requests.post(url, headers=HEADERS_JSON, json=payload)
+    resp = requests.post(url, headers=HEADERS_JSON, json=payload, timeout=prazo.atual().timeout())
     print("POST /job →", resp.status_code)
     resp.raise_for_status()
     job_id = resp.json().get("id")
     if not job_id:
         raise RuntimeError("Job criado, mas sem ID: " + str(resp.json()))
+    if ref:
+        webhook.vincular(ref, str(job_id))
     return job_id
 
-def poll_job(job_id, interval=5):
-    url = f"https://api.music.ai/v1/job/{job_id}"
+@perfilamento.medir()
+def poll_job(job_id, interval=5, max_wait=600):
+    """
+    Consulta o job até terminar, no máximo max_wait segundos ou até o prazo da requisição.
+    Com callbacks ativos, espera o webhook por até webhook.ESPERA_MAXIMA segundos; passada
+    essa janela (callback perdido) volta a consultar a cada 'interval'.
+    """
+    url = f"{API_URL}/v1/job/{job_id}"
+    limite = time.monotonic() + max_wait
+    fim_janela = time.monotonic() + webhook.ESPERA_MAXIMA
     while True:
-        resp = requests.get(url, headers={"Authorization": API_KEY})
+        resp = requests.get(url, headers={"Authorization": API_KEY}, timeout=prazo.atual().timeout())
         resp.raise_for_status()
         job = resp.json()
         status = job.get("status")
@@ -71,9 +92,25 @@ def poll_job(job_id, interval=5):
         if status == "SUCCEEDED":
             return job
         if status == "FAILED":
-            raise RuntimeError("Job falhou: " + str(job))
-        time.sleep(interval)
+            raise jobs_duraveis.JobFalhou("Job falhou: " + str(job))
+        if time.monotonic() >= limite:
+            raise RuntimeError(f"Timeout: job não completou após {max_wait} segundos (status atual: {status})")
+        if webhook.ativo():
+            # Dorme até o callback (ou o polling de segurança) e confirma o status
+            janela = fim_janela - time.monotonic()
+            webhook.esperar(job_id, min(janela if janela > 0 else interval, max(0.0, limite - time.monotonic())))
+        else:
+            prazo.atual().dormir(interval)
+
+def delete_job(job_id):
+    """Remove o job no music.ai (usado quando ninguém mais espera o resultado)."""
+    try:
+        requests.delete(f"{API_URL}/v1/job/{job_id}", headers={"Authorization": API_KEY}, timeout=5)
+        print(f"🗑️ Job {job_id} abandonado e removido")
+    except requests.RequestException as e:
+        print(f"⚠️ Não foi possível remover o job {job_id}: {e}")
 
+@perfilamento.medir()
 def extract_chords(job_result):
     res = job_result.get("result", {})
     chords_url = res.get("chords")
@@ -82,9 +119,12 @@ def extract_chords(job_result):
         return []
 
     try:
-        resp = requests.get(chords_url)
+        resp = requests.get(chords_url, timeout=prazo.atual().timeout())
         resp.raise_for_status()
         data = resp.json()
+    except (prazo.PrazoExcedido, requests.RequestException):
+        # Falha de rede/URL expirada sobe para jobs_duraveis consultar o job de novo
+        raise
     except Exception as e:
         print("⚠️ Erro ao baixar ou ler o JSON de acordes:", e)
         return []
@@ -119,15 +159,24 @@ def extract_chords(job_result):
         print("⚠️ Formato de acordes não reconhecido ou lista vazia")
     return normalized
 
-def main(file_path, workflow_slug):
+def enviar_arquivo(file_path):
+    """Upload para a URL assinada; retorna a URL de download usada como entrada do job."""
     upload_url, download_url = get_signed_urls()
     upload_file_to_url(upload_url, file_path)
-    time.sleep(2)
+    prazo.atual().dormir(2)
+    return download_url
 
-    job_id = create_job(download_url, workflow_slug)
-    job_res = poll_job(job_id)
-
-    chords = extract_chords(job_res)
+@perfilamento.medir()
+def main(file_path, workflow_slug):
+    # Cada etapa fica registrada (jobs_duraveis): uma nova tentativa retoma o job
+    chords = jobs_duraveis.executar(
+        "timeline", file_path, workflow_slug,
+        enviar=enviar_arquivo,
+        criar=create_job,
+        aguardar=poll_job,
+        baixar=extract_chords,
+        remover=delete_job
+    )
     chord_triplets = [
         {"start": c["start"], "end": c["end"], "chord_majmin": c["chord_majmin"]}
         for c in chords if isinstance(c, dict) and all(k in c for k in ("start", "end", "chord_majmin"))
@@ -0,0 +1,142 @@
+# ARQUIVO COM UM MUSIC.AI FALSO PARA DESENVOLVIMENTO E TESTES LOCAIS
+# Implementa o que os pipelines usam (GET /v1/upload, PUT/GET do arquivo, POST/GET/DELETE
+# /v1/job, resultado dos acordes) e dispara o callbackUrl quando o job termina.
+# Os acordes vêm da análise local do áudio enviado (WAV, ou qualquer formato com ffmpeg);
+# se não der para decodificar, devolve uma progressão fixa.
+#
+# Uso: python -m modulos.fake_musicai [--porta 8765] [--duracao 3] [--sem-callback] [--atraso-callback 0]
+# e no backend: MUSICAI_API_URL=http://localhost:8765
+# GET /_stats mostra quantos jobs, consultas de status e callbacks houve.
+
+import os
+import time
+import uuid
+import argparse
+import tempfile
+import threading
+
+import requests
+from flask import Flask, request, jsonify, Response
+
+from modulos import analise_local
+
+PROGRESSAO_FIXA = ["C:maj", "G:maj", "A:min", "F:maj"]
+
+
+def _acordes(dados):
+    caminho = None
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".wav" if dados[:4] == b"RIFF" else ".audio", delete=False) as f:
+            f.write(dados)
+            caminho = f.name
+        return analise_local.segmentar_acordes(analise_local.carregar_pcm(caminho))
+    except Exception as e:
+        print(f"⚠️ Áudio não decodificado ({e}); usando progressão fixa")
+        return [{"start": 2.0 * i, "end": 2.0 * (i + 1), "chord_majmin": c} for i, c in enumerate(PROGRESSAO_FIXA)]
+    finally:
+        if caminho and os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def criar_app(duracao=3.0, callbacks=True, atraso_callback=0.0):
+    app = Flask(__name__)
+    arquivos, jobs, resultados = {}, {}, {}
+    stats = {"jobs": 0, "consultas": 0, "callbacks": 0, "callbacks_falhos": 0}
+    lock = threading.Lock()
+
+    def base():
+        return request.host_url.rstrip("/")
+
+    def concluir(job_id, callback_url):
+        time.sleep(duracao)
+        with lock:
+            job = jobs.get(job_id)
+            if job is None:
+                return  # removido antes de terminar
+            entrada = arquivos.get(job["_arquivo"], b"")
+        segmentos = _acordes(entrada)
+        with lock:
+            resultados[job_id] = segmentos
+            job["status"] = "SUCCEEDED"
+            publico = {k: v for k, v in job.items() if not k.startswith("_")}
+        if callbacks and callback_url:
+            time.sleep(atraso_callback)
+            try:
+                requests.post(callback_url, json=publico, timeout=5).raise_for_status()
+                with lock:
+                    stats["callbacks"] += 1
+            except requests.RequestException as e:
+                with lock:
+                    stats["callbacks_falhos"] += 1
+                print(f"⚠️ Callback do job {job_id} falhou: {e}")
+
+    @app.route("/v1/upload", methods=["GET"])
+    def upload():
+        nome = uuid.uuid4().hex
+        return jsonify({"uploadUrl": f"{base()}/_arquivos/{nome}", "downloadUrl": f"{base()}/_arquivos/{nome}"})
+
+    @app.route("/_arquivos/<nome>", methods=["PUT", "GET"])
+    def arquivo(nome):
+        if request.method == "PUT":
+            arquivos[nome] = request.get_data()
+            return "", 200
+        if nome not in arquivos:
+            return "", 404
+        return Response(arquivos[nome], mimetype="application/octet-stream")
+
+    @app.route("/v1/job", methods=["POST"])
+    def criar_job():
+        dados = request.get_json(silent=True) or {}
+        entrada = (dados.get("params") or {}).get("inputUrl", "")
+        job_id = uuid.uuid4().hex
+        with lock:
+            jobs[job_id] = {
+                "id": job_id,
+                "name": dados.get("name"),
+                "workflow": dados.get("workflow"),
+                "status": "STARTED",
+                "result": {"chords": f"{base()}/_resultados/{job_id}"},
+                "_arquivo": entrada.rstrip("/").rsplit("/", 1)[-1]
+            }
+            stats["jobs"] += 1
+        threading.Thread(target=concluir, args=(job_id, dados.get("callbackUrl")), daemon=True).start()
+        return jsonify({"id": job_id}), 201
+
+    @app.route("/v1/job/<job_id>", methods=["GET", "DELETE"])
+    def job(job_id):
+        with lock:
+            if job_id not in jobs:
+                return jsonify({"error": "Job não encontrado"}), 404
+            if request.method == "DELETE":
+                del jobs[job_id]
+                return "", 204
+            stats["consultas"] += 1
+            return jsonify({k: v for k, v in jobs[job_id].items() if not k.startswith("_")})
+
+    @app.route("/_resultados/<job_id>", methods=["GET"])
+    def resultado(job_id):
+        if job_id not in resultados:
+            return jsonify({"error": "Resultado não encontrado"}), 404
+        return jsonify(resultados[job_id])
+
+    @app.route("/v1/application", methods=["GET"])
+    def aplicacao():
+        return jsonify({"name": "fake-musicai"})
+
+    @app.route("/_stats", methods=["GET"])
+    def estatisticas():
+        with lock:
+            return jsonify(stats)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="music.ai falso com callbacks")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--duracao", type=float, default=3.0, help="Segundos até o job terminar")
+    parser.add_argument("--sem-callback", action="store_true", help="Nunca chama o callbackUrl (testa o polling)")
+    parser.add_argument("--atraso-callback", type=float, default=0.0)
+    args = parser.parse_args()
+    criar_app(args.duracao, not args.sem_callback, args.atraso_callback).run(
+        host="0.0.0.0", port=args.porta, threaded=True)
@@ -0,0 +1,186 @@
+# ARQUIVO COM A IMPRESSÃO DIGITAL PERCEPTUAL DOS ÁUDIOS
+# O mesmo gabarito chega como m4a (iOS), wav (Android) ou com corte diferente,
+# e o hash dos bytes não pega isso. A impressão marca as 3 classes de altura mais
+# fortes em janelas de ~0,5 s, a cada quadro de ~0,13 s (12 bits por quadro): muda pouco com codec, volume
+# e taxa de amostragem, e a comparação testa deslocamentos para tolerar silêncio a mais ou a menos
+# no início. Só conta como o mesmo áudio com duração quase igual e o som dos dois coberto
+# pela comparação: uma cópia cortada teria o fim da timeline perdido.
+#
+# Índice no estado compartilhado: impressao:<p1>-<p2>:<faixa>:<sha256>, com p1/p2 as duas
+# classes de altura mais fortes do áudio e a faixa de duração (blocos de FAIXA_SEGUNDOS);
+# a busca só olha os baldes vizinhos. Clipes curtos de um acorde só caem todos no mesmo
+# balde: cada balde guarda no máximo UMI_IMPRESSOES_POR_BALDE áudios e cada busca compara
+# no máximo UMI_IMPRESSOES_CANDIDATOS, os de duração mais próxima.
+
+import os
+import base64
+from itertools import combinations
+
+import numpy as np
+
+from modulos import analise_local, estado, perfilamento, pool_analise
+
+# Outra codificação do mesmo áudio fica acima de 0,99; um acorde errado em 20 já cai para ~0,93
+SIMILARIDADE_MINIMA = float(os.getenv("UMI_SIMILARIDADE_MINIMA", 0.97))
+QUADROS_POR_JANELA = 4  # 4 x 2048 amostras a 16 kHz ≈ 0,5 s
+NOTAS_POR_QUADRO = 3
+SEGUNDOS_POR_QUADRO = analise_local.SALTO / float(analise_local.TAXA_PADRAO)
+DESLOCAMENTO_MAXIMO = 40  # quadros (≈ 5 s de silêncio a mais ou a menos no início)
+COBERTURA_MINIMA = 0.95  # fração dos quadros com som de cada um dos áudios que precisa ser comparada
+TOLERANCIA_DURACAO = float(os.getenv("UMI_IMPRESSAO_TOLERANCIA", 0.5))  # segundos
+PREFIXO = "impressao:"
+TTL_IMPRESSOES = float(os.getenv("UMI_RESULT_TTL", 7 * 24 * 3600))
+FAIXA_SEGUNDOS = 5.0
+MAX_POR_BALDE = int(os.getenv("UMI_IMPRESSOES_POR_BALDE", 256))
+MAX_CANDIDATOS = int(os.getenv("UMI_IMPRESSOES_CANDIDATOS", 32))
+
+
+def _codificar(matriz):
+    return base64.b64encode(np.packbits(matriz.astype(np.uint8), axis=None).tobytes()).decode()
+
+
+def _decodificar(texto, formato):
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(texto), dtype=np.uint8))
+    return bits[:int(np.prod(formato))].reshape(formato).astype(bool)
+
+
+@perfilamento.medir()
+def calcular(sinal, taxa=analise_local.TAXA_PADRAO):
+    """Impressão de um sinal mono: dict serializável em JSON (None se curto/silencioso demais)."""
+    if taxa != analise_local.TAXA_PADRAO:
+        sinal = analise_local.reamostrar(sinal, taxa, analise_local.TAXA_PADRAO)
+    croma, energia = analise_local.cromagrama(sinal)
+    if len(croma) < QUADROS_POR_JANELA:
+        return None
+
+    # Soma móvel (janela de QUADROS_POR_JANELA) mantendo a resolução de um quadro,
+    # para o alinhamento de cortes não depender da fase dos blocos
+    nucleo = np.ones(QUADROS_POR_JANELA, dtype=np.float32)
+    ponderado = croma * energia[:, None]
+    janelas = np.stack([np.convolve(ponderado[:, k], nucleo, mode="valid") for k in range(12)], axis=1)
+    validos = np.convolve(energia, nucleo / QUADROS_POR_JANELA, mode="valid") > analise_local.ENERGIA_MINIMA
+    if not validos.any():
+        return None
+    bits = np.zeros(janelas.shape, dtype=bool)
+    np.put_along_axis(bits, np.argsort(-janelas, axis=1)[:, :NOTAS_POR_QUADRO], True, axis=1)
+
+    perfil = janelas[validos].sum(axis=0)
+    return {
+        "quadros": int(len(janelas)),
+        "duracao": round(len(sinal) / float(analise_local.TAXA_PADRAO), 3),
+        "bits": _codificar(bits),
+        "validos": _codificar(validos),
+        "perfil": [int(i) for i in np.argsort(-perfil)[:3]]
+    }
+
+
+def do_arquivo(caminho):
+    """Impressão de um arquivo (None se não der para decodificar, ex: sem ffmpeg)."""
+    try:
+        sinal = analise_local.carregar_pcm(caminho)
+    except Exception as e:
+        print(f"⚠️ Impressão digital indisponível: {e}")
+        return None
+    return pool_analise.padrao().executar("impressao", sinal)
+
+
+def _matrizes(impressao):
+    n = impressao["quadros"]
+    return _decodificar(impressao["bits"], (n, 12)), _decodificar(impressao["validos"], (n,))
+
+
+def similaridade(a, b):
+    """
+    (similaridade 0..1, deslocamento em segundos) do melhor alinhamento entre a e b.
+    Similaridade é o Jaccard das notas marcadas nos quadros com som nos dois áudios;
+    alinhamentos que cobrem menos que COBERTURA_MINIMA do som de um deles valem 0.
+    deslocamento > 0: o instante t de 'a' corresponde a t + deslocamento em 'b'.
+    """
+    return _similaridade(_matrizes(a), _matrizes(b))
+
+
+def _similaridade(matrizes_a, matrizes_b):
+    (bits_a, validos_a), (bits_b, validos_b) = matrizes_a, matrizes_b
+    minimo = COBERTURA_MINIMA * max(validos_a.sum(), validos_b.sum())
+    melhor, melhor_d = 0.0, 0
+    for d in range(-DESLOCAMENTO_MAXIMO, DESLOCAMENTO_MAXIMO + 1):
+        ini_a, ini_b = max(0, -d), max(0, d)
+        n = min(len(bits_a) - ini_a, len(bits_b) - ini_b)
+        if n <= 0:
+            continue
+        ambos = validos_a[ini_a:ini_a + n] & validos_b[ini_b:ini_b + n]
+        if ambos.sum() < minimo:
+            continue
+        trecho_a, trecho_b = bits_a[ini_a:ini_a + n][ambos], bits_b[ini_b:ini_b + n][ambos]
+        valor = float((trecho_a & trecho_b).sum()) / max(1, int((trecho_a | trecho_b).sum()))
+        if valor > melhor:
+            melhor, melhor_d = valor, d
+    return melhor, melhor_d * SEGUNDOS_POR_QUADRO
+
+
+def _balde(impressao):
+    p1, p2 = sorted(impressao["perfil"][:2])
+    return f"{p1}-{p2}"
+
+
+def _faixa(duracao):
+    return int(duracao // FAIXA_SEGUNDOS)
+
+
+def registrar(sha256, impressao):
+    """Guarda a impressão do áudio já analisado no índice (se o balde ainda tem espaço)."""
+    prefixo = f"{PREFIXO}{_balde(impressao)}:{_faixa(impressao['duracao'])}:"
+    chave = prefixo + sha256
+    ocupados = estado.padrao().listar_chaves(prefixo)
+    if len(ocupados) >= MAX_POR_BALDE and chave not in ocupados:
+        return  # os registros antigos expiram (TTL) e abrem espaço
+    estado.padrao().definir_json(chave, impressao, ttl=TTL_IMPRESSOES)
+
+
+@perfilamento.medir()
+def semelhantes(impressao, excluir=None, minimo=None):
+    """
+    Áudios indexados parecidos com a impressão, do mais parecido para o menos:
+    [(sha256, similaridade, deslocamento_segundos)] com similaridade >= minimo
+    e duração a até TOLERANCIA_DURACAO segundos.
+    """
+    minimo = SIMILARIDADE_MINIMA if minimo is None else minimo
+    duracao = impressao["duracao"]
+    faixa = _faixa(duracao)
+    faixas = range(max(0, _faixa(duracao - TOLERANCIA_DURACAO)), _faixa(duracao + TOLERANCIA_DURACAO) + 1)
+    # As duas notas mais fortes podem trocar com a terceira entre codificações
+    baldes = {"%d-%d" % tuple(sorted(par)) for par in combinations(impressao["perfil"], 2)}
+
+    # Só as chaves (baratas); o JSON e a comparação ficam para os MAX_CANDIDATOS mais próximos em duração
+    candidatos = []
+    for balde in baldes:
+        for outra_faixa in faixas:
+            prefixo = f"{PREFIXO}{balde}:{outra_faixa}:"
+            for chave in estado.padrao().listar_chaves(prefixo):
+                if chave[len(prefixo):] != excluir:
+                    candidatos.append((abs(outra_faixa - faixa), chave, chave[len(prefixo):]))
+    candidatos.sort()
+
+    matrizes = _matrizes(impressao)
+    encontrados = []
+    for _, chave, sha256 in candidatos[:MAX_CANDIDATOS]:
+        outra = estado.padrao().obter_json(chave)
+        if outra is None or abs(outra["duracao"] - duracao) > TOLERANCIA_DURACAO:
+            continue
+        valor, deslocamento = _similaridade(matrizes, _matrizes(outra))
+        if valor >= minimo:
+            encontrados.append((sha256, round(valor, 4), round(deslocamento, 3)))
+    return sorted(encontrados, key=lambda item: -item[1])
+
+
+def deslocar_segmentos(segmentos, deslocamento):
+    """Traz uma timeline de outro áudio para o tempo deste (descarta o que ficou antes do início)."""
+    if not deslocamento:
+        return segmentos
+    ajustados = []
+    for seg in segmentos:
+        fim = float(seg["end"]) - deslocamento
+        if fim <= 0:
+            continue
+        ajustados.append(dict(seg, start=round(max(0.0, float(seg["start"]) - deslocamento), 3), end=round(fim, 3)))
+    return ajustados
@@ -0,0 +1,128 @@
+# ARQUIVO COM OS JOBS DURÁVEIS DO MUSIC.AI
+# Cada etapa concluída (upload, criação do job, job pronto) é gravada no estado
+# compartilhado, pela chave job:<pipeline>:<workflow>:<sha256 do áudio>. Se o backend
+# reinicia ou o worker cai no meio da análise, a próxima tentativa do mesmo áudio
+# retoma do polling ou do download do resultado em vez de pagar upload e job novos.
+#
+# Estados: enviado (download_url) → criado (job_id) → concluido (resultado do job).
+# O registro some quando o resultado é baixado (o cache fica em resultados.py).
+#
+# UMI_JOB_TTL: validade dos registros em segundos (padrão 24 h)
+# UMI_UPLOAD_URL_TTL: por quanto tempo a URL assinada do upload é reaproveitada (padrão 1 h)
+
+import os
+import time
+import hashlib
+
+import requests
+
+from modulos import estado, prazo, perfilamento
+
+TTL_JOB = float(os.getenv("UMI_JOB_TTL", 24 * 3600))
+TTL_URL = float(os.getenv("UMI_UPLOAD_URL_TTL", 3600))
+NOVO, ENVIADO, CRIADO, CONCLUIDO = "novo", "enviado", "criado", "concluido"
+
+
+class JobFalhou(RuntimeError):
+    """O music.ai terminou o job com falha (não adianta retomar)."""
+
+
+@perfilamento.medir()
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _id(pipeline, workflow, sha256):
+    # Guardado por estado.salvar_job como job:<pipeline>:<workflow>:<sha256>
+    return f"{pipeline}:{workflow}:{sha256}"
+
+
+def obter_job(pipeline, workflow, sha256):
+    """Registro do job em andamento para o áudio ou None."""
+    return estado.padrao().obter_job(_id(pipeline, workflow, sha256))
+
+
+def salvar_job(registro):
+    job_id = _id(registro["pipeline"], registro["workflow"], registro["sha256"])
+    return estado.padrao().salvar_job(job_id, registro, ttl=TTL_JOB)
+
+
+def atualizar_job(registro, **campos):
+    """Grava a etapa concluída no registro e o devolve."""
+    return salvar_job(dict(registro, **campos))
+
+
+def remover_job(registro):
+    estado.padrao().remover_job(_id(registro["pipeline"], registro["workflow"], registro["sha256"]))
+
+
+def _url_valida(registro):
+    return bool(registro.get("download_url")) and time.time() - registro.get("enviado_em", 0) < TTL_URL
+
+
+def executar(pipeline, caminho, workflow, enviar, criar, aguardar, baixar, remover):
+    """
+    Roda (ou retoma) o pipeline do music.ai para o áudio.
+
+    enviar(caminho) → download_url; criar(download_url, workflow) → job_id;
+    aguardar(job_id) → job pronto; baixar(job) → resultado; remover(job_id).
+    """
+    sha256 = hash_arquivo(caminho)
+    registro = obter_job(pipeline, workflow, sha256)
+    if registro is not None:
+        print(f"🔁 Retomando job {pipeline} do áudio {sha256[:12]} (etapa: {registro['estado']})")
+    else:
+        registro = {"pipeline": pipeline, "workflow": workflow, "sha256": sha256, "estado": NOVO,
+                    "criado_em": time.time()}
+    novas_consultas = 1  # URLs do resultado expiradas: consulta o job de novo uma vez
+
+    while True:
+        etapa = registro["estado"]
+        if etapa == ENVIADO and not _url_valida(registro):
+            etapa = NOVO
+
+        if etapa == NOVO:
+            registro = atualizar_job(registro, estado=ENVIADO, download_url=enviar(caminho), enviado_em=time.time())
+
+        elif etapa == ENVIADO:
+            registro = atualizar_job(registro, estado=CRIADO, job_id=criar(registro["download_url"], workflow))
+
+        elif etapa == CRIADO:
+            job_id = registro["job_id"]
+            try:
+                job = aguardar(job_id)
+            except prazo.PrazoExcedido as e:
+                # Prazo esgotado: o job continua e a próxima tentativa o retoma.
+                # Cancelado pelo cliente: ninguém mais quer o resultado
+                if e.motivo == "cancelado":
+                    remover(job_id)
+                    remover_job(registro)
+                raise
+            except JobFalhou:
+                remover_job(registro)
+                raise
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                print(f"⚠️ Job {job_id} não existe mais no music.ai; criando outro")
+                registro = atualizar_job(registro, estado=ENVIADO, job_id=None)
+                continue
+            registro = atualizar_job(registro, estado=CONCLUIDO, resultado=job)
+
+        elif etapa == CONCLUIDO:
+            try:
+                valor = baixar(registro["resultado"])
+            except requests.RequestException as e:
+                if not novas_consultas:
+                    raise
+                novas_consultas -= 1
+                print(f"⚠️ Falha ao baixar o resultado do job {registro['job_id']} ({e}); consultando de novo")
+                registro = atualizar_job(registro, estado=CRIADO, resultado=None)
+                continue
+            remover_job(registro)
+            return valor
@@ -0,0 +1,305 @@
+# ARQUIVO COM O PERFILAMENTO SOB DEMANDA DO SERVIÇO (PROTEGIDO POR TOKEN)
+# - @medir: tempo de parede e de CPU por etapa, somado por requisição (header Server-Timing)
+#   e acumulado por função
+# - amostragem de pilhas (sys._current_frames) nas próximas N requisições ou por
+#   uma janela de tempo, exportada no formato "collapsed stacks" (flamegraph.pl, speedscope)
+#
+# Nada é ligado sem PROFILING_TOKEN; o Server-Timing só vai para quem manda o token
+# (ou para todos com PROFILING_SERVER_TIMING=1).
+#
+# A cifraclub-api usa este mesmo arquivo (o build da imagem o copia para app/perfilamento.py):
+# só stdlib + Flask e compatível com Python 3.8.
+
+import os
+import sys
+import hmac
+import time
+import threading
+import contextvars
+from collections import Counter
+from functools import wraps
+
+from flask import request, jsonify, Response, g
+
+TOKEN = os.getenv("PROFILING_TOKEN", "")
+SERVER_TIMING_SEMPRE = os.getenv("PROFILING_SERVER_TIMING", "0") in ("1", "true")
+INTERVALO_PADRAO = 0.005
+SEGUNDOS_MAXIMOS = 600
+PROFUNDIDADE_MAXIMA = 128
+
+_medidas = contextvars.ContextVar("medidas", default=None)
+_totais = {}
+_lock_totais = threading.Lock()
+
+
+# ===============================
+# Medição por etapa
+# ===============================
+
+def medir(nome=None):
+    """Decorator que registra tempo de parede e de CPU (da thread) de cada chamada."""
+    def decorator(funcao):
+        rotulo = nome or f"{funcao.__module__.split('.')[-1]}.{funcao.__name__}"
+
+        @wraps(funcao)
+        def wrapper(*args, **kwargs):
+            inicio, inicio_cpu = time.perf_counter(), time.thread_time()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                _registrar(rotulo, time.perf_counter() - inicio, time.thread_time() - inicio_cpu)
+        return wrapper
+    return decorator
+
+
+def _registrar(rotulo, parede, cpu):
+    medidas = _medidas.get()
+    if medidas is not None:
+        medidas.append((rotulo, parede, cpu))
+    with _lock_totais:
+        total = _totais.setdefault(rotulo, {"chamadas": 0, "parede": 0.0, "cpu": 0.0, "max": 0.0})
+        total["chamadas"] += 1
+        total["parede"] += parede
+        total["cpu"] += cpu
+        total["max"] = max(total["max"], parede)
+
+
+def totais():
+    """Acumulado por função desde o início do processo (ms)."""
+    with _lock_totais:
+        return {
+            rotulo: {
+                "calls": t["chamadas"],
+                "wall_ms": round(t["parede"] * 1000, 3),
+                "cpu_ms": round(t["cpu"] * 1000, 3),
+                "max_ms": round(t["max"] * 1000, 3)
+            }
+            for rotulo, t in sorted(_totais.items(), key=lambda item: -item[1]["parede"])
+        }
+
+
+def server_timing(medidas, parede, cpu):
+    """Valor do header Server-Timing (ms): total, cpu e cada etapa somada pelo nome."""
+    por_etapa = {}
+    for rotulo, p, c in medidas:
+        soma = por_etapa.setdefault(rotulo, [0, 0.0, 0.0])
+        soma[0] += 1
+        soma[1] += p
+        soma[2] += c
+    partes = [f"total;dur={parede * 1000:.1f}", f"cpu;dur={cpu * 1000:.1f}"]
+    for rotulo, (chamadas, p, c) in por_etapa.items():
+        partes.append(f'{rotulo};dur={p * 1000:.1f};desc="{chamadas}x cpu={c * 1000:.1f}ms"')
+    return ", ".join(partes)
+
+
+# ===============================
+# Amostragem de pilhas
+# ===============================
+
+def _pilha(frame):
+    """Pilha do frame em uma linha, da raiz para a folha ('f (arquivo.py:linha);...')."""
+    nomes = []
+    while frame is not None and len(nomes) < PROFUNDIDADE_MAXIMA:
+        codigo = frame.f_code
+        nomes.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(nomes))
+
+
+class Amostrador:
+    """
+    Amostra as pilhas das threads em intervalos fixos.
+
+    Modo requisições: só as threads das próximas N requisições.
+    Modo janela: todas as threads durante 'segundos'.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._alvos = set()
+        self.ativo = False
+        self.modo = None
+        self.requisicoes_restantes = 0
+        self.fim = None
+        self.intervalo = INTERVALO_PADRAO
+        self.amostras = Counter()
+        self.total_amostras = 0
+        self.iniciado_em = None
+        self.duracao = 0.0
+
+    def iniciar(self, requisicoes=None, segundos=None, intervalo=INTERVALO_PADRAO):
+        with self._lock:
+            if self.ativo:
+                raise RuntimeError("Já existe um perfilamento em andamento")
+            self.modo = "requisicoes" if requisicoes else "janela"
+            self.requisicoes_restantes = int(requisicoes or 0)
+            segundos = min(float(segundos or SEGUNDOS_MAXIMOS), SEGUNDOS_MAXIMOS)
+            self.fim = time.monotonic() + segundos
+            self.intervalo = max(0.001, float(intervalo))
+            self.amostras = Counter()
+            self.total_amostras = 0
+            self._alvos = set()
+            self.iniciado_em = time.time()
+            self.ativo = True
+            self._thread = threading.Thread(target=self._loop, name="perfilamento", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        with self._lock:
+            self.ativo = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+
+    def entrar_requisicao(self):
+        """Marca a thread atual para amostragem se ainda faltam requisições a perfilar."""
+        with self._lock:
+            if not self.ativo or self.modo != "requisicoes" or self.requisicoes_restantes <= 0:
+                return False
+            self.requisicoes_restantes -= 1
+            self._alvos.add(threading.get_ident())
+            return True
+
+    def sair_requisicao(self):
+        with self._lock:
+            self._alvos.discard(threading.get_ident())
+            terminou = self.modo == "requisicoes" and self.requisicoes_restantes <= 0 and not self._alvos
+            if terminou:
+                self.ativo = False
+
+    def _loop(self):
+        proprio = threading.get_ident()
+        inicio = time.monotonic()
+        while self.ativo and time.monotonic() < self.fim:
+            with self._lock:
+                alvos = set(self._alvos) if self.modo == "requisicoes" else None
+            pilhas = [
+                _pilha(frame) for ident, frame in sys._current_frames().items()
+                if ident != proprio and (alvos is None or ident in alvos)
+            ]
+            with self._lock:
+                self.amostras.update(pilhas)
+                self.total_amostras += len(pilhas)
+            time.sleep(self.intervalo)
+        self.duracao = time.monotonic() - inicio
+        self.ativo = False
+
+    def status(self):
+        return {
+            "active": self.ativo,
+            "mode": self.modo,
+            "remaining_requests": self.requisicoes_restantes if self.modo == "requisicoes" else None,
+            "interval_ms": round(self.intervalo * 1000, 3),
+            "samples": self.total_amostras,
+            "distinct_stacks": len(self.amostras),
+            "started_at": self.iniciado_em,
+            "duration_s": round(self.duracao, 3) if not self.ativo else None
+        }
+
+    def collapsed(self):
+        """Formato 'collapsed stacks': 'raiz;...;folha contagem' por linha."""
+        with self._lock:
+            contagens = self.amostras.most_common()
+        return "".join(f"{pilha} {n}\n" for pilha, n in contagens)
+
+
+amostrador = Amostrador()
+
+
+# ===============================
+# Integração com o Flask
+# ===============================
+
+def token_valido(valor):
+    return bool(TOKEN) and bool(valor) and hmac.compare_digest(valor, TOKEN)
+
+
+def _positivo(dados, nome, tipo):
+    """Parâmetro numérico positivo do corpo de /start (None se ausente); ValueError se inválido."""
+    valor = dados.get(nome)
+    if valor is None:
+        return None
+    try:
+        if isinstance(valor, bool):
+            raise TypeError
+        numero = tipo(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{nome} deve ser um número") from None
+    if not 0 < numero < float("inf"):
+        raise ValueError(f"{nome} deve ser maior que zero")
+    return numero
+
+
+def instalar(app, prefixo):
+    """Registra os hooks de medição e as rotas de administração (prefixo/start, stop, status, dump)."""
+
+    @app.before_request
+    def _perfil_inicio():
+        g.perfil_inicio = (time.perf_counter(), time.thread_time())
+        g.perfil_token = _medidas.set([])
+        g.perfil_amostrado = amostrador.entrar_requisicao()
+
+    @app.after_request
+    def _perfil_headers(response):
+        if "perfil_inicio" in g and (SERVER_TIMING_SEMPRE or token_valido(request.headers.get("X-Profiling-Token"))):
+            inicio, inicio_cpu = g.perfil_inicio
+            response.headers["Server-Timing"] = server_timing(
+                _medidas.get() or [], time.perf_counter() - inicio, time.thread_time() - inicio_cpu)
+        return response
+
+    @app.teardown_request
+    def _perfil_fim(exc=None):
+        token = g.pop("perfil_token", None)
+        if token is not None:
+            _medidas.reset(token)
+        if g.pop("perfil_amostrado", False):
+            amostrador.sair_requisicao()
+
+    def protegido(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not TOKEN:
+                return jsonify({"error": "Perfilamento desativado (PROFILING_TOKEN não configurado)"}), 404
+            if not token_valido(request.headers.get("X-Profiling-Token")):
+                return jsonify({"error": "Token de perfilamento inválido"}), 403
+            return view(*args, **kwargs)
+        return wrapper
+
+    @app.route(prefixo + "/start", methods=["POST"], endpoint="profiling_start")
+    @protegido
+    def _iniciar():
+        dados = request.get_json(silent=True) or {}
+        if not isinstance(dados, dict):
+            return jsonify({"error": "Corpo deve ser um objeto JSON"}), 400
+        try:
+            requisicoes = _positivo(dados, "requests", int)
+            segundos = _positivo(dados, "seconds", float)
+            intervalo_ms = _positivo(dados, "interval_ms", float)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            amostrador.iniciar(
+                requisicoes=requisicoes,
+                segundos=segundos,
+                intervalo=INTERVALO_PADRAO if intervalo_ms is None else intervalo_ms / 1000
+            )
+        except RuntimeError as e:
+            return jsonify({"error": str(e), "status": amostrador.status()}), 409
+        return jsonify(amostrador.status()), 202
+
+    @app.route(prefixo + "/stop", methods=["POST"], endpoint="profiling_stop")
+    @protegido
+    def _parar():
+        amostrador.parar()
+        return jsonify(amostrador.status()), 200
+
+    @app.route(prefixo + "/status", methods=["GET"], endpoint="profiling_status")
+    @protegido
+    def _status():
+        return jsonify({"sampler": amostrador.status(), "functions": totais()}), 200
+
+    @app.route(prefixo + "/dump", methods=["GET"], endpoint="profiling_dump")
+    @protegido
+    def _dump():
+        return Response(amostrador.collapsed(), mimetype="text/plain",
+                        headers={"Content-Disposition": "attachment; filename=perfil.collapsed"})
@@ -0,0 +1,199 @@
+# ARQUIVO COM O POOL DE PROCESSOS PARA A ANÁLISE LOCAL DE ÁUDIO
+# Croma, segmentação e impressão digital são NumPy/Python puros e, nas threads das
+# requisições, disputam o GIL. Aqui elas rodam em processos já aquecidos (modelos e
+# matrizes de croma carregados) e o PCM decodificado vai por memória compartilhada,
+# sem ser serializado. Sinais longos são divididos em tarefas de tamanho fixo.
+#
+# UMI_POOL_PROCESSOS: processos de análise no host (padrão: núcleos da máquina; 0 desliga e roda
+#   na thread), divididos entre os WEB_CONCURRENCY workers do servidor WSGI
+# UMI_POOL_TAREFA_SEGUNDOS: áudio por tarefa ao dividir o cromagrama (padrão 30 s)
+# UMI_POOL_MINIMO_SEGUNDOS: abaixo disso roda na própria thread (padrão 5 s)
+
+import os
+import sys
+import threading
+import importlib
+import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from modulos import analise_local
+
+PROCESSOS_HOST = int(os.getenv("UMI_POOL_PROCESSOS", os.cpu_count() or 1))
+WORKERS_WSGI = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+# Cada worker do servidor tem o seu pool: o total no host fica em PROCESSOS_HOST
+PROCESSOS = max(1, PROCESSOS_HOST // WORKERS_WSGI) if PROCESSOS_HOST > 0 else 0
+TAREFA_SEGUNDOS = float(os.getenv("UMI_POOL_TAREFA_SEGUNDOS", 30))
+MINIMO_SEGUNDOS = float(os.getenv("UMI_POOL_MINIMO_SEGUNDOS", 5))
+
+# Tarefas aceitas: nome → "módulo:função(sinal, **kwargs)" (resolvido no processo)
+TAREFAS = {
+    "cromagrama": "modulos.analise_local:cromagrama",
+    "segmentar": "modulos.analise_local:segmentar_acordes",
+    "estimar": "modulos.analise_local:estimar_acorde",
+    "impressao": "modulos.impressao:calcular",
+}
+
+
+def _funcao(tarefa):
+    modulo, nome = TAREFAS[tarefa].split(":")
+    return getattr(importlib.import_module(modulo), nome)
+
+
+# ===============================
+# Lado do processo trabalhador
+# ===============================
+
+def _aquecer():
+    """Inicializador: importa os módulos e monta as matrizes em cache antes da primeira tarefa."""
+    for tarefa in TAREFAS:
+        _funcao(tarefa)
+    analise_local.cromagrama(np.zeros(analise_local.TAMANHO_JANELA * 2, dtype=np.float32))
+    analise_local.classificar(np.ones((1, 12), dtype=np.float32))
+
+
+def _anexar(nome_memoria):
+    """
+    Abre o bloco sem registrá-lo no resource_tracker: quem cria e remove é o processo
+    principal. Com forkserver/spawn o tracker é o mesmo do principal, então registrar e
+    desregistrar aqui apagaria o registro dele.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=nome_memoria, track=False)
+    registrar = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=nome_memoria)
+    finally:
+        resource_tracker.register = registrar
+
+
+def _executar(tarefa, nome_memoria, n_amostras, inicio, fim, kwargs):
+    memoria = _anexar(nome_memoria)
+    try:
+        sinal = np.ndarray((n_amostras,), dtype=np.float32, buffer=memoria.buf)[inicio:fim]
+        resultado = _funcao(tarefa)(sinal, **kwargs)
+        del sinal
+        return resultado
+    finally:
+        memoria.close()
+
+
+def _ping(_):
+    return os.getpid()
+
+
+# ===============================
+# Lado da API
+# ===============================
+
+def _contexto():
+    """
+    fork herda os módulos já importados, mas só é seguro sem outras threads (locks
+    presos por elas ficariam presos no filho). Pool criado depois que o servidor já
+    atende requisições (ex: sem aquecer no post-fork do WSGI) usa forkserver/spawn.
+    """
+    metodos = multiprocessing.get_all_start_methods()
+    if "fork" in metodos and threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+    if "forkserver" in metodos:
+        contexto = multiprocessing.get_context("forkserver")
+        contexto.set_forkserver_preload(["modulos.analise_local"])
+        return contexto
+    return multiprocessing.get_context("spawn")
+
+
+class PoolAnalise:
+    """Pool de processos aquecidos; sem processos (processos=0) executa na própria thread."""
+
+    def __init__(self, processos=PROCESSOS, tarefa_segundos=TAREFA_SEGUNDOS, minimo_segundos=MINIMO_SEGUNDOS):
+        self.processos = max(0, int(processos))
+        self.tarefa_segundos = tarefa_segundos
+        self.minimo_segundos = minimo_segundos
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.processos, mp_context=_contexto(),
+                                                     initializer=_aquecer)
+            return self._executor
+
+    def aquecer(self):
+        """Sobe todos os processos agora (chamar na inicialização do servidor)."""
+        if self.processos:
+            list(self._pool().map(_ping, range(self.processos)))
+            print(f"🔥 Pool de análise pronto: {self.processos} processos")
+
+    def encerrar(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def _em_linha(self, sinal, taxa):
+        return not self.processos or len(sinal) < self.minimo_segundos * taxa
+
+    def _submeter(self, tarefas, sinal):
+        """Copia o sinal para memória compartilhada e roda [(tarefa, inicio, fim, kwargs)] no pool."""
+        sinal = np.ascontiguousarray(sinal, dtype=np.float32)
+        memoria = shared_memory.SharedMemory(create=True, size=max(1, sinal.nbytes))
+        try:
+            np.ndarray(sinal.shape, dtype=np.float32, buffer=memoria.buf)[:] = sinal
+            try:
+                futuros = [
+                    self._pool().submit(_executar, tarefa, memoria.name, len(sinal), inicio, fim, kwargs)
+                    for tarefa, inicio, fim, kwargs in tarefas
+                ]
+                return [futuro.result() for futuro in futuros]
+            except BrokenProcessPool:
+                # Um processo morreu (ex: falta de memória): recria o pool na próxima chamada
+                with self._lock:
+                    self._executor = None
+                raise
+        finally:
+            memoria.close()
+            memoria.unlink()
+
+    def executar(self, tarefa, sinal, taxa=analise_local.TAXA_PADRAO, **kwargs):
+        """Roda uma tarefa de TAREFAS sobre o sinal inteiro em um processo do pool."""
+        if tarefa not in TAREFAS:
+            raise ValueError(f"Tarefa desconhecida: {tarefa}")
+        if taxa != analise_local.TAXA_PADRAO:
+            kwargs["taxa"] = taxa
+        if self._em_linha(sinal, taxa):
+            return _funcao(tarefa)(sinal, **kwargs)
+        return self._submeter([(tarefa, 0, len(sinal), kwargs)], sinal)[0]
+
+    def cromagrama(self, sinal, taxa=analise_local.TAXA_PADRAO,
+                   n_fft=analise_local.TAMANHO_JANELA, salto=analise_local.SALTO):
+        """Mesmo resultado de analise_local.cromagrama, com o sinal dividido entre os processos."""
+        n_quadros = 1 + (len(sinal) - n_fft) // salto if len(sinal) >= n_fft else 0
+        quadros_por_tarefa = max(1, int(self.tarefa_segundos * taxa / salto))
+        if self._em_linha(sinal, taxa) or n_quadros <= quadros_por_tarefa:
+            return analise_local.cromagrama(sinal, taxa, n_fft, salto)
+
+        kwargs = {"taxa": taxa, "n_fft": n_fft, "salto": salto}
+        tarefas = [
+            ("cromagrama", q * salto, (min(q + quadros_por_tarefa, n_quadros) - 1) * salto + n_fft, kwargs)
+            for q in range(0, n_quadros, quadros_por_tarefa)
+        ]
+        partes = self._submeter(tarefas, sinal)
+        return np.concatenate([c for c, _ in partes]), np.concatenate([e for _, e in partes])
+
+
+_padrao = None
+_lock_padrao = threading.Lock()
+
+
+def padrao():
+    """Pool compartilhado pelo processo (configurado pelas variáveis UMI_POOL_*)."""
+    global _padrao
+    with _lock_padrao:
+        if _padrao is None:
+            _padrao = PoolAnalise()
+        return _padrao
@@ -0,0 +1,99 @@
+# ARQUIVO QUE MANTÉM O ESTADO DE UMA SESSÃO DE PRÁTICA EM TEMPO REAL (WEBSOCKET)
+
+import time
+import numpy as np
+
+from modulos import analise_local, perfilamento
+
+TAXA_MINIMA, TAXA_MAXIMA = 8000, 96000
+JANELA_MAXIMA = 10.0  # segundos
+
+
+class SessaoPratica:
+    """
+    Buffer de análise por conexão: recebe quadros PCM curtos, mantém uma
+    janela móvel dos últimos segundos e gera estimativas incrementais.
+    """
+
+    def __init__(self, taxa=analise_local.TAXA_PADRAO, formato="s16le",
+                 janela=1.5, salto=0.25, max_gravacao=30.0, acorde_esperado=None):
+        # Vem do cliente: ValueError/TypeError com valores inválidos
+        self.taxa = int(taxa)
+        janela, salto = float(janela), float(salto)
+        if not TAXA_MINIMA <= self.taxa <= TAXA_MAXIMA:
+            raise ValueError(f"sample_rate deve estar entre {TAXA_MINIMA} e {TAXA_MAXIMA}")
+        if formato not in analise_local.FORMATOS_PCM:
+            raise ValueError(f"format deve ser um de: {', '.join(analise_local.FORMATOS_PCM)}")
+        if not 0 < janela <= JANELA_MAXIMA:
+            raise ValueError(f"window deve estar entre 0 e {JANELA_MAXIMA:g} segundos")
+        if not 0 < salto <= janela:
+            raise ValueError("hop deve ser positivo e no máximo igual a window")
+        if acorde_esperado is not None and not isinstance(acorde_esperado, str):
+            raise ValueError("expected_chord deve ser texto")
+        self.formato = formato
+        self.salto = int(salto * self.taxa)
+        self.acorde_esperado = acorde_esperado
+
+        # Janela móvel de tamanho fixo usada nas estimativas
+        self.janela = np.zeros(int(janela * self.taxa), dtype=np.float32)
+        self.preenchido = 0
+
+        # Gravação completa (limitada) para a análise final com o music.ai
+        self.max_amostras = int(max_gravacao * self.taxa)
+        self.gravacao = []
+        self.amostras_gravadas = 0
+
+        self.desde_ultima = 0
+        self.amostras_total = 0
+        self.inicio = time.time()
+
+    @perfilamento.medir()
+    def adicionar(self, dados):
+        """
+        Adiciona um quadro PCM. Retorna uma estimativa (dict) quando já
+        chegou áudio novo suficiente desde a última, senão None.
+        """
+        quadro = analise_local.pcm_para_float(dados, self.formato)
+        n = len(quadro)
+        if n == 0:
+            return None
+
+        if n >= len(self.janela):
+            self.janela[:] = quadro[-len(self.janela):]
+        else:
+            self.janela[:-n] = self.janela[n:]
+            self.janela[-n:] = quadro
+        self.preenchido = min(len(self.janela), self.preenchido + n)
+
+        if self.amostras_gravadas < self.max_amostras:
+            resto = quadro[:self.max_amostras - self.amostras_gravadas]
+            self.gravacao.append(resto)
+            self.amostras_gravadas += len(resto)
+
+        self.amostras_total += n
+        self.desde_ultima += n
+        if self.desde_ultima < self.salto:
+            return None
+        self.desde_ultima = 0
+        return self.estimar()
+
+    def estimar(self):
+        """Estimativa do acorde na janela móvel atual."""
+        trecho = self.janela[-self.preenchido:] if self.preenchido else self.janela[:0]
+        inicio = time.perf_counter()
+        acorde, confianca = analise_local.estimar_acorde(trecho, self.taxa)
+        estimativa = {
+            "type": "estimate",
+            "chord": None if acorde == "N" else acorde,
+            "confidence": round(confianca, 3),
+            "t": round(self.amostras_total / float(self.taxa), 3),
+            "analysis_ms": round((time.perf_counter() - inicio) * 1000, 2)
+        }
+        if self.acorde_esperado and estimativa["chord"]:
+            estimativa["correct"] = analise_local.mesmo_acorde(acorde, self.acorde_esperado)
+        return estimativa
+
+    def salvar_gravacao(self, caminho):
+        """Grava o áudio recebido como WAV (para a análise final)."""
+        sinal = np.concatenate(self.gravacao) if self.gravacao else np.zeros(0, dtype=np.float32)
+        return analise_local.salvar_wav(caminho, sinal, self.taxa)
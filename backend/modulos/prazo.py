@@ -0,0 +1,182 @@
+# ARQUIVO COM O PRAZO (DEADLINE) E O CANCELAMENTO DE CADA REQUISIÇÃO
+# O prazo nasce na camada da API e acompanha todas as chamadas externas
+# (music.ai, cifraclub-api): cada chamada usa só o tempo que ainda resta e
+# o trabalho para quando o prazo acaba, o cliente desconecta ou pede cancelamento
+
+import os
+import time
+import socket
+import threading
+import contextvars
+
+from modulos import estado
+
+PRAZO_PADRAO = float(os.getenv("UMI_REQUEST_TIMEOUT", 180))
+PRAZO_MAXIMO = float(os.getenv("UMI_REQUEST_TIMEOUT_MAX", 600))
+TIMEOUT_CONEXAO = 10
+INTERVALO_VERIFICACAO = 1.0
+PREFIXO_CANCELADO = "cancelado:"
+PREFIXO_ATIVO = "requisicao:"
+
+
+class PrazoExcedido(RuntimeError):
+    """O trabalho foi interrompido: motivo 'prazo' (deadline) ou 'cancelado'."""
+
+    def __init__(self, mensagem, motivo="prazo"):
+        super().__init__(mensagem)
+        self.motivo = motivo
+
+
+class Prazo:
+    """
+    Deadline de uma requisição.
+
+    segundos=None não tem limite de tempo (uso fora da API, ex: CLIs).
+    desconectado: função opcional que diz se o cliente já foi embora.
+    """
+
+    def __init__(self, segundos=None, requisicao_id=None, desconectado=None):
+        self.fim = None if segundos is None else time.monotonic() + segundos
+        self.requisicao_id = requisicao_id
+        self.motivo = None
+        self._desconectado = desconectado
+        self._evento = threading.Event()
+        self._ultima_verificacao = 0.0
+
+    def restante(self):
+        """Segundos até o prazo (None sem limite; nunca negativo)."""
+        if self.fim is None:
+            return None
+        return max(0.0, self.fim - time.monotonic())
+
+    def cancelar(self, motivo="cancelado"):
+        if self.motivo is None:
+            self.motivo = motivo
+        self._evento.set()
+
+    def cancelado(self):
+        """True se cancelado; consulta cliente e pedidos de cancelamento no máximo 1x/s."""
+        if self._evento.is_set():
+            return True
+        agora = time.monotonic()
+        if agora - self._ultima_verificacao >= INTERVALO_VERIFICACAO:
+            self._ultima_verificacao = agora
+            if self._desconectado is not None and self._desconectado():
+                self.cancelar("cliente desconectou")
+            elif self.requisicao_id and _cancelamento_registrado(self.requisicao_id):
+                self.cancelar("cancelado pelo cliente")
+        return self._evento.is_set()
+
+    def verificar(self):
+        """Levanta PrazoExcedido se o prazo acabou ou a requisição foi cancelada."""
+        if self.cancelado():
+            raise PrazoExcedido(f"Requisição cancelada ({self.motivo})", motivo="cancelado")
+        if self.fim is not None and time.monotonic() >= self.fim:
+            raise PrazoExcedido("Prazo da requisição esgotado", motivo="prazo")
+
+    def timeout(self, maximo=None):
+        """Timeout (conexão, leitura) para requests, limitado ao tempo restante."""
+        self.verificar()
+        leitura = self.restante()
+        if maximo is not None:
+            leitura = maximo if leitura is None else min(leitura, maximo)
+        if leitura is None:
+            return (TIMEOUT_CONEXAO, None)
+        return (min(TIMEOUT_CONEXAO, leitura), leitura)
+
+    def dormir(self, segundos):
+        """time.sleep que acorda no cancelamento e respeita o prazo."""
+        self.verificar()
+        fim = time.monotonic() + segundos
+        while True:
+            espera = fim - time.monotonic()
+            restante = self.restante()
+            if restante is not None:
+                espera = min(espera, restante)
+            if espera <= 0:
+                break
+            self._evento.wait(min(espera, INTERVALO_VERIFICACAO))
+            self.verificar()
+        self.verificar()
+
+    def cabecalho_ms(self):
+        """Valor do header X-Deadline-Ms repassado aos serviços chamados (ou None)."""
+        restante = self.restante()
+        return None if restante is None else str(int(restante * 1000))
+
+
+_SEM_PRAZO = Prazo()
+_atual = contextvars.ContextVar("prazo", default=_SEM_PRAZO)
+_ativos = {}
+_lock = threading.Lock()
+
+
+def atual():
+    """Prazo da requisição corrente (sem limite fora de uma requisição)."""
+    return _atual.get()
+
+
+def iniciar(prazo):
+    """
+    Torna o prazo o corrente nesta thread e, se tiver id, o registra para cancelamento
+    (também no estado compartilhado, para o cancelamento chegar por qualquer worker).
+    """
+    if prazo.requisicao_id:
+        with _lock:
+            _ativos[prazo.requisicao_id] = prazo
+        restante = prazo.restante()
+        estado.padrao().definir(PREFIXO_ATIVO + prazo.requisicao_id, b"1",
+                                ttl=PRAZO_MAXIMO if restante is None else restante + TIMEOUT_CONEXAO)
+    return _atual.set(prazo)
+
+
+def encerrar(token):
+    prazo = _atual.get()
+    if prazo.requisicao_id:
+        with _lock:
+            if _ativos.get(prazo.requisicao_id) is prazo:
+                del _ativos[prazo.requisicao_id]
+        # Um pedido de cancelamento que chegou tarde não vale para a próxima requisição com o mesmo id
+        estado.padrao().remover(PREFIXO_ATIVO + prazo.requisicao_id)
+        estado.padrao().remover(PREFIXO_CANCELADO + prazo.requisicao_id)
+    _atual.reset(token)
+
+
+def cancelar(requisicao_id):
+    """
+    Cancela uma requisição em andamento. Retorna "cancelada" se ela roda neste processo,
+    "registrada" se roda em outro (o pedido fica no estado compartilhado e é visto na
+    próxima verificação) ou None se não há requisição ativa com esse id.
+    """
+    with _lock:
+        prazo = _ativos.get(requisicao_id)
+    if prazo is not None:
+        prazo.cancelar("cancelado pelo cliente")
+        return "cancelada"
+    if estado.padrao().obter(PREFIXO_ATIVO + requisicao_id) is None:
+        return None
+    estado.padrao().definir(PREFIXO_CANCELADO + requisicao_id, b"1", ttl=PRAZO_MAXIMO)
+    return "registrada"
+
+
+def _cancelamento_registrado(requisicao_id):
+    return estado.padrao().obter(PREFIXO_CANCELADO + requisicao_id) is not None
+
+
+def segundos_do_header(valor):
+    """Prazo pedido pelo cliente (X-Request-Timeout, em segundos), limitado ao máximo."""
+    try:
+        segundos = float(valor) if valor else PRAZO_PADRAO
+    except ValueError:
+        segundos = PRAZO_PADRAO
+    return max(1.0, min(segundos, PRAZO_MAXIMO))
+
+
+def socket_fechado(sock):
+    """Espia o socket do cliente sem consumir dados: EOF indica que ele desconectou."""
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except (BlockingIOError, InterruptedError):
+        return False
+    except OSError:
+        return True
@@ -0,0 +1,121 @@
+# ARQUIVO QUE GUARDA OS ÁUDIOS DE REFERÊNCIA (GABARITOS) JÁ ANALISADOS
+# Cada referência é registrada uma vez (id da lição/acorde) e reaproveitada em todas as tentativas
+
+import os
+import sys
+import time
+
+from modulos import analise_local, estado, resultados, perfilamento, pool_analise
+
+WORKFLOW_PADRAO = "untitled-workflow-18c7355"
+EXTENSOES_AUDIO = (".mp3", ".wav", ".m4a", ".ogg")
+PREFIXO = "ref:"
+
+
+def id_referencia(licao, acorde=None):
+    """Monta o id da referência a partir da lição e do acorde (ex: 'lesson-1-2:C')."""
+    return f"{licao}:{acorde}" if acorde else str(licao)
+
+
+def _features_locais(caminho):
+    """Croma médio e segmentação local do gabarito (None se não der para decodificar)."""
+    try:
+        sinal = analise_local.carregar_pcm(caminho)
+    except Exception as e:
+        print(f"⚠️ Features locais indisponíveis para a referência: {e}")
+        return None
+    # Cromagrama dividido entre os processos do pool; a segmentação reaproveita o mesmo
+    croma, energia = pool_analise.padrao().cromagrama(sinal)
+    media = (croma * energia[:, None]).sum(axis=0)
+    media = media / max(float((media ** 2).sum()) ** 0.5, 1e-9)
+    return {
+        "croma_medio": [round(float(v), 4) for v in media],
+        "duracao": round(len(sinal) / float(analise_local.TAXA_PADRAO), 3),
+        "segmentos_locais": analise_local.segmentar_croma(croma, energia)
+    }
+
+
+@perfilamento.medir()
+def registrar(ref_id, caminho_audio, workflow=WORKFLOW_PADRAO):
+    """
+    Analisa o áudio de referência uma única vez e guarda o resultado.
+    Se o mesmo arquivo já estiver registrado com o mesmo workflow, não reprocessa.
+    """
+    sha256 = resultados.hash_arquivo(caminho_audio)
+    existente = obter(ref_id)
+    if existente and existente.get("sha256") == sha256 and existente.get("workflow") == workflow:
+        print(f"♻️ Referência '{ref_id}' já registrada, reaproveitando")
+        return existente
+
+    print(f"📘 Registrando referência '{ref_id}'...")
+    acordes = resultados.acordes(caminho_audio, workflow)
+    registro = {
+        "id": ref_id,
+        "acordes": acordes,
+        "workflow": workflow,
+        "sha256": sha256,
+        "features": _features_locais(caminho_audio),
+        "registrado_em": int(time.time())
+    }
+
+    estado.padrao().definir_json(PREFIXO + ref_id, registro)
+    return registro
+
+
+def obter(ref_id):
+    """Retorna o registro da referência ou None se não existir."""
+    return estado.padrao().obter_json(PREFIXO + ref_id)
+
+
+def listar():
+    """Lista resumida de todas as referências registradas."""
+    itens = []
+    for chave in sorted(estado.padrao().listar_chaves(PREFIXO)):
+        registro = estado.padrao().obter_json(chave)
+        if not registro:
+            continue
+        itens.append({
+            "id": registro["id"],
+            "acordes": registro["acordes"],
+            "workflow": registro["workflow"],
+            "registrado_em": registro["registrado_em"]
+        })
+    return itens
+
+
+def remover(ref_id):
+    """Remove a referência. Retorna True se existia."""
+    if obter(ref_id) is None:
+        return False
+    estado.padrao().remover(PREFIXO + ref_id)
+    return True
+
+
+def registrar_pasta(pasta, workflow=WORKFLOW_PADRAO):
+    """
+    Pré-computa todas as referências de uma pasta (uso no deploy).
+    O id vem do caminho relativo sem extensão: 'lesson-1-2/C.wav' → 'lesson-1-2:C'.
+    """
+    registrados = []
+    for raiz, _, arquivos in os.walk(pasta):
+        for nome in sorted(arquivos):
+            if not nome.lower().endswith(EXTENSOES_AUDIO):
+                continue
+            caminho = os.path.join(raiz, nome)
+            relativo = os.path.splitext(os.path.relpath(caminho, pasta))[0]
+            ref_id = relativo.replace(os.sep, ":")
+            try:
+                registrar(ref_id, caminho, workflow)
+                registrados.append(ref_id)
+            except Exception as e:
+                print(f"❌ Falha ao registrar '{ref_id}': {e}")
+    return registrados
+
+
+# Uso: python -m modulos.referencias <pasta_de_gabaritos> [workflow]
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python -m modulos.referencias <pasta_de_gabaritos> [workflow]")
+        sys.exit(1)
+    ids = registrar_pasta(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else WORKFLOW_PADRAO)
+    print(f"✅ {len(ids)} referências registradas")
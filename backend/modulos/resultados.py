@@ -0,0 +1,69 @@
+# ARQUIVO QUE GUARDA OS RESULTADOS DO MUSIC.AI PELO CONTEÚDO DO ÁUDIO
+# O cache fica no estado compartilhado, então vale para todos os workers;
+# pedidos simultâneos do mesmo áudio viram uma única análise (single-flight)
+# e áudios quase iguais (outro codec, ver impressao.py) reaproveitam o resultado.
+# Tentativas avaliadas (o áudio tocado pelo aluno) usam reaproveitar=False: uma execução
+# com um acorde errado ainda parece com o gabarito e herdaria a timeline dele.
+
+import os
+
+import requests
+
+from modulos import chord_detector, extract_music_chords, estado, prazo, perfilamento, impressao, escalonador
+from modulos.jobs_duraveis import hash_arquivo
+
+WORKFLOW_PADRAO = "untitled-workflow-18c7355"
+TTL_RESULTADOS = float(os.getenv("UMI_RESULT_TTL", 7 * 24 * 3600))
+
+
+def _chave(tipo, workflow, sha256):
+    return f"resultado:{tipo}:{workflow}:{sha256}"
+
+
+def _analisar(tipo, caminho, workflow, funcao, sha256, reaproveitar):
+    """
+    Roda dentro do single-flight: tenta um áudio semelhante já analisado antes do music.ai.
+    Sem reaproveitar, não procura nem indexa a impressão (só o cache pelo hash exato vale).
+    """
+    impressao_audio = impressao.do_arquivo(caminho) if reaproveitar else None
+    if impressao_audio is not None:
+        for outro, similaridade, deslocamento in impressao.semelhantes(impressao_audio, excluir=sha256):
+            anterior = estado.padrao().obter_json(_chave(tipo, workflow, outro))
+            if anterior is None:
+                continue
+            print(f"♻️ Reaproveitando resultado de áudio semelhante ({similaridade:.0%}, deslocamento {deslocamento}s)")
+            if tipo == "timeline":
+                return impressao.deslocar_segmentos(anterior["valor"], deslocamento)
+            return anterior["valor"]
+
+    # Só a chamada ao music.ai ocupa vaga no escalonador
+    with escalonador.vaga(espera=prazo.atual().restante()):
+        valor = funcao(caminho, workflow)
+    if impressao_audio is not None:
+        impressao.registrar(sha256, impressao_audio)
+    return valor
+
+
+def _memorizado(tipo, caminho, workflow, funcao, reaproveitar=True):
+    sha256 = hash_arquivo(caminho)
+    atual = prazo.atual()
+    try:
+        return estado.padrao().unico(_chave(tipo, workflow, sha256),
+                                     lambda: _analisar(tipo, caminho, workflow, funcao, sha256, reaproveitar),
+                                     ttl=TTL_RESULTADOS, espera=atual.restante())
+    except (estado.LockOcupado, requests.Timeout):
+        # Esgotou o tempo esperando outro worker ou o music.ai: se foi o prazo, avisa como tal
+        atual.verificar()
+        raise
+
+
+@perfilamento.medir()
+def acordes(caminho, workflow=WORKFLOW_PADRAO, reaproveitar=True):
+    """Mesmo retorno de chord_detector.get_chords_from_audio, com cache."""
+    return _memorizado("acordes", caminho, workflow, chord_detector.get_chords_from_audio, reaproveitar)
+
+
+@perfilamento.medir()
+def timeline(caminho, workflow=WORKFLOW_PADRAO, reaproveitar=True):
+    """Mesmo retorno de extract_music_chords.main, com cache."""
+    return _memorizado("timeline", caminho, workflow, extract_music_chords.main, reaproveitar)
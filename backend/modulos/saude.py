@@ -0,0 +1,235 @@
+# ARQUIVO COM O MONITOR DE SAÚDE DAS DEPENDÊNCIAS (cifraclub-api, Selenium, music.ai, OpenAI)
+# Cada dependência é sondada em segundo plano, no seu intervalo; as últimas medidas
+# ficam numa janela móvel (disponibilidade, latência p50/p95, falhas seguidas).
+# O resumo é montado (já em JSON) a cada sonda, então /api/ready só devolve bytes
+# prontos, sem I/O. Os endpoints que dependem de algo sabidamente fora respondem 503
+# na hora (@exige) em vez de esperar o timeout.
+#
+# UMI_SAUDE_INTERVALO: segundos entre sondas (padrão 30; 5 enquanto a dependência está fora)
+# UMI_SAUDE_TIMEOUT: timeout de cada sonda (padrão 5 s)
+# UMI_SAUDE_CRITICAS: dependências que tiram o serviço de "ready" quando fora (padrão: musicai)
+
+import os
+import json
+import time
+import math
+import threading
+from collections import deque
+from functools import wraps
+
+import numpy as np
+import requests
+from flask import jsonify, Response
+
+INTERVALO = float(os.getenv("UMI_SAUDE_INTERVALO", 30))
+INTERVALO_FORA = 5.0
+TIMEOUT = float(os.getenv("UMI_SAUDE_TIMEOUT", 5))
+CRITICAS = [n.strip() for n in os.getenv("UMI_SAUDE_CRITICAS", "musicai").split(",") if n.strip()]
+JANELA = 20  # últimas sondas consideradas nas estatísticas
+FALHAS_PARA_FORA = 2  # falhas seguidas até considerar a dependência fora
+
+OK, DEGRADADO, FORA, DESCONHECIDO, DESATIVADA = "ok", "degradado", "fora", "desconhecido", "desativada"
+
+
+# ===============================
+# Verificações
+# ===============================
+
+def http(url, headers=None, aceitar=None):
+    """
+    Verificação por GET. Por padrão qualquer resposta abaixo de 500, exceto 401/403,
+    conta como disponível (o serviço respondeu e a chave foi aceita).
+    """
+    def verificar(timeout):
+        resposta = requests.get(url, headers=headers or {}, timeout=timeout)
+        if aceitar is not None:
+            valido = resposta.status_code in aceitar
+        else:
+            valido = resposta.status_code < 500 and resposta.status_code not in (401, 403)
+        if not valido:
+            raise RuntimeError(f"HTTP {resposta.status_code}")
+    return verificar
+
+
+def selenium(url_hub):
+    """Verificação do hub do Selenium (GET <hub>/status → value.ready)."""
+    def verificar(timeout):
+        resposta = requests.get(url_hub.rstrip("/") + "/status", timeout=timeout)
+        resposta.raise_for_status()
+        valor = resposta.json().get("value") or {}
+        if not valor.get("ready", False):
+            raise RuntimeError(valor.get("message") or "Hub sem nós disponíveis")
+    return verificar
+
+
+# ===============================
+# Sonda
+# ===============================
+
+class Sonda:
+    """Uma dependência: função de verificação (levanta exceção se indisponível) e janela de medidas."""
+
+    def __init__(self, nome, verificar, intervalo=INTERVALO, timeout=TIMEOUT, ativa=True, descricao=None):
+        self.nome = nome
+        self.verificar = verificar
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self.ativa = ativa
+        self.descricao = descricao
+        self.medidas = deque(maxlen=JANELA)  # (ok, latência em s)
+        self.falhas_seguidas = 0
+        self.ultimo_erro = None
+        self.ultima_sonda = None
+        self.ultimo_ok = None
+        self.proxima_sonda = time.time()
+        self._lock = threading.RLock()
+
+    def sondar(self):
+        inicio = time.perf_counter()
+        try:
+            self.verificar(self.timeout)
+            ok, erro = True, None
+        except Exception as e:
+            ok, erro = False, f"{type(e).__name__}: {e}"
+        self.registrar(ok, time.perf_counter() - inicio, erro)
+
+    def registrar(self, ok, latencia, erro=None):
+        agora = time.time()
+        with self._lock:
+            self.medidas.append((ok, latencia))
+            self.ultima_sonda = agora
+            if ok:
+                self.falhas_seguidas = 0
+                self.ultimo_ok = agora
+            else:
+                self.falhas_seguidas += 1
+                self.ultimo_erro = erro
+            espera = INTERVALO_FORA if self.status() == FORA else self.intervalo
+            self.proxima_sonda = agora + min(espera, self.intervalo)
+
+    def status(self):
+        if not self.ativa:
+            return DESATIVADA
+        with self._lock:
+            if not self.medidas:
+                return DESCONHECIDO
+            if self.falhas_seguidas >= FALHAS_PARA_FORA:
+                return FORA
+            if self.falhas_seguidas or not all(ok for ok, _ in self.medidas):
+                return DEGRADADO
+            return OK
+
+    def resumo(self):
+        with self._lock:
+            medidas = list(self.medidas)
+        latencias = [lat for ok, lat in medidas if ok]
+        return {
+            "status": self.status(),
+            "description": self.descricao,
+            "availability": round(sum(ok for ok, _ in medidas) / len(medidas), 3) if medidas else None,
+            "latency_ms": {
+                "p50": round(float(np.percentile(latencias, 50)) * 1000, 1),
+                "p95": round(float(np.percentile(latencias, 95)) * 1000, 1),
+                "last": round(medidas[-1][1] * 1000, 1)
+            } if latencias else None,
+            "samples": len(medidas),
+            "consecutive_failures": self.falhas_seguidas,
+            "last_error": self.ultimo_erro,
+            "last_check": self.ultima_sonda,
+            "last_ok": self.ultimo_ok
+        }
+
+
+# ===============================
+# Monitor
+# ===============================
+
+class Monitor:
+    """Sonda as dependências em threads próprias e mantém o resumo pronto para servir."""
+
+    def __init__(self, sondas, criticas=CRITICAS):
+        self.sondas = {s.nome: s for s in sondas}
+        self.criticas = [n for n in criticas if n in self.sondas]
+        self._lock = threading.Lock()
+        self._iniciado = False
+        self._parar = threading.Event()
+        self._atualizar_resumo()
+
+    def iniciar(self):
+        """Sobe uma thread por sonda ativa (idempotente)."""
+        if self._iniciado:
+            return
+        with self._lock:
+            if self._iniciado:
+                return
+            self._iniciado = True
+        for sonda in self.sondas.values():
+            if sonda.ativa:
+                threading.Thread(target=self._loop, args=(sonda,), name=f"saude-{sonda.nome}", daemon=True).start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _loop(self, sonda):
+        while not self._parar.is_set():
+            sonda.sondar()
+            self._atualizar_resumo()
+            self._parar.wait(max(0.0, sonda.proxima_sonda - time.time()))
+
+    def registrar(self, nome, ok, latencia, erro=None):
+        """Medida passiva (ex: chamada real que falhou) somada às das sondas."""
+        sonda = self.sondas.get(nome)
+        if sonda is not None and sonda.ativa:
+            sonda.registrar(ok, latencia, erro)
+            self._atualizar_resumo()
+
+    def _atualizar_resumo(self):
+        dependencias = {nome: sonda.resumo() for nome, sonda in self.sondas.items()}
+        pronto = not any(dependencias[n]["status"] == FORA for n in self.criticas)
+        resumo = {
+            "ready": pronto,
+            "status": OK if all(d["status"] in (OK, DESATIVADA) for d in dependencias.values()) else DEGRADADO,
+            "critical": self.criticas,
+            "updated_at": time.time(),
+            "dependencies": dependencias
+        }
+        # Troca de referência: leitores nunca veem um resumo pela metade
+        self._resumo = (resumo, json.dumps(resumo, ensure_ascii=False).encode())
+
+    def resumo(self):
+        return self._resumo[0]
+
+    def resposta_ready(self):
+        """Response de /api/ready a partir do JSON já montado (200 ou 503)."""
+        resumo, corpo = self._resumo
+        return Response(corpo, status=200 if resumo["ready"] else 503, mimetype="application/json",
+                        headers={"Cache-Control": "no-store"})
+
+    def fora(self, nome):
+        sonda = self.sondas.get(nome)
+        return sonda is not None and sonda.status() == FORA
+
+    def exige(self, *nomes):
+        """Decorator: responde 503 na hora se alguma das dependências está sabidamente fora."""
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                indisponiveis = [n for n in nomes if self.fora(n)]
+                if indisponiveis:
+                    return self._indisponivel(indisponiveis)
+                return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _indisponivel(self, nomes):
+        proxima = min(self.sondas[n].proxima_sonda for n in nomes)
+        response = jsonify({
+            'success': False,
+            'error': f"Dependência indisponível: {', '.join(nomes)}",
+            'reason': 'dependency_down',
+            'dependencies': {n: self.sondas[n].ultimo_erro for n in nomes},
+            'message': 'Serviço temporariamente indisponível, tente novamente em instantes'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max(1, math.ceil(proxima - time.time())))
+        return response
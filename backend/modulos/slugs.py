@@ -0,0 +1,134 @@
+# ARQUIVO QUE RESOLVE ARTISTA/MÚSICA DIGITADOS PARA OS SLUGS DO CIFRA CLUB
+# "Legião Urbana" / "Tempo Perdido!" viram legiao-urbana/tempo-perdido (sem acentos,
+# apóstrofos e pontuação) e, se o par já é conhecido, erros de digitação são corrigidos
+# pelo slug mais parecido (difflib). Conhecidos: o índice da cifraclub-api (/slugs) e as
+# cifras já encontradas por aqui.
+#
+# Misses confirmados pela cifraclub-api (404) ficam no estado compartilhado por
+# UMI_SLUG_MISS_TTL segundos: a mesma busca errada falha na hora, sem abrir o Selenium.
+
+import os
+import re
+import time
+import difflib
+import threading
+import unicodedata
+
+import requests
+
+from modulos import estado
+
+CIFRACLUB_API_URL = os.getenv("CIFRACLUB_API_URL", "http://localhost:3000")
+TTL_AUSENTE = float(os.getenv("UMI_SLUG_MISS_TTL", 6 * 3600))
+ATUALIZACAO = float(os.getenv("UMI_SLUGS_ATUALIZACAO", 300))
+SIMILARIDADE_MINIMA = 0.85
+TIMEOUT_INDICE = 3
+PREFIXO_CONHECIDO = "slug:"
+PREFIXO_AUSENTE = "slug_ausente:"
+
+_lock = threading.Lock()
+_indice = {"artistas": {}, "musicas": {}, "carregado_em": None, "atualizando": False}
+
+
+def normalizar(texto):
+    """Slug no formato do Cifra Club: 'Chitãozinho & Xororó' → 'chitaozinho-e-xororo'."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    texto = texto.replace("&", " e ")
+    texto = re.sub(r"['’`´\"]", "", texto)
+    texto = re.sub(r"[^a-z0-9]+", "-", texto)
+    return texto.strip("-")
+
+
+# ===============================
+# Índice de slugs conhecidos
+# ===============================
+
+def _adicionar(artistas, musicas, artista_slug, musica_slug, nome=None, artista=None):
+    # Busca tanto pelo slug quanto pelo nome de exibição normalizado
+    for chave in {artista_slug, normalizar(artista or "")} - {""}:
+        artistas.setdefault(chave, artista_slug)
+    destino = musicas.setdefault(artista_slug, {})
+    for chave in {musica_slug, normalizar(nome or "")} - {""}:
+        destino.setdefault(chave, musica_slug)
+
+
+def _pares_conhecidos():
+    pares = []
+    try:
+        resposta = requests.get(f"{CIFRACLUB_API_URL}/slugs", timeout=TIMEOUT_INDICE)
+        resposta.raise_for_status()
+        pares.extend(resposta.json().get("slugs", []))
+    except (requests.RequestException, ValueError) as e:
+        print(f"⚠️ Índice de slugs da cifraclub-api indisponível: {e}")
+    for chave in estado.padrao().listar_chaves(PREFIXO_CONHECIDO):
+        par = estado.padrao().obter_json(chave)
+        if par:
+            pares.append(par)
+    return pares
+
+
+def _carregar():
+    artistas, musicas = {}, {}
+    for par in _pares_conhecidos():
+        _adicionar(artistas, musicas, par["artist_slug"], par["song_slug"], par.get("name"), par.get("artist"))
+    with _lock:
+        _indice.update(artistas=artistas, musicas=musicas, carregado_em=time.monotonic(), atualizando=False)
+
+
+def _indice_atual():
+    """Índice em memória; o primeiro carregamento é síncrono e as atualizações em segundo plano."""
+    with _lock:
+        carregado_em = _indice["carregado_em"]
+        vencido = carregado_em is not None and time.monotonic() - carregado_em > ATUALIZACAO
+        if vencido and not _indice["atualizando"]:
+            _indice["atualizando"] = True
+            threading.Thread(target=_carregar, name="slugs", daemon=True).start()
+    if carregado_em is None:
+        _carregar()
+    return _indice
+
+
+def _parecido(chave, mapa):
+    if chave in mapa:
+        return mapa[chave]
+    candidatos = difflib.get_close_matches(chave, mapa.keys(), n=1, cutoff=SIMILARIDADE_MINIMA)
+    return mapa[candidatos[0]] if candidatos else None
+
+
+def resolver(artista, musica):
+    """
+    (artista_slug, musica_slug, conhecido): slugs canônicos quando o par (ou algo bem
+    parecido) já é conhecido; senão só a forma normalizada do que foi digitado.
+    """
+    artista_norm, musica_norm = normalizar(artista), normalizar(musica)
+    indice = _indice_atual()
+    artista_slug = _parecido(artista_norm, indice["artistas"])
+    if artista_slug is None:
+        return artista_norm, musica_norm, False
+    musica_slug = _parecido(musica_norm, indice["musicas"].get(artista_slug, {}))
+    if musica_slug is None:
+        return artista_slug, musica_norm, False
+    return artista_slug, musica_slug, True
+
+
+def registrar(artista_slug, musica_slug, nome=None, artista=None):
+    """Guarda um par que existe (cifra encontrada) e limpa um eventual miss em cache."""
+    par = {"artist_slug": artista_slug, "song_slug": musica_slug, "name": nome, "artist": artista}
+    estado.padrao().definir_json(f"{PREFIXO_CONHECIDO}{artista_slug}/{musica_slug}", par)
+    estado.padrao().remover(f"{PREFIXO_AUSENTE}{artista_slug}/{musica_slug}")
+    with _lock:
+        _adicionar(_indice["artistas"], _indice["musicas"], artista_slug, musica_slug, nome, artista)
+
+
+# ===============================
+# Cache negativo
+# ===============================
+
+def ausente(artista_slug, musica_slug):
+    """True se a cifraclub-api já confirmou que o par não existe (dentro do TTL)."""
+    return estado.padrao().obter(f"{PREFIXO_AUSENTE}{artista_slug}/{musica_slug}") is not None
+
+
+def marcar_ausente(artista_slug, musica_slug):
+    estado.padrao().definir(f"{PREFIXO_AUSENTE}{artista_slug}/{musica_slug}", b"1", ttl=TTL_AUSENTE)
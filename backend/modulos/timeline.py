@@ -0,0 +1,162 @@
+# ARQUIVO COM A REPRESENTAÇÃO COMPACTA (COLUNAR) DA TIMELINE DE ACORDES
+# Arrays de início/fim em float32 + códigos pequenos que indexam um vocabulário
+# Formato binário (little-endian):
+#   'UMTL' | versão u8 | largura do código u8 | n_segmentos u32 | n_vocab u16
+#   vocab: (tamanho u8 + utf-8) * n_vocab
+#   inícios float32[n] | fins float32[n] | códigos uint8/uint16[n]
+
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from modulos import estado
+
+TIPO_BINARIO = "application/x-umi-timeline"
+MAGICO = b"UMTL"
+VERSAO = 1
+_CABECALHO = struct.Struct("<4sBBIH")
+PREFIXO = "timeline:"
+MAX_EM_MEMORIA = 256
+# Aumentar quando o formato/pós-processamento da timeline mudar: muda os ids e força nova análise
+VERSAO_ANALISE = 1
+
+
+class TimelineAcordes:
+    """Timeline de acordes em colunas, com busca binária por tempo."""
+
+    def __init__(self, inicios, fins, codigos, vocabulario):
+        self.inicios = np.asarray(inicios, dtype=np.float32)
+        self.fins = np.asarray(fins, dtype=np.float32)
+        dtype = np.uint8 if len(vocabulario) <= 256 else np.uint16
+        self.codigos = np.asarray(codigos, dtype=dtype)
+        self.vocabulario = list(vocabulario)
+
+    def __len__(self):
+        return len(self.inicios)
+
+    @classmethod
+    def de_segmentos(cls, segmentos):
+        """Cria a partir da saída de extract_music_chords ([{'start', 'end', 'chord_majmin'}])."""
+        ordenados = sorted(segmentos, key=lambda s: float(s["start"]))
+        vocabulario, indices = [], {}
+        codigos = []
+        for seg in ordenados:
+            nome = seg["chord_majmin"]
+            if nome not in indices:
+                indices[nome] = len(vocabulario)
+                vocabulario.append(nome)
+            codigos.append(indices[nome])
+        return cls(
+            [float(s["start"]) for s in ordenados],
+            [float(s["end"]) for s in ordenados],
+            codigos,
+            vocabulario
+        )
+
+    def segmento(self, i):
+        return {
+            "start": round(float(self.inicios[i]), 3),
+            "end": round(float(self.fins[i]), 3),
+            "chord_majmin": self.vocabulario[int(self.codigos[i])]
+        }
+
+    def para_segmentos(self):
+        """Volta para a lista de dicts usada no resto do backend."""
+        return [self.segmento(i) for i in range(len(self))]
+
+    def indice_em(self, t):
+        """Índice do segmento que contém o instante t (ou -1)."""
+        i = int(np.searchsorted(self.inicios, t, side="right")) - 1
+        if i < 0 or t >= self.fins[i]:
+            return -1
+        return i
+
+    def acorde_em(self, t, proximos=0):
+        """Acorde tocando no instante t e os 'proximos' seguintes."""
+        i = int(np.searchsorted(self.inicios, t, side="right")) - 1
+        atual = self.segmento(i) if i >= 0 and t < self.fins[i] else None
+        seguintes = [self.segmento(k) for k in range(i + 1, min(i + 1 + proximos, len(self)))]
+        return atual, seguintes
+
+    def janela(self, de, ate):
+        """Sub-timeline com os segmentos que cruzam o intervalo [de, ate)."""
+        i0 = int(np.searchsorted(self.fins, de, side="right"))
+        i1 = int(np.searchsorted(self.inicios, ate, side="left"))
+        i1 = max(i0, i1)
+        return TimelineAcordes(self.inicios[i0:i1], self.fins[i0:i1], self.codigos[i0:i1], self.vocabulario)
+
+    def para_bytes(self):
+        largura = self.codigos.dtype.itemsize
+        partes = [_CABECALHO.pack(MAGICO, VERSAO, largura, len(self), len(self.vocabulario))]
+        for nome in self.vocabulario:
+            codificado = nome.encode("utf-8")[:255]
+            partes.append(struct.pack("<B", len(codificado)) + codificado)
+        partes.append(self.inicios.astype("<f4").tobytes())
+        partes.append(self.fins.astype("<f4").tobytes())
+        partes.append(self.codigos.astype("<u%d" % largura).tobytes())
+        return b"".join(partes)
+
+    @classmethod
+    def de_bytes(cls, dados):
+        magico, versao, largura, n, n_vocab = _CABECALHO.unpack_from(dados, 0)
+        if magico != MAGICO or versao != VERSAO:
+            raise ValueError("Formato de timeline desconhecido")
+        pos = _CABECALHO.size
+        vocabulario = []
+        for _ in range(n_vocab):
+            tamanho = dados[pos]
+            vocabulario.append(dados[pos + 1:pos + 1 + tamanho].decode("utf-8"))
+            pos += 1 + tamanho
+        inicios = np.frombuffer(dados, dtype="<f4", count=n, offset=pos)
+        fins = np.frombuffer(dados, dtype="<f4", count=n, offset=pos + 4 * n)
+        codigos = np.frombuffer(dados, dtype="<u%d" % largura, count=n, offset=pos + 8 * n)
+        return cls(inicios, fins, codigos, vocabulario)
+
+
+# ===============================
+# Armazenamento das timelines por id (imutáveis: o id vem do áudio, do workflow e da versão da análise)
+# ===============================
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def gerar_id(sha256, workflow, revisao=None):
+    """
+    Id da timeline de um áudio (sha256 do conteúdo) analisado com 'workflow'.
+    'revisao' separa reanálises forçadas do mesmo áudio, que podem dar outro resultado.
+    """
+    partes = [str(VERSAO_ANALISE), workflow, sha256] + ([str(revisao)] if revisao is not None else [])
+    return hashlib.sha256(":".join(partes).encode("utf-8")).hexdigest()[:32]
+
+
+def salvar(timeline_id, timeline):
+    """Guarda a timeline no estado compartilhado (formato binário) e no cache local."""
+    estado.padrao().definir(PREFIXO + timeline_id, timeline.para_bytes())
+    _guardar_cache(timeline_id, timeline)
+    return timeline_id
+
+
+def carregar(timeline_id):
+    """Retorna a timeline ou None se o id não existir."""
+    with _lock:
+        if timeline_id in _cache:
+            _cache.move_to_end(timeline_id)
+            return _cache[timeline_id]
+    dados = estado.padrao().obter(PREFIXO + timeline_id)
+    if dados is None:
+        return None
+    timeline = TimelineAcordes.de_bytes(dados)
+    _guardar_cache(timeline_id, timeline)
+    return timeline
+
+
+def _guardar_cache(timeline_id, timeline):
+    with _lock:
+        _cache[timeline_id] = timeline
+        _cache.move_to_end(timeline_id)
+        while len(_cache) > MAX_EM_MEMORIA:
+            _cache.popitem(last=False)
@@ -0,0 +1,140 @@
+# ARQUIVO COM O RECEBIMENTO DOS CALLBACKS DE CONCLUSÃO DOS JOBS DO MUSIC.AI
+# Com MUSICAI_CALLBACK_URL e MUSICAI_WEBHOOK_SECRET configurados, create_job manda
+# um callbackUrl assinado (HMAC) e quem espera o job dorme até o callback chegar,
+# em vez de consultar o status a cada poucos segundos. O callback só acorda a espera:
+# o status é confirmado com uma consulta ao music.ai. Sem callback em
+# MUSICAI_CALLBACK_ESPERA segundos, consulta mesmo assim (polling de segurança).
+#
+# O callback pode chegar em outro worker: além do evento local, fica registrado
+# no estado compartilhado (webhook:<job_id>), que a espera também consulta.
+#
+# A assinatura cobre só o ref aleatório (o id do job ainda não existe quando a URL é
+# montada). Por isso o ref é vinculado ao id assim que create_job retorna
+# (webhook_ref:<ref> → job_id) e vale uma única vez, só para esse job. Um callback
+# que chega antes do vínculo fica guardado (webhook_adiantado:<ref>) até vincular().
+
+import os
+import json
+import hmac
+import time
+import uuid
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+from modulos import estado, prazo
+
+CALLBACK_URL = os.getenv("MUSICAI_CALLBACK_URL", "")
+SEGREDO = os.getenv("MUSICAI_WEBHOOK_SECRET", "")
+ESPERA_MAXIMA = float(os.getenv("MUSICAI_CALLBACK_ESPERA", 30))
+VALIDADE_ASSINATURA = 24 * 3600
+TTL_CALLBACK = 3600
+INTERVALO_ESTADO = 0.5  # de quanto em quanto tempo a espera olha o estado compartilhado
+PREFIXO = "webhook:"
+PREFIXO_REF = "webhook_ref:"
+PREFIXO_ADIANTADO = "webhook_adiantado:"
+
+_eventos = {}
+_lock = threading.Lock()
+
+
+def ativo():
+    return bool(CALLBACK_URL and SEGREDO)
+
+
+def _assinar(ref, expira):
+    return hmac.new(SEGREDO.encode(), f"{ref}.{expira}".encode(), hashlib.sha256).hexdigest()
+
+
+def novo_callback():
+    """
+    (callbackUrl assinado, ref) para um job novo; (None, None) se os callbacks estão desligados.
+    O ref fica pendente até vincular() com o id do job criado.
+    """
+    if not ativo():
+        return None, None
+    ref, expira = uuid.uuid4().hex, int(time.time() + VALIDADE_ASSINATURA)
+    estado.padrao().definir(PREFIXO_REF + ref, b"", ttl=VALIDADE_ASSINATURA)
+    separador = "&" if "?" in CALLBACK_URL else "?"
+    url = CALLBACK_URL + separador + urlencode({"ref": ref, "exp": expira, "sig": _assinar(ref, expira)})
+    return url, ref
+
+
+def vincular(ref, job_id):
+    """Associa o ref ao job criado; entrega o callback que tenha chegado antes disso."""
+    chave = PREFIXO_REF + ref
+    estado.padrao().definir(chave, job_id.encode("utf-8"), ttl=VALIDADE_ASSINATURA)
+    adiantado = estado.padrao().obter_json(PREFIXO_ADIANTADO + ref)
+    if adiantado is None:
+        return
+    estado.padrao().remover(PREFIXO_ADIANTADO + ref)
+    if adiantado["id"] == job_id and estado.padrao().remover_se_igual(chave, job_id.encode("utf-8")):
+        receber(job_id, adiantado)
+
+
+def assinatura_valida(parametros):
+    """Confere ref/exp/sig da query string do callback."""
+    if not ativo():
+        return False
+    ref, expira, assinatura = parametros.get("ref", ""), parametros.get("exp", ""), parametros.get("sig", "")
+    if not ref or not assinatura or not expira.isdigit() or int(expira) < time.time():
+        return False
+    return hmac.compare_digest(assinatura, _assinar(ref, int(expira)))
+
+
+def aceitar(ref, job_id, dados):
+    """
+    Confere o callback (assinatura já validada) contra o ref: True se aceito.
+    Recusa ref desconhecido ou já usado e id diferente do job vinculado.
+    """
+    chave = PREFIXO_REF + ref
+    vinculado = estado.padrao().obter(chave)
+    if vinculado is None:
+        return False
+    if vinculado == b"":
+        # create_job ainda não retornou: guarda até vincular() conferir o id
+        adiantado = json.dumps({"id": job_id, "status": dados.get("status")}).encode("utf-8")
+        return estado.padrao().definir_se_ausente(PREFIXO_ADIANTADO + ref, adiantado, ttl=TTL_CALLBACK)
+    # remover_se_igual só tem sucesso uma vez: um callback repetido é recusado
+    if vinculado != job_id.encode("utf-8") or not estado.padrao().remover_se_igual(chave, vinculado):
+        return False
+    receber(job_id, dados)
+    return True
+
+
+def receber(job_id, dados):
+    """Registra o callback do job e acorda quem está esperando por ele (neste ou em outro worker)."""
+    estado.padrao().definir_json(PREFIXO + job_id, {"status": dados.get("status"), "recebido_em": time.time()},
+                                 ttl=TTL_CALLBACK)
+    with _lock:
+        evento = _eventos.get(job_id)
+    if evento is not None:
+        evento.set()
+
+
+def esperar(job_id, segundos=ESPERA_MAXIMA):
+    """
+    Dorme até o callback do job chegar ou 'segundos' passarem.
+    Retorna True se o callback chegou (e o consome); respeita o prazo/cancelamento da requisição.
+    """
+    atual = prazo.atual()
+    with _lock:
+        evento = _eventos.setdefault(job_id, threading.Event())
+    fim = time.monotonic() + segundos
+    try:
+        while True:
+            if evento.is_set() or estado.padrao().obter(PREFIXO + job_id) is not None:
+                estado.padrao().remover(PREFIXO + job_id)
+                return True
+            espera = fim - time.monotonic()
+            restante = atual.restante()
+            if restante is not None:
+                espera = min(espera, restante)
+            if espera <= 0:
+                atual.verificar()
+                return False
+            evento.wait(min(espera, INTERVALO_ESTADO))
+            atual.verificar()
+    finally:
+        with _lock:
+            _eventos.pop(job_id, None)
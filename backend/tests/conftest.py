@@ -0,0 +1,13 @@
+# ARQUIVO COM A CONFIGURAÇÃO COMUM DOS TESTES DO BACKEND
+# Roda com: python -m pytest (na pasta backend)
+# O estado compartilhado e os uploads vão para uma pasta temporária, o pool de análise
+# roda na própria thread e a API do music.ai nunca é chamada de verdade.
+
+import os
+import sys
+import tempfile
+
+os.environ["UMI_DATA_DIR"] = tempfile.mkdtemp(prefix="umi-testes-")
+os.environ["UMI_POOL_PROCESSOS"] = "0"
+os.environ.setdefault("api_key", "teste")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,24 @@
+# ARQUIVO COM SINAIS SINTÉTICOS PARA OS TESTES (acordes com gabarito exato)
+
+import numpy as np
+
+TAXA = 16000
+NOTAS = {"C": 261.63, "D": 293.66, "E": 329.63, "F": 349.23, "G": 392.0, "A": 440.0, "B": 493.88}
+TRIADES = {
+    "C:maj": ("C", "E", "G"), "G:maj": ("G", "B", "D"), "A:min": ("A", "C", "E"),
+    "F:maj": ("F", "A", "C"), "D:min": ("D", "F", "A"), "E:min": ("E", "G", "B"),
+}
+
+
+def sintetizar(acordes, segundos=2.0, taxa=TAXA, ruido=0, semente=0):
+    """Sinal com os acordes em sequência ('C:maj', ...), 'segundos' cada."""
+    t = np.arange(int(segundos * taxa)) / float(taxa)
+    partes = []
+    for acorde in acordes:
+        trecho = sum(np.sin(2 * np.pi * NOTAS[n] * t) + 0.5 * np.sin(4 * np.pi * NOTAS[n] * t)
+                     for n in TRIADES[acorde])
+        partes.append(0.15 * trecho)
+    sinal = np.concatenate(partes)
+    if ruido:
+        sinal = sinal + ruido * np.random.RandomState(semente).randn(len(sinal))
+    return sinal.astype(np.float32)
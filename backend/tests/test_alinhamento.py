@@ -0,0 +1,50 @@
+from modulos import alinhamento
+
+
+def timeline(acordes, inicio=0.0, duracao=2.0):
+    return [{"start": inicio + i * duracao, "end": inicio + (i + 1) * duracao, "chord_majmin": a}
+            for i, a in enumerate(acordes)]
+
+
+PROGRESSAO = ["C:maj", "G:maj", "A:min", "F:maj"]
+
+
+def test_timelines_iguais_acertam_tudo():
+    resultado = alinhamento.alinhar(timeline(PROGRESSAO), timeline(PROGRESSAO))
+    assert resultado["precisao"] == 1.0
+    assert resultado["precisao_ponderada"] == 1.0
+    assert resultado["offset_medio"] == 0.0
+    assert [s["chord_tocado"] for s in resultado["segmentos"]] == PROGRESSAO
+
+
+def test_acorde_errado_e_marcado():
+    tocado = timeline(["C:maj", "D:min", "A:min", "F:maj"])
+    resultado = alinhamento.alinhar(timeline(PROGRESSAO), tocado)
+    assert [s["correto"] for s in resultado["segmentos"]] == [True, False, True, True]
+    assert resultado["precisao"] == 0.75
+
+
+def test_atraso_vira_offset():
+    resultado = alinhamento.alinhar(timeline(PROGRESSAO), timeline(PROGRESSAO, inicio=0.5))
+    assert resultado["precisao"] == 1.0
+    assert [s["offset"] for s in resultado["segmentos"]] == [0.5] * 4
+
+
+def test_andamento_diferente_ainda_alinha():
+    # Tocado com cada acorde repetido (mais lento): o DTW junta os pedaços
+    tocado = timeline(["C:maj", "C:maj", "G:maj", "G:maj", "A:min", "A:min", "F:maj", "F:maj"], duracao=1.5)
+    assert alinhamento.alinhar(timeline(PROGRESSAO), tocado)["precisao"] == 1.0
+
+
+def test_timeline_vazia():
+    resultado = alinhamento.alinhar([], timeline(PROGRESSAO))
+    assert resultado["segmentos"] == [] and resultado["precisao"] == 0.0
+
+
+def test_codigos_e_distancias():
+    assert alinhamento.rotulo(alinhamento.codigo("Am")) == "A:min"
+    assert alinhamento.codigo("N") == 0
+    distancias = alinhamento.matriz_distancias()
+    c, am, g = (alinhamento.codigo(r) for r in ("C:maj", "A:min", "G:maj"))
+    assert distancias[c, c] == 0.0
+    assert distancias[c, am] < distancias[c, g] < 1.0
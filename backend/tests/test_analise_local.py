@@ -0,0 +1,16 @@
+from modulos import analise_local
+from sinais import sintetizar
+
+
+def test_segmentar_acordes_detecta_a_progressao():
+    segmentos = analise_local.segmentar_acordes(sintetizar(["C:maj", "G:maj", "A:min"]))
+    assert [s["chord_majmin"] for s in segmentos] == ["C:maj", "G:maj", "A:min"]
+
+
+def test_segmentar_usa_o_salto_do_cromagrama():
+    sinal = sintetizar(["C:maj", "G:maj"])
+    for salto in (analise_local.SALTO, analise_local.SALTO // 2):
+        segmentos = analise_local.segmentar_acordes(sinal, salto=salto)
+        assert [s["chord_majmin"] for s in segmentos] == ["C:maj", "G:maj"]
+        assert abs(segmentos[1]["start"] - 2.0) < 0.35
+        assert abs(segmentos[-1]["end"] - 4.0) < 0.35
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+
+from modulos import escalonador
+from modulos.escalonador import Escalonador, FilaCheia, INTERATIVO, LOTE
+
+
+def ocupar(esc, prioridade=INTERATIVO, cliente="a"):
+    """Segura uma vaga numa thread até o evento retornado ser setado."""
+    liberar, ocupado = threading.Event(), threading.Event()
+
+    def rodar():
+        with esc.slot(prioridade, cliente):
+            ocupado.set()
+            liberar.wait(5)
+
+    thread = threading.Thread(target=rodar, daemon=True)
+    thread.start()
+    assert ocupado.wait(5)
+    return liberar, thread
+
+
+def test_cota_por_cliente():
+    esc = Escalonador(max_execucoes=4, cota_por_cliente=1)
+    liberar, thread = ocupar(esc, cliente="a")
+    with pytest.raises(FilaCheia) as erro:
+        with esc.slot(INTERATIVO, "a"):
+            pass
+    assert erro.value.motivo == "cota"
+    # Outro cliente ainda entra
+    with esc.slot(INTERATIVO, "b"):
+        pass
+    liberar.set()
+    thread.join()
+
+
+def test_fila_cheia_e_espera_esgotada():
+    esc = Escalonador(max_execucoes=1, limites_fila={INTERATIVO: 0, LOTE: 1}, cota_por_cliente=5)
+    liberar, thread = ocupar(esc, LOTE)
+    with pytest.raises(FilaCheia) as erro:
+        with esc.slot(INTERATIVO, "b"):
+            pass
+    assert erro.value.motivo == "fila"
+
+    inicio = time.monotonic()
+    with pytest.raises(FilaCheia) as erro:
+        with esc.slot(LOTE, "b", espera=0.1):
+            pass
+    assert erro.value.motivo == "espera"
+    assert time.monotonic() - inicio < 2
+    assert esc.metricas()["filas"][LOTE]["profundidade"] == 0
+    liberar.set()
+    thread.join()
+
+
+def test_interativo_passa_na_frente_do_lote():
+    esc = Escalonador(max_execucoes=1, cota_por_cliente=5)
+    liberar, thread = ocupar(esc)
+    ordem = []
+
+    def esperar(prioridade):
+        with esc.slot(prioridade, prioridade):
+            ordem.append(prioridade)
+
+    threads = [threading.Thread(target=esperar, args=(LOTE,))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=esperar, args=(INTERATIVO,)))
+    threads[1].start()
+    time.sleep(0.05)
+    liberar.set()
+    for t in threads + [thread]:
+        t.join(5)
+    assert ordem == [INTERATIVO, LOTE]
+
+
+def test_lote_nao_ocupa_todas_as_vagas():
+    esc = Escalonador(max_execucoes=2, max_lote=1, cota_por_cliente=5)
+    liberar, thread = ocupar(esc, LOTE)
+    with pytest.raises(FilaCheia):
+        with esc.slot(LOTE, "b", espera=0.05):
+            pass
+    with esc.slot(INTERATIVO, "b"):
+        pass
+    liberar.set()
+    thread.join()
+
+
+def test_vaga_so_dentro_de_um_pedido():
+    esc = Escalonador(max_execucoes=1, cota_por_cliente=5)
+    # Fora de um pedido: roda direto
+    with escalonador.vaga():
+        assert esc.metricas()["rodando"] == 0
+
+    with escalonador.pedido(esc, LOTE, "a"):
+        with escalonador.vaga():
+            metricas = esc.metricas()
+            assert metricas["rodando"] == 1
+            assert metricas["filas"][LOTE]["rodando"] == 1
+    assert esc.metricas()["rodando"] == 0
+
+
+def test_resultado_em_cache_nao_ocupa_vaga(tmp_path, monkeypatch):
+    from modulos import resultados, impressao
+
+    monkeypatch.setattr(impressao, "do_arquivo", lambda caminho: None)
+    esc = Escalonador(max_execucoes=1, cota_por_cliente=5)
+    chamadas = []
+
+    def provedor(caminho, workflow):
+        chamadas.append(esc.metricas()["rodando"])
+        return ["C"]
+
+    audio = tmp_path / "cache.wav"
+    audio.write_bytes(b"audio-em-cache-%f" % time.time())
+    with escalonador.pedido(esc, INTERATIVO, "a"):
+        assert resultados._memorizado("acordes", str(audio), "wf", provedor) == ["C"]
+        # Segunda vez vem do cache: mesmo com a única vaga ocupada, responde sem esperar
+        liberar, thread = ocupar(esc, cliente="b")
+        assert resultados._memorizado("acordes", str(audio), "wf", provedor) == ["C"]
+        liberar.set()
+        thread.join()
+    assert chamadas == [1]
+
+
+def test_cliente_e_o_endereco_de_origem():
+    import api
+
+    with api.app.test_request_context(headers={"X-Client-Id": "outro"},
+                                      environ_base={"REMOTE_ADDR": "10.0.0.7"}):
+        assert api.client_id() == "10.0.0.7"
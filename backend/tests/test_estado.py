@@ -0,0 +1,141 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from modulos import estado
+
+PASTA_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def url(request, tmp_path):
+    """O mesmo conjunto de testes no SQLite e no substituto do Redis (_ServidorResp)."""
+    if request.param == "sqlite":
+        yield "sqlite:///" + str(tmp_path / "estado.db")
+        return
+    servidor = estado.servidor_resp_local(porta=0)
+    try:
+        yield "redis://127.0.0.1:%d/0" % servidor.server_address[1]
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+@pytest.fixture
+def banco(url):
+    return estado.criar(url)
+
+
+def test_interface_abstrata():
+    with pytest.raises(TypeError):
+        estado.Estado()
+
+
+def test_obter_definir_e_expirar(banco):
+    banco.definir("a", b"1")
+    banco.definir("b", b"2", ttl=0.2)
+    assert banco.obter("a") == b"1"
+    assert sorted(banco.listar_chaves("")) == ["a", "b"]
+    time.sleep(0.3)
+    assert banco.obter("b") is None
+    assert banco.listar_chaves("") == ["a"]
+    banco.remover("a")
+    assert banco.obter("a") is None
+
+
+def test_definir_se_ausente_e_remover_se_igual(banco):
+    assert banco.definir_se_ausente("k", b"dono")
+    assert not banco.definir_se_ausente("k", b"outro")
+    assert not banco.remover_se_igual("k", b"outro")
+    assert banco.remover_se_igual("k", b"dono")
+    assert banco.obter("k") is None
+
+
+def test_renovar_se_igual(banco):
+    banco.definir_se_ausente("k", b"dono", ttl=0.3)
+    assert not banco.renovar_se_igual("k", b"outro", 5)
+    assert banco.renovar_se_igual("k", b"dono", 5)
+    time.sleep(0.4)
+    assert banco.obter("k") == b"dono"
+    banco.remover("k")
+    assert not banco.renovar_se_igual("k", b"dono", 5)
+
+
+def test_lock_renovado_enquanto_o_dono_vive(banco):
+    with banco.lock("longo", ttl=0.3, renovar=True):
+        time.sleep(1.0)
+        assert not banco.definir_se_ausente("lock:longo", b"outro", ttl=5)
+    assert banco.obter("lock:longo") is None
+
+
+def test_unico_retoma_depois_que_o_dono_morre(url, banco):
+    # Outro processo pega o lock (com renovação) e morre sem liberar
+    codigo = (
+        "import os, sys, time\n"
+        "from modulos import estado\n"
+        "e = estado.criar(sys.argv[1])\n"
+        "dono = e.lock('resultado:c', ttl=0.5, renovar=True)\n"
+        "dono.__enter__()\n"
+        "time.sleep(1.0)\n"
+        "print('vivo' if e.obter('lock:resultado:c') else 'expirou', flush=True)\n"
+        "os._exit(1)\n"
+    )
+    saida = subprocess.run([sys.executable, "-c", codigo, url], cwd=PASTA_BACKEND,
+                           capture_output=True, text=True, timeout=30)
+    assert saida.stdout.strip() == "vivo"
+    assert banco.obter("lock:resultado:c") is not None
+
+    inicio = time.monotonic()
+    assert banco.unico("resultado:c", lambda: "retomado", ttl_lock=0.5, espera=5) == "retomado"
+    assert time.monotonic() - inicio < 2
+
+
+def test_unico_executa_uma_vez_com_chamadas_simultaneas(banco):
+    chamadas, resultados = [], []
+
+    def analisar():
+        chamadas.append(1)
+        time.sleep(0.3)
+        return {"acordes": ["C", "G"]}
+
+    def pedir():
+        resultados.append(banco.unico("resultado:x", analisar, espera=5))
+
+    threads = [threading.Thread(target=pedir) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    assert len(chamadas) == 1
+    assert resultados == [{"acordes": ["C", "G"]}] * 6
+    # Depois, direto do cache
+    assert banco.unico("resultado:x", lambda: pytest.fail("não deveria executar")) == {"acordes": ["C", "G"]}
+
+
+def test_unico_espera_esgotada(banco):
+    # Lock de outro dono ainda válido: desiste depois de 'espera'
+    banco.definir_se_ausente("lock:resultado:y", b"outro-worker", ttl=30)
+    inicio = time.monotonic()
+    with pytest.raises(estado.LockOcupado):
+        banco.unico("resultado:y", lambda: 1, espera=0.3)
+    assert time.monotonic() - inicio < 2
+
+
+def test_unico_assume_lock_expirado(banco):
+    # Dono que morreu sem liberar: o lock expira e o próximo executa
+    banco.definir_se_ausente("lock:resultado:z", b"worker-morto", ttl=0.3)
+    assert banco.unico("resultado:z", lambda: "novo", espera=5) == "novo"
+
+
+def test_unico_libera_o_lock_em_erro(banco):
+    def falhar():
+        raise RuntimeError("music.ai fora")
+
+    with pytest.raises(RuntimeError):
+        banco.unico("resultado:w", falhar, espera=1)
+    assert banco.obter("lock:resultado:w") is None
+    assert banco.unico("resultado:w", lambda: 2, espera=1) == 2
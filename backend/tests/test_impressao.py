@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from modulos import estado, impressao, resultados
+from tests.sinais import TRIADES, TAXA, sintetizar
+
+NOMES = sorted(TRIADES)
+_SORTEIO = random.Random(1)
+PROGRESSAO = [_SORTEIO.choice(NOMES) for _ in range(20)]
+
+
+@pytest.fixture(autouse=True)
+def indice_vazio():
+    for chave in estado.padrao().listar_chaves(impressao.PREFIXO):
+        estado.padrao().remover(chave)
+
+
+@pytest.fixture(scope="module")
+def gabarito():
+    return impressao.calcular(sintetizar(PROGRESSAO, segundos=2.4, ruido=0.01, semente=1))
+
+
+def test_outra_codificacao_e_reconhecida(gabarito):
+    copia = impressao.calcular(sintetizar(PROGRESSAO, segundos=2.4, ruido=0.03, semente=3))
+    impressao.registrar("gabarito", gabarito)
+    encontrados = impressao.semelhantes(copia)
+    assert [(sha, deslocamento) for sha, _, deslocamento in encontrados] == [("gabarito", 0.0)]
+
+
+def test_um_acorde_errado_nao_e_o_mesmo_audio(gabarito):
+    errado = list(PROGRESSAO)
+    errado[7] = next(n for n in NOMES if n != PROGRESSAO[7])
+    tocado = impressao.calcular(sintetizar(errado, segundos=2.4, ruido=0.01, semente=2))
+    impressao.registrar("gabarito", gabarito)
+    assert impressao.similaridade(gabarito, tocado)[0] < impressao.SIMILARIDADE_MINIMA
+    assert impressao.semelhantes(tocado) == []
+
+
+def test_copia_cortada_nao_reaproveita(gabarito):
+    # 48 s cortados em 39,5 s: mesmas notas no trecho comum, mas o fim da timeline se perderia
+    sinal = sintetizar(PROGRESSAO, segundos=2.4, ruido=0.01, semente=1)
+    cortado = impressao.calcular(sinal[:int(39.5 * TAXA)])
+    impressao.registrar("gabarito", gabarito)
+    impressao.registrar("cortado", cortado)
+    assert impressao.similaridade(gabarito, cortado)[0] == 0.0
+    assert impressao.semelhantes(cortado, excluir="cortado") == []
+    assert impressao.semelhantes(gabarito, excluir="gabarito") == []
+
+
+def test_tentativa_avaliada_nao_reaproveita(tmp_path, monkeypatch, gabarito):
+    """O tocado de uma comparação é analisado sempre, mesmo idêntico em croma a um gabarito já visto."""
+    impressoes = {}
+    monkeypatch.setattr(impressao, "do_arquivo", lambda caminho: impressoes[caminho])
+    chamadas = []
+
+    def provedor(caminho, workflow):
+        chamadas.append(caminho)
+        return [{"start": 0.0, "end": 48.0, "chord_majmin": caminho}]
+
+    original, copia, outra = (str(tmp_path / nome) for nome in ("gabarito.wav", "tocado.wav", "outra.wav"))
+    for caminho in (original, copia, outra):
+        with open(caminho, "wb") as f:
+            f.write(caminho.encode())
+        impressoes[caminho] = gabarito
+
+    assert resultados._memorizado("timeline", original, "wf", provedor)[0]["chord_majmin"] == original
+    # Como tentativa avaliada, a cópia vai ao provedor e não entra no índice
+    tocado = resultados._memorizado("timeline", copia, "wf", provedor, reaproveitar=False)
+    assert tocado[0]["chord_majmin"] == copia
+    assert all(not chave.endswith(resultados.hash_arquivo(copia))
+               for chave in estado.padrao().listar_chaves(impressao.PREFIXO))
+    # Fora de uma avaliação (ex: extract-chords), o mesmo áudio reaproveita o resultado
+    assert resultados._memorizado("timeline", outra, "wf", provedor)[0]["chord_majmin"] == original
+    assert chamadas == [original, copia]
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from modulos import estado, impressao, jobs_duraveis, prazo, resultados
+
+
+class Provedor:
+    """music.ai de mentira: registra as etapas chamadas."""
+
+    def __init__(self, aguardar=None):
+        self.etapas = []
+        self._aguardar = aguardar
+
+    def enviar(self, caminho):
+        self.etapas.append("enviar")
+        return "https://upload/" + caminho
+
+    def criar(self, download_url, workflow):
+        self.etapas.append("criar")
+        return "job-novo"
+
+    def aguardar(self, job_id):
+        self.etapas.append("aguardar:" + job_id)
+        if self._aguardar:
+            self._aguardar(job_id)
+        return {"id": job_id, "status": "SUCCEEDED"}
+
+    def baixar(self, job):
+        self.etapas.append("baixar")
+        return ["C", "G"]
+
+    def remover(self, job_id):
+        self.etapas.append("remover:" + job_id)
+
+    def executar(self, caminho, workflow="wf"):
+        return jobs_duraveis.executar("teste", caminho, workflow, self.enviar, self.criar,
+                                      self.aguardar, self.baixar, self.remover)
+
+
+@pytest.fixture
+def audio(tmp_path):
+    caminho = tmp_path / "audio.wav"
+    caminho.write_bytes(b"audio-%f" % time.time())
+    return str(caminho)
+
+
+def registro_criado(caminho, job_id="job-antigo"):
+    return jobs_duraveis.salvar_job({
+        "pipeline": "teste", "workflow": "wf", "sha256": jobs_duraveis.hash_arquivo(caminho),
+        "estado": jobs_duraveis.CRIADO, "job_id": job_id, "download_url": "https://upload/x",
+        "enviado_em": time.time(), "criado_em": time.time()
+    })
+
+
+def test_pipeline_completo_remove_o_registro(audio):
+    provedor = Provedor()
+    assert provedor.executar(audio) == ["C", "G"]
+    assert provedor.etapas == ["enviar", "criar", "aguardar:job-novo", "baixar"]
+    assert jobs_duraveis.obter_job("teste", "wf", jobs_duraveis.hash_arquivo(audio)) is None
+
+
+def test_retoma_do_polling(audio):
+    registro_criado(audio)
+    provedor = Provedor()
+    assert provedor.executar(audio) == ["C", "G"]
+    assert provedor.etapas == ["aguardar:job-antigo", "baixar"]
+
+
+def test_prazo_esgotado_mantem_o_job_e_cancelamento_remove(audio):
+    def estourar(job_id):
+        raise prazo.PrazoExcedido("prazo")
+
+    registro_criado(audio)
+    with pytest.raises(prazo.PrazoExcedido):
+        Provedor(aguardar=estourar).executar(audio)
+    assert jobs_duraveis.obter_job("teste", "wf", jobs_duraveis.hash_arquivo(audio))["job_id"] == "job-antigo"
+
+    def cancelar(job_id):
+        raise prazo.PrazoExcedido("cancelado", motivo="cancelado")
+
+    provedor = Provedor(aguardar=cancelar)
+    with pytest.raises(prazo.PrazoExcedido):
+        provedor.executar(audio)
+    assert provedor.etapas[-1] == "remover:job-antigo"
+    assert jobs_duraveis.obter_job("teste", "wf", jobs_duraveis.hash_arquivo(audio)) is None
+
+
+def test_nova_tentativa_retoma_depois_que_o_worker_cai(audio, monkeypatch):
+    """O worker que caiu deixa o lock da execução única e o job no meio: a próxima tentativa retoma."""
+    monkeypatch.setattr(impressao, "do_arquivo", lambda caminho: None)
+    sha256 = jobs_duraveis.hash_arquivo(audio)
+    registro_criado(audio)
+    # Lock do worker morto: sem renovação, expira em TTL_LOCK (aqui, curto)
+    estado.padrao().definir_se_ausente("lock:" + resultados._chave("acordes", "wf", sha256), b"morto", ttl=0.5)
+
+    provedor = Provedor()
+    token = prazo.iniciar(prazo.Prazo(10))
+    try:
+        inicio = time.monotonic()
+        assert resultados._memorizado("acordes", audio, "wf", provedor.executar) == ["C", "G"]
+        assert time.monotonic() - inicio < 3
+    finally:
+        prazo.encerrar(token)
+    assert provedor.etapas == ["aguardar:job-antigo", "baixar"]
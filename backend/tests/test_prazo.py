@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from modulos import prazo
+
+
+@pytest.fixture
+def sem_intervalo(monkeypatch):
+    """Verifica cliente e pedidos de cancelamento a cada chamada."""
+    monkeypatch.setattr(prazo, "INTERVALO_VERIFICACAO", 0.0)
+
+
+def novo_id():
+    return uuid.uuid4().hex
+
+
+def test_prazo_esgotado():
+    p = prazo.Prazo(0.05)
+    assert p.timeout(maximo=30)[1] <= 0.05
+    time.sleep(0.06)
+    with pytest.raises(prazo.PrazoExcedido) as erro:
+        p.verificar()
+    assert erro.value.motivo == "prazo"
+
+
+def test_sem_prazo():
+    p = prazo.Prazo()
+    assert p.restante() is None
+    assert p.timeout() == (prazo.TIMEOUT_CONEXAO, None)
+    assert p.timeout(maximo=5) == (5, 5)
+    assert p.cabecalho_ms() is None
+
+
+def test_dormir_acorda_no_cancelamento():
+    p = prazo.Prazo(30)
+    threading.Timer(0.1, p.cancelar).start()
+    inicio = time.monotonic()
+    with pytest.raises(prazo.PrazoExcedido) as erro:
+        p.dormir(10)
+    assert erro.value.motivo == "cancelado"
+    assert time.monotonic() - inicio < 2
+
+
+def test_dormir_respeita_o_prazo():
+    p = prazo.Prazo(0.1)
+    with pytest.raises(prazo.PrazoExcedido) as erro:
+        p.dormir(10)
+    assert erro.value.motivo == "prazo"
+
+
+def test_cliente_desconectado(sem_intervalo):
+    p = prazo.Prazo(30, desconectado=lambda: True)
+    with pytest.raises(prazo.PrazoExcedido) as erro:
+        p.verificar()
+    assert erro.value.motivo == "cancelado"
+    assert p.motivo == "cliente desconectou"
+
+
+def test_cancelar_requisicao_deste_processo():
+    requisicao = novo_id()
+    p = prazo.Prazo(30, requisicao_id=requisicao)
+    token = prazo.iniciar(p)
+    try:
+        assert prazo.atual() is p
+        assert prazo.cancelar(requisicao) == "cancelada"
+        assert p.cancelado()
+    finally:
+        prazo.encerrar(token)
+    assert prazo.atual() is not p
+
+
+def test_cancelar_requisicao_de_outro_worker(sem_intervalo):
+    requisicao = novo_id()
+    p = prazo.Prazo(30, requisicao_id=requisicao)
+    token = prazo.iniciar(p)
+    try:
+        # Outro worker só enxerga o marcador no estado compartilhado
+        with prazo._lock:
+            del prazo._ativos[requisicao]
+        assert prazo.cancelar(requisicao) == "registrada"
+        with pytest.raises(prazo.PrazoExcedido):
+            p.verificar()
+    finally:
+        prazo.encerrar(token)
+
+
+def test_cancelamento_nao_vale_depois_de_encerrar(sem_intervalo):
+    assert prazo.cancelar(novo_id()) is None
+
+    requisicao = novo_id()
+    token = prazo.iniciar(prazo.Prazo(30, requisicao_id=requisicao))
+    prazo.encerrar(token)
+    assert prazo.cancelar(requisicao) is None
+
+    # Mesmo id reutilizado: começa sem cancelamento pendente
+    p = prazo.Prazo(30, requisicao_id=requisicao)
+    token = prazo.iniciar(p)
+    try:
+        p.verificar()
+    finally:
+        prazo.encerrar(token)
+
+
+def test_segundos_do_header():
+    assert prazo.segundos_do_header(None) == prazo.PRAZO_PADRAO
+    assert prazo.segundos_do_header("abc") == prazo.PRAZO_PADRAO
+    assert prazo.segundos_do_header("0") == 1.0
+    assert prazo.segundos_do_header("99999") == prazo.PRAZO_MAXIMO
+
+
+def test_endpoint_so_cancela_requisicao_do_mesmo_cliente():
+    import api
+
+    requisicao = novo_id()
+    with api.app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        chave = api.cancellation_key(requisicao)
+    p = prazo.Prazo(30, requisicao_id=chave)
+    token = prazo.iniciar(p)
+    try:
+        cliente = api.app.test_client()
+        url = "/api/requests/%s/cancel" % requisicao
+        assert cliente.post(url, environ_base={"REMOTE_ADDR": "10.0.0.2"}).status_code == 404
+        assert not p.cancelado()
+        assert cliente.post(url, environ_base={"REMOTE_ADDR": "10.0.0.1"}).status_code == 202
+        assert p.cancelado()
+    finally:
+        prazo.encerrar(token)
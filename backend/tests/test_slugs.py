@@ -0,0 +1,108 @@
+import time
+
+import pytest
+import requests
+
+from modulos import estado, slugs
+
+INDICE = [
+    {"artist_slug": "legiao-urbana", "song_slug": "tempo-perdido", "name": "Tempo Perdido", "artist": "Legião Urbana"},
+    {"artist_slug": "chitaozinho-e-xororo", "song_slug": "evidencias", "name": "Evidências",
+     "artist": "Chitãozinho & Xororó"},
+    {"artist_slug": "coldplay", "song_slug": "the-scientist", "name": "The Scientist", "artist": "Coldplay"},
+]
+
+
+class Resposta:
+    def __init__(self, dados):
+        self._dados = dados
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._dados
+
+
+@pytest.fixture(autouse=True)
+def indice(monkeypatch):
+    """Índice da cifraclub-api fixo e nenhum par registrado antes de cada teste."""
+    consultas = []
+
+    def consultar(url, timeout=None):
+        consultas.append(url)
+        return Resposta({"slugs": INDICE})
+
+    monkeypatch.setattr(slugs.requests, "get", consultar)
+    monkeypatch.setattr(slugs, "_indice", {"artistas": {}, "musicas": {}, "carregado_em": None, "atualizando": False})
+    for prefixo in (slugs.PREFIXO_CONHECIDO, slugs.PREFIXO_AUSENTE):
+        for chave in estado.padrao().listar_chaves(prefixo):
+            estado.padrao().remover(chave)
+    return consultas
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Legião Urbana", "legiao-urbana"),
+    ("Tempo Perdido!", "tempo-perdido"),
+    ("Chitãozinho & Xororó", "chitaozinho-e-xororo"),
+    ("Don't Stop Me Now", "dont-stop-me-now"),
+    ("  AC/DC  ", "ac-dc"),
+    (None, ""),
+])
+def test_normalizar(texto, esperado):
+    assert slugs.normalizar(texto) == esperado
+
+
+def test_resolver_par_conhecido_pelo_nome_de_exibicao():
+    assert slugs.resolver("Legião Urbana", "Tempo Perdido") == ("legiao-urbana", "tempo-perdido", True)
+    assert slugs.resolver("Chitãozinho & Xororó", "Evidências") == ("chitaozinho-e-xororo", "evidencias", True)
+
+
+def test_resolver_corrige_erro_de_digitacao():
+    assert slugs.resolver("Legiao Urbanna", "Tempo Perdiddo") == ("legiao-urbana", "tempo-perdido", True)
+
+
+def test_resolver_desconhecido_devolve_o_normalizado():
+    # Artista conhecido, música não: o artista canônico e a música como digitada
+    assert slugs.resolver("Coldplay", "Yellow") == ("coldplay", "yellow", False)
+    # Nada parecido o suficiente: não "corrige" para outro artista
+    assert slugs.resolver("Cold Play Cover Band", "The Scientist") == ("cold-play-cover-band", "the-scientist", False)
+
+
+def test_indice_carregado_uma_vez(indice):
+    slugs.resolver("Coldplay", "The Scientist")
+    slugs.resolver("Legião Urbana", "Tempo Perdido")
+    assert len(indice) == 1
+
+
+def test_indice_indisponivel(monkeypatch):
+    def falhar(url, timeout=None):
+        raise requests.ConnectionError("cifraclub-api fora")
+
+    monkeypatch.setattr(slugs.requests, "get", falhar)
+    assert slugs.resolver("Legião Urbana", "Tempo Perdido") == ("legiao-urbana", "tempo-perdido", False)
+
+
+def test_registrar_torna_o_par_conhecido_e_limpa_o_miss():
+    slugs.resolver("Coldplay", "Yellow")
+    slugs.marcar_ausente("coldplay", "yellow")
+    assert slugs.ausente("coldplay", "yellow")
+
+    slugs.registrar("coldplay", "yellow", "Yellow", "Coldplay")
+    assert not slugs.ausente("coldplay", "yellow")
+    assert slugs.resolver("coldplay", "Yelow") == ("coldplay", "yellow", True)
+
+
+def test_par_registrado_sobrevive_a_recarga(monkeypatch):
+    slugs.registrar("los-hermanos", "anna-julia", "Anna Júlia", "Los Hermanos")
+    # Outro worker: índice vazio em memória, mas o par está no estado compartilhado
+    monkeypatch.setattr(slugs, "_indice", {"artistas": {}, "musicas": {}, "carregado_em": None, "atualizando": False})
+    assert slugs.resolver("Los Hermanos", "Anna Júlia") == ("los-hermanos", "anna-julia", True)
+
+
+def test_miss_expira(monkeypatch):
+    monkeypatch.setattr(slugs, "TTL_AUSENTE", 0.2)
+    slugs.marcar_ausente("coldplay", "inexistente")
+    assert slugs.ausente("coldplay", "inexistente")
+    time.sleep(0.3)
+    assert not slugs.ausente("coldplay", "inexistente")
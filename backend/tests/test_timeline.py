@@ -0,0 +1,105 @@
+import pytest
+
+from modulos import timeline
+
+SEGMENTOS = [
+    {"start": 0.0, "end": 2.0, "chord_majmin": "C:maj"},
+    {"start": 2.0, "end": 4.0, "chord_majmin": "G:maj"},
+    {"start": 4.0, "end": 6.0, "chord_majmin": "A:min"},
+    {"start": 6.0, "end": 8.0, "chord_majmin": "F:maj"},
+    {"start": 8.0, "end": 10.0, "chord_majmin": "C:maj"},
+]
+
+
+@pytest.fixture
+def tl():
+    return timeline.TimelineAcordes.de_segmentos(SEGMENTOS)
+
+
+def test_ida_e_volta_em_segmentos(tl):
+    assert tl.para_segmentos() == SEGMENTOS
+    assert tl.vocabulario == ["C:maj", "G:maj", "A:min", "F:maj"]
+
+
+def test_ida_e_volta_em_bytes(tl):
+    dados = tl.para_bytes()
+    assert dados[:4] == timeline.MAGICO
+    assert timeline.TimelineAcordes.de_bytes(dados).para_segmentos() == SEGMENTOS
+
+
+def test_bytes_de_formato_desconhecido_sao_recusados(tl):
+    with pytest.raises(ValueError):
+        timeline.TimelineAcordes.de_bytes(b"XXXX" + tl.para_bytes()[4:])
+
+
+def test_janela_pega_segmentos_que_cruzam_o_intervalo(tl):
+    assert [s["chord_majmin"] for s in tl.janela(3.0, 6.5).para_segmentos()] == ["G:maj", "A:min", "F:maj"]
+    # [de, ate): segmento que começa exatamente em 'ate' fica de fora
+    assert [s["start"] for s in tl.janela(2.0, 4.0).para_segmentos()] == [2.0]
+    assert len(tl.janela(20.0, 30.0)) == 0
+
+
+def test_acorde_em(tl):
+    atual, seguintes = tl.acorde_em(4.5, 2)
+    assert atual["chord_majmin"] == "A:min"
+    assert [s["chord_majmin"] for s in seguintes] == ["F:maj", "C:maj"]
+
+    atual, seguintes = tl.acorde_em(9.5, 3)
+    assert atual["chord_majmin"] == "C:maj"
+    assert seguintes == []
+
+    atual, _ = tl.acorde_em(12.0)
+    assert atual is None
+
+
+def test_gerar_id_muda_com_workflow_e_revisao():
+    sha = "ab" * 32
+    assert timeline.gerar_id(sha, "wf") == timeline.gerar_id(sha, "wf")
+    assert timeline.gerar_id(sha, "wf") != timeline.gerar_id(sha, "outro")
+    assert timeline.gerar_id(sha, "wf") != timeline.gerar_id(sha, "wf", revisao=2)
+
+
+def test_salvar_e_carregar(tl):
+    timeline.salvar("teste-salvar", tl)
+    timeline._cache.clear()
+    assert timeline.carregar("teste-salvar").para_segmentos() == SEGMENTOS
+    assert timeline.carregar("nao-existe") is None
+
+
+# ===== ENDPOINTS /window E /at =====
+
+@pytest.fixture
+def cliente(tl):
+    import api
+    timeline.salvar("teste-api", tl)
+    return api.app.test_client()
+
+
+def test_window(cliente):
+    resposta = cliente.get("/api/chords/teste-api/window?from=3&to=6.5")
+    assert resposta.status_code == 200
+    assert resposta.get_json()["count"] == 3
+
+
+@pytest.mark.parametrize("consulta", [
+    "from=nan&to=inf",
+    "from=0&to=inf",
+    "from=-1&to=5",
+    "from=6&to=2",
+    "from=abc",
+])
+def test_window_recusa_intervalo_invalido(cliente, consulta):
+    assert cliente.get("/api/chords/teste-api/window?" + consulta).status_code == 400
+
+
+def test_at(cliente):
+    dados = cliente.get("/api/chords/teste-api/at?t=4.5&next=1").get_json()
+    assert dados["chord"]["chord_majmin"] == "A:min"
+    assert len(dados["next"]) == 1
+    # next negativo vira 0
+    assert cliente.get("/api/chords/teste-api/at?t=4.5&next=-5").get_json()["next"] == []
+
+
+@pytest.mark.parametrize("consulta", ["t=nan", "t=inf", "t=-1", "t=1&next=x"])
+def test_at_recusa_parametros_invalidos(cliente, consulta):
+    assert cliente.get("/api/chords/teste-api/at?" + consulta).status_code == 400
@@ -0,0 +1,102 @@
+import threading
+import time
+import wave
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+import requests
+from werkzeug.serving import make_server
+
+from modulos import chord_detector, estado, fake_musicai, prazo, webhook
+from tests.sinais import TAXA, sintetizar
+
+
+def _servir(app):
+    servidor = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, "http://127.0.0.1:%d" % servidor.server_port
+
+
+@pytest.fixture
+def servidores(monkeypatch):
+    """Backend (só a rota do webhook importa) e music.ai falso, ligados um ao outro."""
+    import api
+
+    backend, url_backend = _servir(api.app)
+    falso, url_falso = _servir(fake_musicai.criar_app(duracao=0.5))
+    monkeypatch.setattr(webhook, "CALLBACK_URL", url_backend + "/api/webhooks/musicai")
+    monkeypatch.setattr(webhook, "SEGREDO", "segredo-de-teste")
+    monkeypatch.setattr(chord_detector, "API_URL", url_falso)
+    try:
+        yield url_backend, url_falso
+    finally:
+        for servidor in (backend, falso):
+            servidor.shutdown()
+            servidor.server_close()
+
+
+@pytest.fixture
+def audio(tmp_path):
+    amostras = (sintetizar(["C:maj", "G:maj"], segundos=2.0) * 32767).astype(np.int16)
+    caminho = str(tmp_path / "acordes.wav")
+    with wave.open(caminho, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(TAXA)
+        f.writeframes(amostras.tobytes())
+    return caminho
+
+
+def _callback(url, job_id):
+    return requests.post(url, json={"id": job_id, "status": "SUCCEEDED"}, timeout=5)
+
+
+def test_job_acorda_pelo_callback(servidores, audio):
+    _, url_falso = servidores
+    token = prazo.iniciar(prazo.Prazo(30))
+    try:
+        inicio = time.monotonic()
+        acordes = chord_detector.get_chords_from_audio(audio)
+    finally:
+        prazo.encerrar(token)
+    assert acordes == ["C:maj", "G:maj"]
+    assert time.monotonic() - inicio < webhook.ESPERA_MAXIMA
+    stats = requests.get(url_falso + "/_stats", timeout=5).json()
+    assert stats["callbacks"] == 1 and stats["callbacks_falhos"] == 0
+    # Uma consulta logo depois de criar e a de confirmação depois do callback
+    assert stats["consultas"] <= 2
+
+
+def test_callback_com_id_forjado_e_recusado(servidores):
+    url, ref = webhook.novo_callback()
+    webhook.vincular(ref, "job-verdadeiro")
+
+    resposta = _callback(url, "forjado")
+    assert resposta.status_code == 403
+    assert estado.padrao().obter(webhook.PREFIXO + "forjado") is None
+    # O job verdadeiro continua podendo ser avisado
+    assert _callback(url, "job-verdadeiro").status_code == 200
+    assert estado.padrao().obter(webhook.PREFIXO + "job-verdadeiro") is not None
+
+
+def test_callback_repetido_e_recusado(servidores):
+    url, ref = webhook.novo_callback()
+    webhook.vincular(ref, "job-unico")
+
+    assert _callback(url, "job-unico").status_code == 200
+    estado.padrao().remover(webhook.PREFIXO + "job-unico")
+    assert _callback(url, "job-unico").status_code == 403
+    assert estado.padrao().obter(webhook.PREFIXO + "job-unico") is None
+
+
+def test_callback_antes_do_vinculo(servidores):
+    url, ref = webhook.novo_callback()
+    assert parse_qs(urlsplit(url).query)["ref"] == [ref]
+
+    # O music.ai terminou antes de create_job retornar: fica guardado até o vínculo
+    assert _callback(url, "job-rapido").status_code == 200
+    assert estado.padrao().obter(webhook.PREFIXO + "job-rapido") is None
+    webhook.vincular(ref, "job-rapido")
+    assert estado.padrao().obter(webhook.PREFIXO + "job-rapido") is not None
+    assert _callback(url, "job-rapido").status_code == 403
@@ -1,10 +1,15 @@
 """API Module"""
 
 import os
-from flask import Flask, json
+import time
+from flask import Flask, json, request
 from cifraclub import CifraClub
+import indice
+import perfil
 
 app = Flask(__name__)
+# Perfilamento sob demanda (Server-Timing e amostragem de pilhas); exige PROFILING_TOKEN
+perfil.instalar(app, '/admin/profiling')
 
 @app.route('/')
 def home():
@@ -18,9 +23,74 @@ def home():
 @app.route('/artists/<artist>/songs/<song>')
 def get_cifra(artist, song):
     """Get cifra by artist and song"""
-    cifrablub = CifraClub()
+    # Quem chama informa quanto tempo ainda espera; não vale abrir uma sessão do Selenium depois disso
+    prazo_ms = request.headers.get('X-Deadline-Ms', type=int)
+    if prazo_ms is not None and prazo_ms <= 0:
+        return app.response_class(
+            response=json.dumps({'error': 'Prazo da requisição esgotado'}, ensure_ascii=False),
+            status=504,
+            mimetype='application/json'
+        )
+    cifrablub = CifraClub(prazo=None if prazo_ms is None else prazo_ms / 1000.0)
+    result = cifrablub.cifra(artist, song)
+    try:
+        indice.indexar(artist, song, result)
+    except Exception as e: # pylint: disable=broad-except
+        print(f"⚠️ Não foi possível indexar a cifra: {e}")
     return app.response_class(
-        response=json.dumps(cifrablub.cifra(artist, song), ensure_ascii=False),
+        response=json.dumps(result, ensure_ascii=False),
+        status=status_cifra(result),
+        mimetype='application/json'
+    )
+
+def status_cifra(result):
+    """404 só para a página de "não encontrado" do site; timeout e página sem cifra são falhas (5xx)"""
+    if result.get('not_found'):
+        return 404
+    if result.get('timeout'):
+        return 504
+    if result.get('scrape_failed'):
+        return 502
+    return 200
+
+@app.route('/slugs')
+def list_slugs():
+    """Slugs de artista/música já indexados (usados pelo backend para resolver nomes)"""
+    slugs = indice.slugs()
+    return app.response_class(
+        response=json.dumps({'slugs': slugs, 'count': len(slugs)}, ensure_ascii=False),
+        status=200,
+        mimetype='application/json'
+    )
+
+@app.route('/search')
+def search():
+    """Busca nas cifras já armazenadas (texto com prefixo e/ou acordes)"""
+    inicio = time.perf_counter()
+    texto = request.args.get('q', '').strip()
+    acordes = [a.strip() for a in request.args.get('chords', '').split(',') if a.strip()]
+    if not texto and not acordes:
+        return app.response_class(
+            response=json.dumps({'error': "Informe 'q' e/ou 'chords'"}, ensure_ascii=False),
+            status=400,
+            mimetype='application/json'
+        )
+    resultados = indice.buscar(
+        texto,
+        acordes,
+        somente=request.args.get('only', '0') in ('1', 'true'),
+        simplificar=request.args.get('simplify', '0') in ('1', 'true'),
+        limite=min(request.args.get('limit', 20, type=int), 100),
+        deslocamento=request.args.get('offset', 0, type=int)
+    )
+    return app.response_class(
+        response=json.dumps({
+            'query': texto,
+            'chords': acordes,
+            'results': resultados,
+            'count': len(resultados),
+            'took_ms': round((time.perf_counter() - inicio) * 1000, 3)
+        }, ensure_ascii=False),
         status=200,
         mimetype='application/json'
     )
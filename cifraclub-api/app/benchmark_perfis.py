@@ -0,0 +1,129 @@
+"""Benchmark dos perfis de carregamento do Selenium
+
+Compara o tempo até o elemento da cifra aparecer (driver.get + espera explícita)
+em cada perfil de cifraclub.PERFIS, usando páginas salvas localmente para que
+a variação do site não contamine a medição.
+
+Uso (dentro do container, onde o hub do Selenium está acessível):
+    python benchmark_perfis.py salvar coldplay/the-scientist legiao-urbana/tempo-perdido
+    python benchmark_perfis.py rodar --repeticoes 5 --saida resultado.json
+"""
+
+import os
+import sys
+import math
+import json
+import time
+import socket
+import argparse
+import threading
+import statistics
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import requests
+
+from cifraclub import CifraClub, PERFIS, CIFRACLUB_URL
+
+PASTA_PAGINAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench', 'paginas')
+
+
+def salvar(musicas, pasta=PASTA_PAGINAS):
+    """Baixa as páginas reais e salva com <base> apontando para o site (recursos externos continuam reais)."""
+    os.makedirs(pasta, exist_ok=True)
+    for musica in musicas:
+        url = CIFRACLUB_URL + musica.strip('/') + '/'
+        html = requests.get(url, timeout=30, headers={'User-Agent': 'Mozilla/5.0'}).text
+        html = html.replace('<head>', f'<head><base href="{CIFRACLUB_URL}">', 1)
+        nome = musica.strip('/').replace('/', '__') + '.html'
+        with open(os.path.join(pasta, nome), 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f"💾 {url} → {nome}")
+
+
+class _SemLog(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def servir(pasta, porta):
+    """Servidor HTTP local com as páginas salvas (em thread)."""
+    servidor = ThreadingHTTPServer(('0.0.0.0', porta), partial(_SemLog, directory=pasta))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    k = max(0, min(len(ordenados) - 1, int(math.ceil(p / 100.0 * len(ordenados))) - 1))
+    return ordenados[k]
+
+
+def rodar(perfis, repeticoes, host, porta, pasta=PASTA_PAGINAS):
+    paginas = sorted(p for p in os.listdir(pasta) if p.endswith('.html'))
+    if not paginas:
+        raise SystemExit(f"Nenhuma página salva em {pasta}; use 'salvar' antes")
+
+    servidor = servir(pasta, porta)
+    resultados = {}
+    try:
+        for perfil in perfis:
+            cliente = CifraClub(perfil, hosts_extras=(host,))
+            tempos, falhas = [], 0
+            try:
+                for _ in range(repeticoes):
+                    for pagina in paginas:
+                        inicio = time.perf_counter()
+                        try:
+                            cliente.carregar(f"http://{host}:{porta}/{pagina}")
+                            tempos.append(time.perf_counter() - inicio)
+                        except Exception as e: # pylint: disable=broad-except
+                            falhas += 1
+                            print(f"❌ {perfil} {pagina}: {e}")
+            finally:
+                cliente.driver.quit()
+
+            resultados[perfil] = {
+                'amostras': len(tempos),
+                'falhas': falhas,
+                'mediana': round(statistics.median(tempos), 3) if tempos else None,
+                'p95': round(percentil(tempos, 95), 3) if tempos else None,
+                'media': round(statistics.mean(tempos), 3) if tempos else None,
+            }
+            print(f"⏱️ {perfil}: {resultados[perfil]}")
+    finally:
+        servidor.shutdown()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_salvar = sub.add_parser('salvar', help='Salva páginas reais para o benchmark')
+    p_salvar.add_argument('musicas', nargs='+', help='artista/musica')
+
+    p_rodar = sub.add_parser('rodar', help='Mede mediana e p95 por perfil')
+    p_rodar.add_argument('--perfis', default=','.join(PERFIS), help='Perfis separados por vírgula')
+    p_rodar.add_argument('--repeticoes', type=int, default=5)
+    p_rodar.add_argument('--host', default=os.getenv('BENCH_HOST', socket.gethostname()),
+                         help='Nome/IP desta máquina visto pelo hub do Selenium')
+    p_rodar.add_argument('--porta', type=int, default=8765)
+    p_rodar.add_argument('--saida', help='Grava o resultado em JSON')
+
+    args = parser.parse_args(argv)
+    if args.comando == 'salvar':
+        salvar(args.musicas)
+        return
+
+    resultados = rodar(args.perfis.split(','), args.repeticoes, args.host, args.porta)
+    print(f"\n{'perfil':<10} {'mediana (s)':>12} {'p95 (s)':>10} {'falhas':>8}")
+    for perfil, r in resultados.items():
+        print(f"{perfil:<10} {str(r['mediana']):>12} {str(r['p95']):>10} {r['falhas']:>8}")
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,5 +1,8 @@
 """CifraClub Module"""
 
+import os
+import time
+from urllib.parse import quote
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -7,13 +10,66 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.firefox.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
-import time
+from perfil import medir
 
 CIFRACLUB_URL = "https://www.cifraclub.com.br/"
+SELENIUM_URL = os.getenv('SELENIUM_URL', "http://selenium:4444/wd/hub")
+
+# Terceiros que não influenciam a cifra (anúncios, analytics, vídeo, fontes)
+HOSTS_BLOQUEADOS = (
+    'doubleclick.net', 'googlesyndication.com', 'googleadservices.com', 'google-analytics.com',
+    'googletagmanager.com', 'googletagservices.com', 'adservice.google.com', 'amazon-adsystem.com',
+    'adnxs.com', 'criteo.com', 'criteo.net', 'rubiconproject.com', 'pubmatic.com', 'taboola.com',
+    'outbrain.com', 'scorecardresearch.com', 'hotjar.com', 'facebook.net', 'facebook.com',
+    'youtube.com', 'ytimg.com', 'youtube-nocookie.com', 'fonts.googleapis.com', 'fonts.gstatic.com',
+)
+# Domínios do próprio site (perfil 'minimo' só deixa passar estes)
+HOSTS_PERMITIDOS = ('cifraclub.com.br', 'sscdn.co')
+
+PERFIS = {
+    # Comportamento original: espera o load completo, só bloqueia imagens
+    'padrao': {'page_load_strategy': 'normal', 'bloquear_fontes': False, 'bloquear_css': False,
+               'bloquear_hosts': (), 'permitir_hosts': None, 'espera': 15},
+    # DOMContentLoaded + espera explícita pela cifra, sem anúncios/analytics/fontes
+    'rapido': {'page_load_strategy': 'eager', 'bloquear_fontes': True, 'bloquear_css': False,
+               'bloquear_hosts': HOSTS_BLOQUEADOS, 'permitir_hosts': None, 'espera': 15},
+    # Não espera nada do carregamento, só a cifra; apenas hosts do site, sem CSS
+    'minimo': {'page_load_strategy': 'none', 'bloquear_fontes': True, 'bloquear_css': True,
+               'bloquear_hosts': (), 'permitir_hosts': HOSTS_PERMITIDOS, 'espera': 15},
+}
+PERFIL_PADRAO = os.getenv('CIFRACLUB_PERFIL', 'rapido')
+# Título da página de "não encontrado" do site (quando o navegador não informa o status HTTP)
+MARCAS_NAO_ENCONTRADA = ('não encontrad', 'nao encontrad', 'erro 404', 'error 404')
+
+
+def script_pac(bloquear=(), permitir=None):
+    """
+    Proxy auto-config que manda hosts bloqueados para um proxy inexistente
+    (a requisição falha na hora). Com 'permitir', tudo fora da lista é bloqueado.
+    """
+    def condicao(hosts):
+        return ' || '.join(f'host == "{h}" || dnsDomainIs(host, ".{h}")' for h in hosts) or 'false'
+
+    if permitir is not None:
+        corpo = f'if ({condicao(permitir)}) return "DIRECT"; return "PROXY 127.0.0.1:9";'
+    else:
+        corpo = f'if ({condicao(bloquear)}) return "PROXY 127.0.0.1:9"; return "DIRECT";'
+    return 'function FindProxyForURL(url, host) { ' + corpo + ' }'
+
 
 class CifraClub():
     """CifraClub Class"""
-    def __init__(self):
+    @medir('cifraclub.abrir_sessao')
+    def __init__(self, perfil=None, hosts_extras=(), prazo=None):
+        """
+        hosts_extras: hosts liberados além da lista do perfil (ex: servidor local do benchmark)
+        prazo: segundos que o chamador ainda espera (header X-Deadline-Ms); limita as esperas do Selenium
+        """
+        self.perfil = perfil or PERFIL_PADRAO
+        config = PERFIS[self.perfil]
+        self.espera = config['espera']
+        self.fim = None if prazo is None else time.monotonic() + prazo
+
         options = Options()
         # Otimizações para velocidade
         options.add_argument('--headless')  # Modo headless (sem interface gráfica)
@@ -21,20 +77,94 @@ class CifraClub():
         options.add_argument('--disable-dev-shm-usage')
         options.add_argument('--disable-gpu')
         
+        # 'eager' retorna no DOMContentLoaded e 'none' retorna na hora;
+        # em ambos a espera explícita pelo elemento .cifra é que manda
+        options.page_load_strategy = config['page_load_strategy']
+        
         # Bloquear imagens e recursos desnecessários (mantém JS ativo pois o site precisa)
         options.set_preference('permissions.default.image', 2)  # Bloquear imagens
         options.set_preference('dom.webnotifications.enabled', False)
         options.set_preference('media.volume_scale', '0.0')
+        options.set_preference('media.autoplay.default', 5)  # Bloquear autoplay de áudio e vídeo
+        
+        if config['bloquear_fontes']:
+            options.set_preference('gfx.downloadable_fonts.enabled', False)
+            options.set_preference('browser.display.use_document_fonts', 0)
+        
+        # Desabilitar CSS para velocidade (pode quebrar layout, mas a cifra é lida do <pre>)
+        if config['bloquear_css']:
+            options.set_preference('permissions.default.stylesheet', 2)
         
-        # Desabilitar CSS e fontes para velocidade (opcional, pode quebrar layout mas acelera)
-        # options.set_preference('permissions.default.stylesheet', 2)  # Descomentar se necessário
+        if config['bloquear_hosts'] or config['permitir_hosts'] is not None:
+            permitir = config['permitir_hosts']
+            if permitir is not None:
+                permitir = tuple(permitir) + tuple(hosts_extras)
+            pac = script_pac(config['bloquear_hosts'], permitir)
+            options.set_preference('network.proxy.type', 2)
+            options.set_preference('network.proxy.autoconfig_url', 'data:text/javascript,' + quote(pac))
         
-        self.driver = webdriver.Remote("http://selenium:4444/wd/hub", options=options)
+        self.driver = webdriver.Remote(SELENIUM_URL, options=options)
         
         # Configurar timeouts mais agressivos
         self.driver.set_page_load_timeout(30)  # Timeout de carregamento de página
         self.driver.implicitly_wait(5)  # Espera implícita reduzida
 
+    def restante(self, maximo):
+        """Segundos disponíveis para a próxima espera (até 'maximo'); TimeoutException se o prazo acabou."""
+        if self.fim is None:
+            return maximo
+        restante = self.fim - time.monotonic()
+        if restante <= 0:
+            raise TimeoutException("Prazo do chamador esgotado")
+        return min(maximo, restante)
+
+    @medir('cifraclub.carregar')
+    def carregar(self, url):
+        """Abre a página e espera o elemento da cifra. Retorna o elemento ou levanta NoSuchElementException."""
+        print(f"🌐 Acessando URL: {url} (perfil {self.perfil})")
+        self.driver.set_page_load_timeout(self.restante(30))
+        self.driver.get(url)
+        
+        # Espera otimizada - reduzir timeout e usar estratégias mais eficientes
+        wait = WebDriverWait(self.driver, self.restante(self.espera))
+        
+        try:
+            # Estratégia 1: Esperar pelo elemento cifra diretamente (mais rápido)
+            cifra_element = wait.until(EC.presence_of_element_located((By.CLASS_NAME, 'cifra')))
+            print("✅ Elemento 'cifra' encontrado rapidamente")
+            return cifra_element
+        except TimeoutException:
+            # Estratégia 2: Esperar pelo body (mais rápido que esperar por tudo)
+            WebDriverWait(self.driver, self.restante(self.espera)).until(
+                EC.presence_of_element_located((By.TAG_NAME, 'body')))
+            print("⚠️ Esperando elemento 'cifra' aparecer...")
+            # Espera reduzida - verificar se elemento aparece
+            for i in range(6):  # 6 tentativas de 0.5s = 3s total (reduzido de 3s fixo)
+                try:
+                    cifra_element = self.driver.find_element(By.CLASS_NAME, 'cifra')
+                    print(f"✅ Elemento 'cifra' encontrado após {i * 0.5}s")
+                    return cifra_element
+                except NoSuchElementException:
+                    time.sleep(self.restante(0.5))  # Espera menor e mais frequente
+            raise NoSuchElementException("Elemento não encontrado após espera")
+
+    def pagina_inexistente(self):
+        """
+        True só se a página carregada é a de "não encontrado" do site: status HTTP 404
+        da navegação (Navigation Timing) ou, sem status disponível, o título da página de erro.
+        """
+        try:
+            status = self.driver.execute_script(
+                "var n = performance.getEntriesByType('navigation')[0];"
+                "return n && n.responseStatus ? n.responseStatus : null;")
+            if status:
+                return int(status) == 404
+            titulo = (self.driver.title or '').lower()
+            return any(marca in titulo for marca in MARCAS_NAO_ENCONTRADA)
+        except Exception: # pylint: disable=broad-except
+            return False
+
+    @medir('cifraclub.cifra')
     def cifra(self, artist: str, song: str) -> dict:
         """Lê a página HTML e extrai a cifra e meta dados da música."""
         result = {}
@@ -42,39 +172,33 @@ class CifraClub():
         url = CIFRACLUB_URL + artist + "/" + song
         result['cifraclub_url'] = url
         try:
-            print(f"🌐 Acessando URL: {url}")
-            self.driver.get(url)
-            
-            # Espera otimizada - reduzir timeout e usar estratégias mais eficientes
-            wait = WebDriverWait(self.driver, 15)  # Reduzido de 20 para 15 segundos
-            
-            # Tentar encontrar o elemento cifra com estratégia otimizada
             cifra_element = None
             try:
-                # Estratégia 1: Esperar pelo elemento cifra diretamente (mais rápido)
-                cifra_element = wait.until(EC.presence_of_element_located((By.CLASS_NAME, 'cifra')))
-                print("✅ Elemento 'cifra' encontrado rapidamente")
+                cifra_element = self.carregar(url)
             except TimeoutException:
-                try:
-                    # Estratégia 2: Esperar pelo body (mais rápido que esperar por tudo)
-                    wait.until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
-                    print("⚠️ Esperando elemento 'cifra' aparecer...")
-                    # Espera reduzida - verificar se elemento aparece
-                    for i in range(6):  # 6 tentativas de 0.5s = 3s total (reduzido de 3s fixo)
-                        try:
-                            cifra_element = self.driver.find_element(By.CLASS_NAME, 'cifra')
-                            print(f"✅ Elemento 'cifra' encontrado após {i * 0.5}s")
-                            break
-                        except NoSuchElementException:
-                            time.sleep(0.5)  # Espera menor e mais frequente
-                    else:
-                        raise NoSuchElementException("Elemento não encontrado após espera")
-                except NoSuchElementException:
+                if self.fim is not None and time.monotonic() >= self.fim:
+                    print("⏱️ Prazo do chamador esgotado, liberando a sessão do Selenium")
+                    result['error'] = 'Prazo da requisição esgotado'
+                else:
+                    print("⏱️ Página do Cifra Club não carregou a tempo")
+                    result['error'] = 'Tempo esgotado ao carregar a página do Cifra Club'
+                result['timeout'] = True
+                result['cifra'] = []
+                self.driver.quit()
+                return result
+            except NoSuchElementException:
+                # Só é "não encontrada" se o site disse isso; senão a página mudou ou veio quebrada
+                if self.pagina_inexistente():
+                    print("🚫 Cifra inexistente no Cifra Club")
+                    result['error'] = 'Cifra não encontrada no Cifra Club'
+                    result['not_found'] = True
+                else:
                     print("❌ Elemento 'cifra' não encontrado na página")
                     result['error'] = 'Elemento da cifra não encontrado na página. A estrutura do site pode ter mudado.'
-                    result['cifra'] = []
-                    self.driver.quit()
-                    return result
+                    result['scrape_failed'] = True
+                result['cifra'] = []
+                self.driver.quit()
+                return result
             
             if cifra_element:
                 self.get_details(result)
@@ -95,6 +219,7 @@ class CifraClub():
 
         return result
 
+    @medir('cifraclub.get_details')
     def get_details(self, result):
         """Obtêm os meta dados da música"""
         try:
@@ -137,6 +262,7 @@ class CifraClub():
             result['name'] = 'Erro ao obter nome'
             result['artist'] = 'Erro ao obter artista'
 
+    @medir('cifraclub.get_cifra')
     def get_cifra(self, result):
         """Obtêm a cifra da música e converte para json"""
         try:
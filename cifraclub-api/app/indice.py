@@ -0,0 +1,250 @@
+"""Indice Module"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import threading
+
+from perfil import medir
+
+DB_PATH = os.getenv('CIFRAS_DB', os.path.join('data', 'cifras.db'))
+
+# Acorde como aparece no Cifra Club: C, C#m7, A9, E7M(9), B11/D#, Bb°...
+ACORDE_RE = re.compile(r"^[A-G][#b]?(?:m|maj|min|dim|aug|sus|add|M|°|º|\+|-|\d|\(|\)|#|b|/[A-G][#b]?)*$")
+BASE_RE = re.compile(r"^([A-G][#b]?)(m(?!aj))?")
+TAB_RE = re.compile(r"^[A-Ga-g][#b]?\|")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cifras (
+    id INTEGER PRIMARY KEY,
+    artist_slug TEXT NOT NULL,
+    song_slug TEXT NOT NULL,
+    name TEXT,
+    artist TEXT,
+    cifraclub_url TEXT,
+    youtube_url TEXT,
+    cifra TEXT NOT NULL,
+    acordes TEXT NOT NULL,
+    atualizado_em REAL NOT NULL,
+    UNIQUE (artist_slug, song_slug)
+);
+CREATE TABLE IF NOT EXISTS cifra_acordes (
+    cifra_id INTEGER NOT NULL,
+    acorde TEXT NOT NULL,
+    base TEXT NOT NULL,
+    PRIMARY KEY (cifra_id, acorde)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cifra_acordes_acorde ON cifra_acordes (acorde);
+CREATE INDEX IF NOT EXISTS idx_cifra_acordes_base ON cifra_acordes (base);
+CREATE VIRTUAL TABLE IF NOT EXISTS cifras_fts USING fts5(
+    name, artist, letra, acordes,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_local = threading.local()
+
+
+def conexao():
+    """Uma conexão SQLite por thread (o Flask atende requisições em threads)."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        pasta = os.path.dirname(DB_PATH)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def base_acorde(acorde):
+    """Reduz o acorde à tríade (C#m7 → C#m, A9 → A, D/F# → D)."""
+    m = BASE_RE.match(acorde)
+    return (m.group(1) + (m.group(2) or '')) if m else acorde
+
+
+def separar_cifra(linhas):
+    """Divide as linhas da cifra em (acordes distintos na ordem, linhas de letra)."""
+    acordes, letra = [], []
+    for linha in linhas:
+        texto = re.sub(r"\[[^\]]*\]", " ", linha).strip()
+        if not texto or TAB_RE.match(texto):
+            continue
+        tokens = [t for t in (_limpar_token(t) for t in texto.split()) if t]
+        if tokens and all(ACORDE_RE.match(t) for t in tokens):
+            acordes.extend(tokens)
+        elif not linha.strip().startswith('['):
+            letra.append(linha.strip())
+    return list(dict.fromkeys(acordes)), letra
+
+
+def _limpar_token(token):
+    """Remove parênteses de agrupamento ('( C#m7', 'E )') sem mexer em 'E7M(9)'."""
+    if token.startswith('(') and ')' not in token:
+        token = token[1:]
+    if token.endswith(')') and '(' not in token:
+        token = token[:-1]
+    return token
+
+
+@medir('indice.indexar')
+def indexar(artist_slug, song_slug, dados):
+    """Grava (ou atualiza) uma cifra e seu texto no índice."""
+    linhas = dados.get('cifra') or []
+    if not linhas or dados.get('error'):
+        return None
+    acordes, letra = separar_cifra(linhas)
+
+    conn = conexao()
+    with conn:
+        conn.execute(
+            "INSERT INTO cifras (artist_slug, song_slug, name, artist, cifraclub_url, youtube_url,"
+            " cifra, acordes, atualizado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (artist_slug, song_slug) DO UPDATE SET name = excluded.name,"
+            " artist = excluded.artist, cifraclub_url = excluded.cifraclub_url,"
+            " youtube_url = excluded.youtube_url, cifra = excluded.cifra,"
+            " acordes = excluded.acordes, atualizado_em = excluded.atualizado_em",
+            (artist_slug, song_slug, dados.get('name'), dados.get('artist'), dados.get('cifraclub_url'),
+             dados.get('youtube_url'), json.dumps(linhas, ensure_ascii=False), ' '.join(acordes), time.time())
+        )
+        cifra_id = conn.execute(
+            "SELECT id FROM cifras WHERE artist_slug = ? AND song_slug = ?", (artist_slug, song_slug)
+        ).fetchone()[0]
+
+        conn.execute("DELETE FROM cifra_acordes WHERE cifra_id = ?", (cifra_id,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO cifra_acordes (cifra_id, acorde, base) VALUES (?, ?, ?)",
+            [(cifra_id, a, base_acorde(a)) for a in acordes]
+        )
+        conn.execute("DELETE FROM cifras_fts WHERE rowid = ?", (cifra_id,))
+        conn.execute(
+            "INSERT INTO cifras_fts (rowid, name, artist, letra, acordes) VALUES (?, ?, ?, ?, ?)",
+            (cifra_id, dados.get('name') or song_slug.replace('-', ' '),
+             dados.get('artist') or artist_slug.replace('-', ' '), '\n'.join(letra), ' '.join(acordes))
+        )
+    return cifra_id
+
+
+def obter(artist_slug, song_slug):
+    """Cifra já indexada no formato da API (ou None)."""
+    linha = conexao().execute(
+        "SELECT * FROM cifras WHERE artist_slug = ? AND song_slug = ?", (artist_slug, song_slug)
+    ).fetchone()
+    if linha is None:
+        return None
+    return {
+        'name': linha['name'],
+        'artist': linha['artist'],
+        'cifraclub_url': linha['cifraclub_url'],
+        'youtube_url': linha['youtube_url'],
+        'cifra': json.loads(linha['cifra'])
+    }
+
+
+def slugs():
+    """Pares (artista, música) já indexados com os nomes de exibição, para resolver slugs."""
+    linhas = conexao().execute(
+        "SELECT artist_slug, song_slug, name, artist FROM cifras ORDER BY artist_slug, song_slug"
+    ).fetchall()
+    return [dict(linha) for linha in linhas]
+
+
+def _consulta_fts(texto):
+    """Transforma o texto livre em consulta FTS5 com prefixo em cada termo."""
+    termos = re.findall(r"\w+", texto, flags=re.UNICODE)
+    return ' '.join('"%s"*' % t for t in termos)
+
+
+@medir('indice.buscar')
+def buscar(texto=None, acordes=None, somente=False, simplificar=False, limite=20, deslocamento=0):
+    """
+    Busca no índice local.
+
+    texto: termos livres (título, artista, letra), com casamento por prefixo
+    acordes: lista de acordes; somente=True exige que a música use apenas
+             esses acordes, senão exige que contenha todos eles
+    simplificar: compara pelas tríades (G7 conta como G, Am7 como Am)
+    """
+    condicoes, parametros = [], []
+    coluna = 'base' if simplificar else 'acorde'
+    if acordes:
+        acordes = list(dict.fromkeys(base_acorde(a) if simplificar else a for a in acordes))
+        marcadores = ','.join('?' * len(acordes))
+        if somente:
+            condicoes.append(
+                f"c.id IN (SELECT cifra_id FROM cifra_acordes GROUP BY cifra_id"
+                f" HAVING SUM({coluna} NOT IN ({marcadores})) = 0)"
+            )
+        else:
+            condicoes.append(
+                f"c.id IN (SELECT cifra_id FROM cifra_acordes WHERE {coluna} IN ({marcadores})"
+                f" GROUP BY cifra_id HAVING COUNT(DISTINCT {coluna}) = {len(acordes)})"
+            )
+        parametros.extend(acordes)
+
+    consulta = _consulta_fts(texto or '')
+    if consulta:
+        sql = (
+            "SELECT c.artist_slug, c.song_slug, c.name, c.artist, c.acordes,"
+            " snippet(cifras_fts, 2, '[', ']', '…', 8) AS trecho,"
+            " bm25(cifras_fts, 10.0, 5.0, 1.0, 2.0) AS rank"
+            " FROM cifras_fts JOIN cifras c ON c.id = cifras_fts.rowid"
+            " WHERE cifras_fts MATCH ?"
+        )
+        parametros.insert(0, consulta)
+        ordem = " ORDER BY rank"
+    else:
+        sql = ("SELECT c.artist_slug, c.song_slug, c.name, c.artist, c.acordes,"
+               " NULL AS trecho, 0 AS rank FROM cifras c WHERE 1 = 1")
+        ordem = " ORDER BY c.name"
+
+    for condicao in condicoes:
+        sql += " AND " + condicao
+    sql += ordem + " LIMIT ? OFFSET ?"
+    parametros.extend([limite, deslocamento])
+
+    return [
+        {
+            'artist_slug': linha['artist_slug'],
+            'song_slug': linha['song_slug'],
+            'name': linha['name'],
+            'artist': linha['artist'],
+            'chords': linha['acordes'].split(),
+            'snippet': linha['trecho'],
+            'score': round(-linha['rank'], 4) if linha['rank'] else None
+        }
+        for linha in conexao().execute(sql, parametros)
+    ]
+
+
+def importar(caminho):
+    """Importa uma biblioteca gerada por 'cifra.py batch' (JSONL ou SQLite)."""
+    total = 0
+    if caminho.endswith(('.db', '.sqlite', '.sqlite3')):
+        origem = sqlite3.connect(caminho)
+        registros = (
+            {'artist': a, 'song': s, 'ok': ok, 'data': json.loads(d) if d else None}
+            for a, s, ok, d in origem.execute("SELECT artist, song, ok, data FROM cifras")
+        )
+    else:
+        with open(caminho, encoding='utf-8') as f:
+            registros = [json.loads(linha) for linha in f if linha.strip()]
+    for registro in registros:
+        if registro.get('ok') and registro.get('data'):
+            if indexar(registro['artist'], registro['song'], registro['data']):
+                total += 1
+    return total
+
+
+# Uso: python indice.py importar biblioteca.jsonl
+if __name__ == '__main__':
+    if len(sys.argv) != 3 or sys.argv[1] != 'importar':
+        print('Uso: python indice.py importar <biblioteca.jsonl|biblioteca.db>')
+        sys.exit(1)
+    print(f'{importar(sys.argv[2])} cifras indexadas em {DB_PATH}')
@@ -0,0 +1,16 @@
+"""Perfil Module"""
+
+# O perfilamento é o mesmo do backend (backend/modulos/perfilamento.py), copiado
+# para a imagem pelo Dockerfile. Fora dela (testes, lint, python api.py direto)
+# o serviço roda sem perfilamento.
+
+try:
+    from perfilamento import medir, instalar
+except ImportError:
+    def medir(nome=None):  # pylint: disable=unused-argument
+        """Sem perfilamento: devolve a função sem medir"""
+        return lambda funcao: funcao
+
+    def instalar(app, prefixo):  # pylint: disable=unused-argument
+        """Sem perfilamento: não registra os endpoints"""
+        return None
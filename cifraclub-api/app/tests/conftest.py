@@ -0,0 +1,21 @@
+"""Configuração dos testes: módulos do app importáveis e índice num banco temporário"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indice  # pylint: disable=wrong-import-position
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """Índice vazio em tmp_path (a conexão é por thread, então é refeita)"""
+    monkeypatch.setattr(indice, 'DB_PATH', str(tmp_path / 'cifras.db'))
+    monkeypatch.setattr(indice, '_local', indice.threading.local())
+    yield indice
+    conn = getattr(indice._local, 'conn', None)  # pylint: disable=protected-access
+    if conn is not None:
+        conn.close()
@@ -0,0 +1,137 @@
+"""Testes do índice local (SQLite FTS5)"""
+
+import json
+
+import indice
+
+CIFRAS = {
+    ('coldplay', 'the-scientist'): {
+        'name': 'The Scientist',
+        'artist': 'Coldplay',
+        'cifra': [
+            '[Intro] Dm7  Bb  F  Fsus4',
+            '',
+            'Dm7          Bb',
+            "Come up to meet you, tell you I'm sorry",
+            'F                Fsus4',
+            "You don't know how lovely you are",
+        ],
+    },
+    ('legiao-urbana', 'tempo-perdido'): {
+        'name': 'Tempo Perdido',
+        'artist': 'Legião Urbana',
+        'cifra': [
+            'G            C',
+            'Todos os dias quando acordo',
+            'D              G',
+            'Não tenho mais o tempo que passou',
+        ],
+    },
+    ('cazuza', 'exagerado'): {
+        'name': 'Exagerado',
+        'artist': 'Cazuza',
+        'cifra': [
+            'G7          C',
+            'Amor da minha vida',
+            'D7           Em',
+            'Daqui até a eternidade',
+        ],
+    },
+}
+
+
+def indexar_todas(banco):
+    for (artista, musica), dados in CIFRAS.items():
+        assert banco.indexar(artista, musica, dados)
+
+
+def slugs(resultados):
+    return [r['song_slug'] for r in resultados]
+
+
+def test_separar_cifra():
+    acordes, letra = indice.separar_cifra(CIFRAS[('coldplay', 'the-scientist')]['cifra'])
+    assert acordes == ['Dm7', 'Bb', 'F', 'Fsus4']
+    assert letra[0] == "Come up to meet you, tell you I'm sorry"
+
+
+def test_base_acorde():
+    assert indice.base_acorde('C#m7') == 'C#m'
+    assert indice.base_acorde('A9') == 'A'
+    assert indice.base_acorde('D/F#') == 'D'
+    assert indice.base_acorde('Cmaj7') == 'C'
+
+
+def test_busca_por_prefixo_do_titulo(banco):
+    indexar_todas(banco)
+    assert slugs(banco.buscar('scien')) == ['the-scientist']
+
+
+def test_busca_sem_acento_e_na_letra(banco):
+    indexar_todas(banco)
+    # remove_diacritics: 'legiao' acha 'Legião'
+    assert slugs(banco.buscar('legiao')) == ['tempo-perdido']
+    resultado = banco.buscar('eternidade')
+    assert slugs(resultado) == ['exagerado']
+    assert '[eternidade]' in resultado[0]['snippet']
+
+
+def test_busca_por_acordes_contidos(banco):
+    indexar_todas(banco)
+    assert slugs(banco.buscar(acordes=['G', 'C'])) == ['tempo-perdido']
+
+
+def test_busca_somente_com_acordes(banco):
+    indexar_todas(banco)
+    assert slugs(banco.buscar(acordes=['G', 'C', 'D'], somente=True)) == ['tempo-perdido']
+    # Simplificando, G7 e D7 contam como G e D; Em ainda fica de fora
+    assert slugs(banco.buscar(acordes=['G', 'C', 'D'], somente=True, simplificar=True)) == ['tempo-perdido']
+    assert slugs(banco.buscar(acordes=['G', 'C', 'D', 'Em'], somente=True, simplificar=True)) == [
+        'exagerado', 'tempo-perdido']
+
+
+def test_texto_e_acordes_juntos(banco):
+    indexar_todas(banco)
+    assert slugs(banco.buscar('amor', acordes=['Em'])) == ['exagerado']
+    assert banco.buscar('amor', acordes=['Dm7']) == []
+
+
+def test_reindexar_substitui(banco):
+    indexar_todas(banco)
+    dados = dict(CIFRAS[('cazuza', 'exagerado')], cifra=['A     E', 'Outra letra qualquer'])
+    banco.indexar('cazuza', 'exagerado', dados)
+    assert banco.buscar('eternidade') == []
+    assert slugs(banco.buscar(acordes=['A', 'E'])) == ['exagerado']
+    assert banco.obter('cazuza', 'exagerado')['cifra'] == dados['cifra']
+
+
+def test_cifra_com_erro_nao_entra(banco):
+    assert banco.indexar('x', 'y', {'error': 'not_found', 'cifra': []}) is None
+    assert banco.slugs() == []
+
+
+def test_consulta_com_caracteres_do_fts(banco):
+    indexar_todas(banco)
+    # Aspas, dois-pontos e parênteses do FTS5 no texto livre não quebram a consulta
+    assert slugs(banco.buscar('"the-scientist": (')) == ['the-scientist']
+
+
+def test_importar_biblioteca_jsonl(banco, tmp_path):
+    caminho = tmp_path / 'biblioteca.jsonl'
+    linhas = [
+        {'artist': a, 'song': s, 'ok': True, 'data': d} for (a, s), d in CIFRAS.items()
+    ] + [{'artist': 'x', 'song': 'y', 'ok': False, 'data': None}]
+    caminho.write_text('\n'.join(json.dumps(l, ensure_ascii=False) for l in linhas), encoding='utf-8')
+    assert banco.importar(str(caminho)) == 3
+    assert len(banco.slugs()) == 3
+
+
+def test_endpoint_search(banco):
+    import api  # pylint: disable=import-outside-toplevel
+
+    indexar_todas(banco)
+    cliente = api.app.test_client()
+    resposta = cliente.get('/search?chords=G,C,D&only=1')
+    assert resposta.status_code == 200
+    assert slugs(resposta.get_json()['results']) == ['tempo-perdido']
+    assert cliente.get('/search').status_code == 400
@@ -1,9 +1,19 @@
 import typer
 import os
+import sys
+import json
+import time
+import signal
+import sqlite3
+import threading
 import requests
 import decorating
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 CIFRACLUB_API_URL = os.getenv("CIFRACLUB_API_URL", "http://localhost:3000")
+TIMEOUT = 180
 app = typer.Typer()
 
 @app.command()
@@ -12,11 +22,216 @@ def get(artist: str, song: str):
     with decorating.writing(delay=0.02):
         print(f"Carregando música {song} do artista {artist}...")
     with decorating.animated("carregando cifra"):
-        response = requests.get(get_endpoint)
+        response = requests.get(get_endpoint, timeout=TIMEOUT)
     response_json = response.json()
     for text_line in response_json["cifra"]:
         print(text_line)
 
 
+# ===============================
+# Biblioteca local (JSONL ou SQLite)
+# ===============================
+
+class BibliotecaJsonl:
+    """Uma linha JSON por busca; a última linha de cada música é a que vale."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.registros = {}
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                for linha in f:
+                    linha = linha.strip()
+                    if not linha:
+                        continue
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue  # linha cortada por uma interrupção anterior
+                    self.registros[(registro["artist"], registro["song"])] = registro
+        self.arquivo = open(caminho, "a", encoding="utf-8")
+
+    def fresco(self, artist, song, max_idade):
+        registro = self.registros.get((artist, song))
+        return bool(registro and registro["ok"] and time.time() - registro["fetched_at"] < max_idade)
+
+    def gravar(self, registro):
+        self.registros[(registro["artist"], registro["song"])] = registro
+        self.arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self.arquivo.flush()
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+class BibliotecaSqlite:
+    """Tabela 'cifras' com uma linha por música (upsert a cada resultado)."""
+
+    def __init__(self, caminho):
+        self.conn = sqlite3.connect(caminho)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cifras ("
+            " artist TEXT NOT NULL, song TEXT NOT NULL, fetched_at REAL NOT NULL,"
+            " ok INTEGER NOT NULL, data TEXT, error TEXT,"
+            " PRIMARY KEY (artist, song))"
+        )
+        self.conn.commit()
+
+    def fresco(self, artist, song, max_idade):
+        linha = self.conn.execute(
+            "SELECT ok, fetched_at FROM cifras WHERE artist = ? AND song = ?", (artist, song)
+        ).fetchone()
+        return bool(linha and linha[0] and time.time() - linha[1] < max_idade)
+
+    def gravar(self, registro):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cifras (artist, song, fetched_at, ok, data, error) VALUES (?, ?, ?, ?, ?, ?)",
+            (registro["artist"], registro["song"], registro["fetched_at"], int(registro["ok"]),
+             json.dumps(registro["data"], ensure_ascii=False) if registro["data"] else None,
+             registro["error"])
+        )
+        self.conn.commit()
+
+    def fechar(self):
+        self.conn.close()
+
+
+def abrir_biblioteca(caminho):
+    if caminho.endswith((".db", ".sqlite", ".sqlite3")):
+        return BibliotecaSqlite(caminho)
+    return BibliotecaJsonl(caminho)
+
+
+def ler_lista(caminho):
+    """Lê pares artista/música: 'artista,musica', 'artista/musica' ou separados por tab."""
+    pares = []
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.strip()
+            if not linha or linha.startswith("#"):
+                continue
+            for separador in ("\t", ",", "/"):
+                if separador in linha:
+                    artist, song = linha.split(separador, 1)
+                    pares.append((artist.strip(), song.strip()))
+                    break
+    return list(dict.fromkeys(pares))  # remove duplicados mantendo a ordem
+
+
+class Orcamento:
+    """Contador de novas tentativas compartilhado entre as threads do lote."""
+
+    def __init__(self, limite):
+        self.restante = limite
+        self.lock = threading.Lock()
+
+    def gastar(self):
+        with self.lock:
+            if self.restante <= 0:
+                return False
+            self.restante -= 1
+            return True
+
+
+class RetryLimitado(Retry):
+    """Retry do urllib3 que, além do limite por música, gasta de um orçamento do lote inteiro."""
+
+    orcamento = None
+
+    def new(self, **kw):
+        novo = super().new(**kw)
+        novo.orcamento = self.orcamento
+        return novo
+
+    def increment(self, *args, **kwargs):
+        novo = super().increment(*args, **kwargs)  # levanta quando acabam as tentativas da música
+        if self.orcamento is not None and not self.orcamento.gastar():
+            # Orçamento do lote esgotado: falha como se não houvesse mais tentativas
+            return Retry.increment(self.new(total=0), *args, **kwargs)
+        return novo
+
+
+def criar_sessao(workers, max_retentativas=None):
+    """
+    Sessão com pool de conexões do tamanho da concorrência e retry em 502/503.
+    504 não entra: é o timeout do Selenium na cifraclub-api, e repetir custa outra carga inteira da página.
+    max_retentativas limita as novas tentativas somadas de todas as músicas do lote.
+    """
+    sessao = requests.Session()
+    retry = RetryLimitado(total=2, backoff_factor=1, status_forcelist=[502, 503], allowed_methods=["GET"])
+    if max_retentativas is not None:
+        retry.orcamento = Orcamento(max_retentativas)
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    sessao.mount("http://", adapter)
+    sessao.mount("https://", adapter)
+    return sessao
+
+
+def buscar(sessao, artist, song, timeout):
+    registro = {"artist": artist, "song": song, "fetched_at": time.time(), "ok": False, "data": None, "error": None}
+    try:
+        response = sessao.get(CIFRACLUB_API_URL + f"/artists/{artist}/songs/{song}", timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("error") or not data.get("cifra"):
+            registro["error"] = data.get("error") or "Cifra vazia"
+        else:
+            registro["ok"] = True
+        registro["data"] = data
+    except Exception as e:
+        registro["error"] = str(e)
+    return registro
+
+
+@app.command()
+def batch(
+    lista: str = typer.Argument(..., help="Arquivo com um par artista,musica por linha"),
+    saida: str = typer.Option("biblioteca.jsonl", help="Biblioteca local (.jsonl ou .db/.sqlite)"),
+    workers: int = typer.Option(4, help="Buscas simultâneas"),
+    timeout: float = typer.Option(TIMEOUT, help="Timeout por música (segundos)"),
+    max_idade: float = typer.Option(30.0, help="Dias em que uma cifra já baixada é considerada fresca"),
+    max_retentativas: int = typer.Option(20, help="Novas tentativas (502/503/conexão) somadas no lote inteiro"),
+):
+    """Baixa várias cifras para uma biblioteca local, retomando de onde parou."""
+    # O decorating troca o tratamento do Ctrl-C ao ser importado; aqui vale o KeyboardInterrupt normal
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    pares = ler_lista(lista)
+    biblioteca = abrir_biblioteca(saida)
+    pendentes = [(a, s) for a, s in pares if not biblioteca.fresco(a, s, max_idade * 86400)]
+    print(f"{len(pares)} músicas na lista, {len(pares) - len(pendentes)} já frescas, {len(pendentes)} para buscar")
+
+    sessao = criar_sessao(workers, max_retentativas)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futuros = [executor.submit(buscar, sessao, a, s, timeout) for a, s in pendentes]
+    ok = falhas = 0
+    interrompido = False
+    try:
+        for i, futuro in enumerate(as_completed(futuros), 1):
+            registro = futuro.result()
+            biblioteca.gravar(registro)  # gravação incremental: só a thread principal escreve
+            if registro["ok"]:
+                ok += 1
+                print(f"[{i}/{len(pendentes)}] ✅ {registro['artist']}/{registro['song']}")
+            else:
+                falhas += 1
+                print(f"[{i}/{len(pendentes)}] ❌ {registro['artist']}/{registro['song']}: {registro['error']}")
+    except KeyboardInterrupt:
+        interrompido = True
+        print("Interrompido; rode de novo para continuar de onde parou.")
+        for futuro in futuros:
+            futuro.cancel()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        biblioteca.fechar()
+        sessao.close()
+
+    print(f"Concluído: {ok} baixadas, {falhas} falhas")
+    if interrompido:
+        # As buscas já em andamento não podem ser canceladas e a saída normal do
+        # Python esperaria por elas (até --timeout cada); a biblioteca já está fechada
+        sys.stdout.flush()
+        os._exit(130)
+
+
 if __name__ == '__main__':
     app()